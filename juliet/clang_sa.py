@@ -37,15 +37,12 @@
 # DM18-0995
 # 
 import runner
-import subprocess
 import os
-import uuid
-import shutil
 
 
-def handler(tc, tc_support, outdir):
+def get_command(tc, tc_support):
     src_files, headers = tc
-    header_dirs = set([os.path.split(hdr)[0] for hdr in headers])
+    header_dirs = sorted(set([os.path.split(hdr)[0] for hdr in headers]))
 
     cmd = ["clang", "--analyze"]
     cmd += ["-Xanalyzer", "-analyzer-output=plist"]
@@ -55,11 +52,15 @@ def handler(tc, tc_support, outdir):
         cmd += ["-I" + hd]
 
     cmd += src_files
+    return cmd
+
+
+def handler(tc, tc_support, workdir):
+    cmd = get_command(tc, tc_support)
     FNULL = open(os.devnull, 'w')
-    proc = subprocess.Popen(cmd, stderr=FNULL, stdout=FNULL)
-    proc.communicate()
-    for item in os.listdir("."):
-        if item.endswith(".plist"):
-            shutil.move(item, os.path.join(outdir, item))
+    # clang writes a .plist per source file to the working directory
+    return runner.run_tool(cmd, workdir, stderr=FNULL, stdout=FNULL)
+
 
-runner.main(handler)
+if __name__ == "__main__":
+    runner.main(handler, get_command, ["clang", "--version"])
@@ -36,15 +36,14 @@
 # 
 # DM18-0995
 # 
+import xml.etree.ElementTree as ET
 import runner
-import subprocess
 import os
-import uuid
 
 
-def handler(tc, tc_support, outdir):
+def get_command(tc, tc_support):
     src_files, headers = tc
-    header_dirs = set([os.path.split(hdr)[0] for hdr in headers])
+    header_dirs = sorted(set([os.path.split(hdr)[0] for hdr in headers]))
 
     cmd = ["cppcheck", "--xml", "--enable=all"]
     cmd += ["-I", tc_support]
@@ -52,12 +51,66 @@ def handler(tc, tc_support, outdir):
         cmd += ["-I", hd]
 
     cmd += src_files
+    return cmd
 
-    filename = str(uuid.uuid4()) + ".xml"
+
+def handler(tc, tc_support, workdir):
+    cmd = get_command(tc, tc_support)
+    filename = runner.get_output_name(tc, ".xml")
+    FNULL = open(os.devnull, 'w')
+    with open(os.path.join(workdir, filename), 'wb') as outfile:
+        return runner.run_tool(cmd, workdir, stderr=outfile, stdout=FNULL)
+
+
+def split_results(results_file, tcs, tc_dirs):
+    """Split the XML results of a batch into one file per test case
+
+    Errors are attributed to the test case whose source or header file
+    they are located in. Errors located elsewhere, e.g. in the
+    testcasesupport headers, or with no location, are attributed to every
+    test case, as each would have reported them if analyzed alone.
+    """
+    owners = dict()
+    for i, (src_files, headers) in enumerate(tcs):
+        for path in src_files + headers:
+            owners.setdefault(os.path.normpath(path), []).append(i)
+
+    root = ET.parse(results_file).getroot()
+    errors = [[] for tc in tcs]
+    everyone = list(range(len(tcs)))
+    for error in root.iter("error"):
+        location = error.find("location")
+        owner = everyone
+        if location is not None:
+            path = os.path.normpath(location.get("file"))
+            owner = owners.get(path, everyone)
+        for i in owner:
+            errors[i].append(error)
+
+    for tc, tc_dir, tc_errors in zip(tcs, tc_dirs, errors):
+        tc_root = ET.Element(root.tag, root.attrib)
+        for child in root:
+            if child.tag != "errors":
+                tc_root.append(child)
+        ET.SubElement(tc_root, "errors").extend(tc_errors)
+        filename = runner.get_output_name(tc, ".xml")
+        ET.ElementTree(tc_root).write(os.path.join(tc_dir, filename),
+                                      encoding="utf-8", xml_declaration=True)
+
+
+def batch_handler(tcs, tc_support, workdir, tc_dirs):
+    # cppcheck analyzes each source file on its own, so test cases sharing
+    # include directories can be analyzed in one run
+    cmd = get_command(runner.merge_test_cases(tcs), tc_support)
+    results_file = os.path.join(workdir, "batch.xml")
     FNULL = open(os.devnull, 'w')
-    with open(os.path.join(outdir, filename), 'wb') as outfile:
-        proc = subprocess.Popen(cmd, stderr=outfile, stdout=FNULL)
-    proc.communicate()
+    with open(results_file, 'wb') as outfile:
+        metrics = runner.run_tool(cmd, workdir, stderr=outfile, stdout=FNULL)
+    if metrics["status"] == 0:
+        split_results(results_file, tcs, tc_dirs)
+    return metrics
 
 
-runner.main(handler)
+if __name__ == "__main__":
+    runner.main(handler, get_command, ["cppcheck", "--version"],
+                batch_handler)
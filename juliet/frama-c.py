@@ -37,15 +37,12 @@
 # DM18-0995
 # 
 import runner
-import subprocess
 import os
-import uuid
-import shutil
 
 
-def handler(tc, tc_support, outdir):
+def get_command(tc, tc_support):
     src_files, headers = tc
-    header_dirs = set([os.path.split(hdr)[0] for hdr in headers])
+    header_dirs = sorted(set([os.path.split(hdr)[0] for hdr in headers]))
 
     cmd = ["frama-c", "-val"]
     includes = "-DINCLUDEMAIN -I" + tc_support
@@ -53,11 +50,16 @@ def handler(tc, tc_support, outdir):
         includes += " -I" + hd
     cmd += ['-cpp-extra-args=' + includes]
     cmd += src_files
+    return cmd
 
-    filename = str(uuid.uuid4()) + ".txt"
+
+def handler(tc, tc_support, workdir):
+    cmd = get_command(tc, tc_support)
+    filename = runner.get_output_name(tc, ".txt")
     FNULL = open(os.devnull, 'w')
-    with open(os.path.join(outdir, filename), 'wb') as outfile:
-        proc = subprocess.Popen(cmd, stderr=FNULL, stdout=outfile)
-        proc.communicate()
+    with open(os.path.join(workdir, filename), 'wb') as outfile:
+        return runner.run_tool(cmd, workdir, stderr=FNULL, stdout=outfile)
+
 
-runner.main(handler)
+if __name__ == "__main__":
+    runner.main(handler, get_command, ["frama-c", "-version"])
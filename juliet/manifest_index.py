@@ -0,0 +1,270 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""manifest_index.py: Compiled index of the Juliet manifest
+
+The Juliet manifest.xml is large, so rather than parsing it on every run,
+it is streamed once into an SQLite index of test cases, their files and
+the flaws in each file. The index is recompiled whenever the manifest's
+size or modification time changes.
+"""
+import xml.etree.ElementTree as ET
+import logging
+import os
+import sqlite3
+
+# Bump when the schema changes, to force recompilation of old indexes
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    testcase INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE TABLE flaws (
+    id INTEGER PRIMARY KEY,
+    file INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    cwe INTEGER NOT NULL
+);
+CREATE INDEX files_testcase ON files (testcase);
+CREATE INDEX flaws_file ON flaws (file);
+CREATE INDEX flaws_cwe ON flaws (cwe);
+"""
+
+
+def parse_cwe(name):
+    """Return the CWE number of a flaw name, e.g. 121 for 'CWE-121: ...'"""
+    cwe_str = name.split(":")[0]
+    return int(cwe_str.replace("CWE-", "").lstrip("0"))
+
+
+def get_manifest_stamp(manifest_file):
+    """Return the string identifying a version of the manifest"""
+    stat = os.stat(manifest_file)
+    return "{}:{}:{!r}".format(SCHEMA_VERSION, stat.st_size, stat.st_mtime)
+
+
+def compile_index(manifest_file, conn):
+    """Stream the manifest into an empty database
+
+    Args:
+        manifest_file (str): path to the Juliet manifest.xml
+        conn (sqlite3.Connection): database to create the index in
+    """
+    conn.executescript(SCHEMA)
+    testcase = 0
+    root = None
+    for event, elem in ET.iterparse(manifest_file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            elif elem.tag == "testcase":
+                testcase += 1
+            continue
+
+        if elem.tag == "file":
+            cursor = conn.execute(
+                "INSERT INTO files (testcase, path) VALUES (?, ?)",
+                (testcase, elem.get("path").strip()))
+            # Children of a file are <flaw> and <mixed> elements
+            conn.executemany(
+                "INSERT INTO flaws (file, kind, line, name, cwe) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, flaw.tag, int(flaw.get("line")),
+                  flaw.get("name"), parse_cwe(flaw.get("name")))
+                 for flaw in elem])
+        elif elem.tag == "testcase":
+            # Drop parsed test cases so memory use stays flat
+            root.clear()
+
+    conn.execute("INSERT INTO meta VALUES ('stamp', ?)",
+                 (get_manifest_stamp(manifest_file),))
+    conn.commit()
+
+
+def is_current(index_file, manifest_file):
+    """Return whether an index file was compiled from the current manifest"""
+    if not os.path.exists(index_file):
+        return False
+    conn = sqlite3.connect(index_file)
+    try:
+        row = conn.execute(
+            "SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+    return row is not None and row[0] == get_manifest_stamp(manifest_file)
+
+
+def open_index(manifest_file, index_file=None):
+    """Open the index of a manifest, compiling it if it is out of date
+
+    Args:
+        manifest_file (str): path to the Juliet manifest.xml
+        index_file (str): path to the index; defaults to manifest_file
+            with an added ".index" extension. If it cannot be written, the
+            index is compiled in memory instead.
+
+    Returns:
+        conn (sqlite3.Connection): connection to the index
+    """
+    if index_file is None:
+        index_file = manifest_file + ".index"
+    if is_current(index_file, manifest_file):
+        return sqlite3.connect(index_file)
+
+    tmp_file = "{}.{}.tmp".format(index_file, os.getpid())
+    try:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        conn = sqlite3.connect(tmp_file)
+    except (OSError, sqlite3.Error):
+        logging.warning("Cannot write %s, indexing %s in memory",
+                        index_file, manifest_file)
+        conn = sqlite3.connect(":memory:")
+        compile_index(manifest_file, conn)
+        return conn
+
+    logging.info("Compiling %s to %s", manifest_file, index_file)
+    try:
+        compile_index(manifest_file, conn)
+        conn.close()
+        # Replace the old index atomically
+        os.rename(tmp_file, index_file)
+    except BaseException:
+        conn.close()
+        os.remove(tmp_file)
+        raise
+    return sqlite3.connect(index_file)
+
+
+def iter_test_case_files(conn, cwes):
+    """Iterate over test cases with flaws of the given CWEs
+
+    Args:
+        conn (sqlite3.Connection): as returned by open_index()
+        cwes (set of int): CWEs to select test cases by
+
+    Yields:
+        files (list of tuple): (path, flaw_cwes) for each file of a test
+            case in manifest order, where flaw_cwes is the list of CWEs of
+            the file's <flaw> elements
+    """
+    cwe_list = sorted(cwes)
+    rows = conn.execute(
+        "SELECT files.testcase, files.id, files.path, flaws.cwe FROM files "
+        "LEFT JOIN flaws ON flaws.file = files.id AND flaws.kind = 'flaw' "
+        "WHERE files.testcase IN ("
+        "  SELECT DISTINCT files.testcase FROM flaws "
+        "  JOIN files ON files.id = flaws.file "
+        "  WHERE flaws.kind = 'flaw' AND flaws.cwe IN ({})) "
+        "ORDER BY files.id, flaws.id".format(",".join("?" * len(cwe_list))),
+        cwe_list)
+
+    testcase = None
+    file_id = None
+    files = []
+    for tc, fid, path, cwe in rows:
+        if tc != testcase:
+            if files:
+                yield files
+            testcase = tc
+            files = []
+        if fid != file_id:
+            file_id = fid
+            files.append((path, []))
+        if cwe is not None:
+            files[-1][1].append(cwe)
+    if files:
+        yield files
+
+
+def iter_flaws(conn, kinds=("flaw",)):
+    """Iterate over the flaws in all files, in manifest order
+
+    Args:
+        conn (sqlite3.Connection): as returned by open_index()
+        kinds (tuple of str): kinds of flaws to include: "flaw" and/or
+            "mixed"
+
+    Yields:
+        (path, line, name, cwe) of each flaw
+    """
+    return conn.execute(
+        "SELECT files.path, flaws.line, flaws.name, flaws.cwe FROM flaws "
+        "JOIN files ON files.id = flaws.file "
+        "WHERE flaws.kind IN ({}) ORDER BY flaws.id".format(
+            ",".join("?" * len(kinds))),
+        kinds)
+
+
+def iter_file_paths(conn):
+    """Iterate over the paths of all files, in manifest order"""
+    return (row[0] for row in
+            conn.execute("SELECT path FROM files ORDER BY id"))
+
+
+def get_file_cwes(conn, cwes):
+    """Map the files of test cases with flaws of the given CWEs to the CWEs
+
+    Args:
+        conn (sqlite3.Connection): as returned by open_index()
+        cwes (set of int): CWEs to select test cases by
+
+    Returns:
+        file_cwes (dict): maps the path of each file of a selected test
+            case to the set of CWEs its test case was selected for
+    """
+    cwe_list = sorted(cwes)
+    file_cwes = dict()
+    rows = conn.execute(
+        "SELECT DISTINCT files.path, flaws.cwe FROM flaws "
+        "JOIN files AS flawed ON flawed.id = flaws.file "
+        "JOIN files ON files.testcase = flawed.testcase "
+        "WHERE flaws.kind = 'flaw' AND flaws.cwe IN ({})".format(
+            ",".join("?" * len(cwe_list))),
+        cwe_list)
+    for path, cwe in rows:
+        file_cwes.setdefault(path, set()).add(cwe)
+    return file_cwes
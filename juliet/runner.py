@@ -36,29 +36,176 @@
 # 
 # DM18-0995
 # 
-import xml.etree.ElementTree as ET
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
 import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, namedtuple
 
+import manifest_index
+
+try:
+    from os import scandir
+except ImportError:
+    # Python 2, used by the tool images
+    scandir = None
+
+# Name of the file index kept in the root of the indexed directory
+FILE_INDEX_NAME = ".file_index.json"
+
+# Prefix of the scratch directories jobs run in, inside the output
+# directory so that finished outputs can be renamed into place atomically
+SCRATCH_PREFIX = ".job-"
+
+# Bounds on each tool run: wall clock and CPU seconds, and address space
+# in MB; 0 means unbounded
+Limits = namedtuple("Limits", ["timeout", "cpu", "memory"])
+_limits = Limits(0, 0, 0)
+
+# Status recorded for runs killed at the timeout, as timeout(1) does
+TIMEOUT_STATUS = 124
+
+METRICS_COLUMNS = ["job", "wall", "user", "sys", "status"]
+
+
+def list_dir(path):
+    """Return the names of the files and of the subdirectories in a dir"""
+    files = []
+    subdirs = []
+    if scandir is not None:
+        for entry in scandir(path):
+            (subdirs if entry.is_dir() else files).append(entry.name)
+    else:
+        for name in os.listdir(path):
+            is_dir = os.path.isdir(os.path.join(path, name))
+            (subdirs if is_dir else files).append(name)
+    return sorted(files), sorted(subdirs)
+
+
+def scan_tree(start, cached_dirs):
+    """List all files under a directory, reusing unchanged listings
+
+    A directory's mtime changes whenever an entry is added to, removed
+    from or renamed in it, so a directory whose mtime matches its cached
+    listing is not listed again.
+
+    Args:
+        start (str): directory to scan
+        cached_dirs (dict): maps directory paths relative to start to
+            {"mtime": float, "files": [str], "subdirs": [str]}, as
+            returned by a previous scan
+
+    Returns:
+        dirs (dict): the listing of each directory, as cached_dirs
+        changed (bool): whether any listing differs from cached_dirs
+    """
+    dirs = dict()
+    changed = False
+    pending = ["."]
+    while pending:
+        rel_dir = pending.pop()
+        path = os.path.join(start, rel_dir)
+        mtime = os.stat(path).st_mtime
+        listing = cached_dirs.get(rel_dir)
+        if listing is None or listing["mtime"] != mtime:
+            files, subdirs = list_dir(path)
+            # Leave out the file index itself
+            files = [name for name in files
+                     if not name.startswith(FILE_INDEX_NAME)]
+            changed = changed or listing is None or \
+                (listing["files"], listing["subdirs"]) != (files, subdirs)
+            listing = {"mtime": mtime, "files": files, "subdirs": subdirs}
+        dirs[rel_dir] = listing
+        pending.extend(os.path.normpath(os.path.join(rel_dir, name))
+                       for name in listing["subdirs"])
+    return dirs, changed or set(dirs) != set(cached_dirs)
+
+
+def build_file_index(start, index_file=None):
+    """Map the names of files under a directory to their paths
+
+    The listing of the tree is kept in index_file and only the
+    directories that changed since the last call are listed again. Files
+    are looked up by name, since that is how the Juliet manifest refers to
+    them; if several files share a name, the first path in sorted order is
+    used. Juliet has many such names (e.g. a Makefile and main.c in every
+    CWE directory), so only their number is logged.
+
+    Args:
+        start (str): directory to index
+        index_file (str): path to keep the listing in; defaults to
+            FILE_INDEX_NAME in start
+
+    Returns:
+        file_index (dict): maps file names to paths
+    """
+    if index_file is None:
+        index_file = os.path.join(start, FILE_INDEX_NAME)
+    cached_dirs = dict()
+    try:
+        with open(index_file, "r") as fid:
+            cached_dirs = json.load(fid)
+    except (IOError, OSError, ValueError):
+        pass
+
+    dirs, changed = scan_tree(start, cached_dirs)
+    if changed:
+        logging.info("Updating file index %s", index_file)
+        tmp_file = "{}.{}.tmp".format(index_file, os.getpid())
+        try:
+            with open(tmp_file, "w") as fid:
+                json.dump(dirs, fid)
+            os.rename(tmp_file, index_file)
+        except (IOError, OSError):
+            logging.warning("Cannot write file index %s", index_file)
+
+    paths = defaultdict(list)
+    for rel_dir, listing in dirs.items():
+        for name in listing["files"]:
+            paths[name].append(os.path.normpath(
+                os.path.join(start, rel_dir, name)))
 
-def build_file_index(start):
     file_index = dict()
-    for root, dirs, files in os.walk(start):
-        for name in files:
-            path = os.path.join(root, name)
-            file_index[name] = path
+    shared = 0
+    for name, name_paths in paths.items():
+        name_paths.sort()
+        if len(name_paths) > 1:
+            shared += 1
+            logging.debug("%d files named %s, using %s", len(name_paths),
+                          name, name_paths[0])
+        file_index[name] = name_paths[0]
+    if shared:
+        logging.info("%d file names are shared by several files under %s",
+                     shared, start)
     return file_index
 
 
 def iter_test_cases(manifest_file, cwes, file_index):
-    tree = ET.parse(manifest_file)
-    root = tree.getroot()
-    for testcase in root.iter("testcase"):
+    # Read the test cases up front: the connection can only be used from
+    # the thread that made it, and the pool consumes jobs in another one
+    conn = manifest_index.open_index(manifest_file)
+    try:
+        test_cases = list(manifest_index.iter_test_case_files(conn, cwes))
+    finally:
+        conn.close()
+
+    for files in test_cases:
         src_files = []
         headers = []
         match = False
 
-        for testfile in testcase.iter("file"):
-            name = testfile.get("path").strip()
+        for name, flaw_cwes in files:
             if name not in file_index:
                 continue
             path = file_index[name]
@@ -70,25 +217,432 @@ def iter_test_cases(manifest_file, cwes, file_index):
                     break
                 src_files.append(path)
 
-            for flaw in testfile.iter("flaw"):
-                cwe_str = flaw.get("name").split(":")[0]
-                cwe = int(cwe_str.replace("CWE-", "").lstrip("0"))
-                if cwe in cwes:
-                    match = True
+            if any(cwe in cwes for cwe in flaw_cwes):
+                match = True
 
         if match:
             yield (src_files, headers)
 
 
-def main(handler):
-    import sys
-    juliet_c_dir = sys.argv[1]
-    outdir = sys.argv[2]
-    cwes = set([int(x) for x in sys.argv[3:]])
+def get_output_name(tc, ext):
+    """Return the name of a test case's output file
+
+    Outputs are named after the test case's first source file, or header
+    if it has none, so that rerunning a tool replaces its previous outputs.
+    """
+    src_files, headers = tc
+    first = (src_files + headers)[0]
+    return os.path.splitext(os.path.basename(first))[0] + ext
+
+
+def clean_scratch_dirs(outdir):
+    """Remove scratch directories left behind by interrupted runs"""
+    for name in os.listdir(outdir):
+        if name.startswith(SCRATCH_PREFIX):
+            shutil.rmtree(os.path.join(outdir, name), ignore_errors=True)
+
+
+def hash_files(paths, digest):
+    """Update a hash with the names and contents of files"""
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as fid:
+            digest.update(hashlib.sha256(fid.read()).digest())
+
+
+def get_tool_version(version_cmd):
+    """Return the output of a command printing the tool's version"""
+    proc = subprocess.Popen(version_cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    return proc.communicate()[0]
+
+
+class ResultCache(object):
+    """Tool outputs stored by a hash of everything that determines them
+
+    An entry is a directory named by the hash of the test case's source
+    and header files, the testcasesupport files, the tool command line
+    and the tool version, holding the tool's output files.
+    """
+
+    def __init__(self, cache_dir, tc_support, tool_version):
+        """Set up the cache
+
+        Args:
+            cache_dir (str): directory storing the entries
+            tc_support (str): path to the Juliet testcasesupport directory
+            tool_version (bytes): output of the tool's version command
+        """
+        self.cache_dir = cache_dir
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        clean_scratch_dirs(cache_dir)
+
+        digest = hashlib.sha256(tool_version)
+        hash_files(sorted(os.path.join(tc_support, name)
+                          for name in os.listdir(tc_support)
+                          if os.path.isfile(os.path.join(tc_support, name))),
+                   digest)
+        self.salt = digest.digest()
+
+    def get_key(self, tc, cmd):
+        """Return the key of running cmd on test case tc"""
+        src_files, headers = tc
+        digest = hashlib.sha256(self.salt)
+        hash_files(src_files + sorted(headers), digest)
+        digest.update(json.dumps(cmd).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key, workdir):
+        """Copy the outputs stored under key to workdir
+
+        Returns:
+            (bool): whether the key was found
+        """
+        entry = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(entry):
+            return False
+        for name in os.listdir(entry):
+            shutil.copy(os.path.join(entry, name), workdir)
+        return True
+
+    def put(self, key, workdir):
+        """Store the outputs in workdir under key"""
+        tmp = tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=self.cache_dir)
+        for name in os.listdir(workdir):
+            shutil.copy(os.path.join(workdir, name), tmp)
+        try:
+            os.rename(tmp, os.path.join(self.cache_dir, key))
+        except OSError:
+            # another job stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _limit_child():
+    """Put a tool in its own process group and apply the resource limits"""
+    os.setsid()
+    if _limits.cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (_limits.cpu, _limits.cpu))
+    if _limits.memory:
+        size = _limits.memory * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+
+
+def _kill_group(pid, timed_out):
+    timed_out.append(True)
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def run_tool(cmd, workdir, stdout=None, stderr=None):
+    """Run a tool within the resource limits and measure it
+
+    The tool is killed with its subprocesses if it runs past the timeout.
+
+    Args:
+        cmd (list of str): command line
+        workdir (str): working directory of the tool
+        stdout, stderr (file): where to send the tool's output
+
+    Returns:
+        metrics (dict): "wall", "user" and "sys" seconds the tool took,
+            and its exit "status": negative if killed by a signal,
+            TIMEOUT_STATUS if it timed out
+    """
+    start = time.time()
+    proc = subprocess.Popen(cmd, stdout=stdout, stderr=stderr, cwd=workdir,
+                            preexec_fn=_limit_child)
+    timed_out = []
+    timer = None
+    if _limits.timeout:
+        timer = threading.Timer(_limits.timeout, _kill_group,
+                                (proc.pid, timed_out))
+        timer.start()
+    # wait4 reports the CPU time of the tool and of its subprocesses
+    _, wait_status, usage = os.wait4(proc.pid, 0)
+    wall = time.time() - start
+    if timer is not None:
+        timer.cancel()
+
+    if os.WIFSIGNALED(wait_status):
+        proc.returncode = -os.WTERMSIG(wait_status)
+    else:
+        proc.returncode = os.WEXITSTATUS(wait_status)
+    return {
+        "wall": wall,
+        "user": usage.ru_utime,
+        "sys": usage.ru_stime,
+        "status": TIMEOUT_STATUS if timed_out else proc.returncode
+    }
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of sorted values"""
+    rank = max(int(-(-pct * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+def summarize_metrics(tool, rows):
+    """Return a one-line summary of the metrics of a tool's runs"""
+    if not rows:
+        return "{}: no runs".format(tool)
+    walls = sorted(row["wall"] for row in rows)
+    timeouts = sum(row["status"] == TIMEOUT_STATUS for row in rows)
+    failures = sum(row["status"] not in (0, TIMEOUT_STATUS) for row in rows)
+    return ("{}: {} runs, wall seconds p50 {:.2f} p90 {:.2f} p99 {:.2f} "
+            "max {:.2f}, cpu seconds {:.1f}, {} timed out, {} failed").format(
+                tool, len(rows), percentile(walls, 50), percentile(walls, 90),
+                percentile(walls, 99), walls[-1],
+                sum(row["user"] + row["sys"] for row in rows),
+                timeouts, failures)
+
+
+def write_metrics(rows, fid):
+    """Write the metrics of tool runs as CSV"""
+    writer = csv.writer(fid)
+    writer.writerow(METRICS_COLUMNS)
+    for row in rows:
+        writer.writerow([row["job"]] + ["{:.3f}".format(row[col])
+                                        for col in ("wall", "user", "sys")] +
+                        [row["status"]])
+
+
+def get_batch_key(tc):
+    """Return what test cases must share to be analyzed in one batch"""
+    src_files, headers = tc
+    return tuple(sorted(set(os.path.dirname(hdr) for hdr in headers)))
+
+
+def iter_batches(tcs, batch_size):
+    """Group test cases that share include directories into batches
+
+    Args:
+        tcs (iterable of tuple): (src_files, headers) of each test case
+        batch_size (int): maximum number of source files in a batch; a
+            test case with more source files is a batch on its own
+
+    Yields:
+        batch (list of tuple): test cases
+    """
+    pending = defaultdict(list)
+    num_files = defaultdict(int)
+    for tc in tcs:
+        key = get_batch_key(tc)
+        if pending[key] and num_files[key] + len(tc[0]) > batch_size:
+            yield pending.pop(key)
+            num_files[key] = 0
+        pending[key].append(tc)
+        num_files[key] += len(tc[0])
+    for key in sorted(pending):
+        yield pending[key]
+
+
+def merge_test_cases(tcs):
+    """Return a test case made of the files of several test cases"""
+    src_files = []
+    headers = []
+    for tc_src_files, tc_headers in tcs:
+        src_files += tc_src_files
+        headers += tc_headers
+    return (src_files, headers)
+
+
+def run_job(handler, tcs, tc_support, outdir, get_command=None, cache=None,
+            batch_handler=None):
+    """Run a handler on a batch of test cases in a scratch directory
+
+    Each test case is given an empty scratch directory to write its
+    outputs to. Once the tool returns, each output is renamed into outdir,
+    so outdir only ever holds complete outputs. If a cache is given and
+    holds the outputs of the same command on the same files, those are
+    used instead of running the tool; only successful runs are cached.
+
+    Test cases not found in the cache are analyzed by one run of
+    batch_handler if there are several of them, or else by handler. If
+    the batch run fails, each test case is analyzed by handler instead.
+
+    Args:
+        handler (callable): handler(tc, tc_support, workdir) runs the tool
+            with workdir as working directory and returns the metrics from
+            run_tool()
+        tcs (list of tuple): (src_files, headers) of the test cases
+        tc_support (str): path to the Juliet testcasesupport directory
+        outdir (str): directory to move the outputs to
+        get_command (callable): get_command(tc, tc_support) returns the
+            command line the handler runs; required if cache is given
+        cache (ResultCache): cache of tool outputs, or None
+        batch_handler (callable): batch_handler(tcs, tc_support, workdir,
+            tc_dirs) runs the tool once on several test cases, writing the
+            outputs of tcs[i] to tc_dirs[i], and returns the metrics from
+            run_tool(); required if there are several test cases
+
+    Returns:
+        hits (int): the number of test cases whose outputs came from the
+            cache
+        num_tcs (int): the number of test cases
+        metrics (list of dict): the metrics of each tool run, with the
+            "job" name added
+    """
+    workdir = tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=outdir)
+    metrics = []
+    try:
+        tc_dirs = [tempfile.mkdtemp(dir=workdir) for tc in tcs]
+        keys = [None] * len(tcs)
+        missing = []
+        for i, tc in enumerate(tcs):
+            if cache is not None:
+                keys[i] = cache.get_key(tc, get_command(tc, tc_support))
+                if cache.get(keys[i], tc_dirs[i]):
+                    continue
+            missing.append(i)
+
+        missing_runs = []
+        if len(missing) > 1:
+            run = batch_handler([tcs[i] for i in missing], tc_support,
+                                workdir, [tc_dirs[i] for i in missing])
+            run["job"] = "{}+{}".format(
+                get_output_name(tcs[missing[0]], ""), len(missing) - 1)
+            metrics.append(run)
+            if run["status"] == 0:
+                missing_runs = [(i, run) for i in missing]
+            else:
+                # Retry the test cases one at a time
+                for i in missing:
+                    shutil.rmtree(tc_dirs[i])
+                    os.mkdir(tc_dirs[i])
+        if not missing_runs:
+            for i in missing:
+                run = handler(tcs[i], tc_support, tc_dirs[i])
+                run["job"] = get_output_name(tcs[i], "")
+                metrics.append(run)
+                missing_runs.append((i, run))
+
+        # Failed runs may have hit the resource limits, so are not kept
+        if cache is not None:
+            for i, run in missing_runs:
+                if run["status"] == 0:
+                    cache.put(keys[i], tc_dirs[i])
+        for tc_dir in tc_dirs:
+            for name in os.listdir(tc_dir):
+                os.rename(os.path.join(tc_dir, name),
+                          os.path.join(outdir, name))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return len(tcs) - len(missing), len(tcs), metrics
+
+
+# Arguments of run_job shared by all jobs of a worker, set by _init_worker
+_worker_args = None
+
+
+def _init_worker(handler, get_command, cache, batch_handler, limits):
+    global _worker_args, _limits
+    _worker_args = (handler, get_command, cache, batch_handler)
+    _limits = limits
+
+
+def _run_worker_job(args):
+    handler, get_command, cache, batch_handler = _worker_args
+    return run_job(handler, *args, get_command=get_command, cache=cache,
+                   batch_handler=batch_handler)
+
+
+def main(handler, get_command=None, version_cmd=None, batch_handler=None):
+    """Run a tool on the Juliet test cases selected on the command line
+
+    Args:
+        handler (callable): handler(tc, tc_support, workdir) runs the tool
+            on a test case with run_tool(), writing its outputs to workdir
+        get_command (callable): get_command(tc, tc_support) returns the
+            command line the handler runs, needed for --cache_dir
+        version_cmd (list of str): command printing the tool's version,
+            needed for --cache_dir
+        batch_handler (callable): runs the tool on several test cases at
+            once, needed for --batch_size; see run_job()
+    """
+    global _limits
+    parser = argparse.ArgumentParser(
+        description="Run a tool on Juliet test cases")
+    parser.add_argument("juliet_c_dir", help="Juliet C directory")
+    parser.add_argument("outdir", help="Directory to write tool outputs to")
+    parser.add_argument("cwes", nargs="+", type=int,
+                        help="CWEs to select test cases by")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of tool runs in parallel (0: all cores)")
+    parser.add_argument("--cache_dir",
+                        help=("Reuse tool outputs stored here when the test "
+                              "case, command line and tool version match"))
+    parser.add_argument("--timeout", type=float, default=0,
+                        help="Kill tool runs after this many seconds")
+    parser.add_argument("--cpu_limit", type=int, default=0,
+                        help="Limit tool runs to this many CPU seconds")
+    parser.add_argument("--mem_limit", type=int, default=0,
+                        help="Limit tool runs to this many MB of memory")
+    parser.add_argument("--batch_size", type=int, default=1,
+                        help=("Analyze test cases sharing include "
+                              "directories together, up to this many "
+                              "source files per tool run"))
+    parser.add_argument("--metrics_file",
+                        help=("Write the time and exit status of each tool "
+                              "run to this CSV file"))
+    args = parser.parse_args()
+    logging.basicConfig()
+    if args.cache_dir is not None and (get_command is None or
+                                       version_cmd is None):
+        parser.error("This tool does not support --cache_dir")
+    if args.batch_size > 1 and batch_handler is None:
+        parser.error("This tool does not support --batch_size")
+
+    # Tools run in scratch directories, so paths must not be relative
+    juliet_c_dir = os.path.abspath(args.juliet_c_dir)
+    outdir = os.path.abspath(args.outdir)
+    cwes = set(args.cwes)
     manifest_file = os.path.join(juliet_c_dir, "manifest.xml")
     tc_support = os.path.join(juliet_c_dir, "testcasesupport")
-    src_dir = os.path.join(juliet_c_dir, "testcases")
     file_index = build_file_index(juliet_c_dir)
+    clean_scratch_dirs(outdir)
+    _limits = Limits(args.timeout, args.cpu_limit, args.mem_limit)
+
+    cache = None
+    if args.cache_dir is not None:
+        cache = ResultCache(os.path.abspath(args.cache_dir), tc_support,
+                            get_tool_version(version_cmd))
+
+    tcs = iter_test_cases(manifest_file, cwes, file_index)
+    if args.batch_size > 1:
+        batches = iter_batches(tcs, args.batch_size)
+    else:
+        batches = ([tc] for tc in tcs)
+    jobs = ((batch, tc_support, outdir) for batch in batches)
+    num_procs = args.jobs or multiprocessing.cpu_count()
+    if num_procs == 1:
+        results = [run_job(handler, *job, get_command=get_command,
+                           cache=cache, batch_handler=batch_handler)
+                   for job in jobs]
+    else:
+        pool = multiprocessing.Pool(num_procs, _init_worker,
+                                    (handler, get_command, cache,
+                                     batch_handler, _limits))
+        try:
+            results = list(pool.imap_unordered(_run_worker_job, jobs))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    if cache is not None:
+        sys.stderr.write("{} of {} test cases reused from {}\n".format(
+            sum(result[0] for result in results),
+            sum(result[1] for result in results), args.cache_dir))
 
-    for tc in iter_test_cases(manifest_file, cwes, file_index):
-        handler(tc, tc_support, outdir)
+    rows = sorted((row for (_, _, metrics) in results for row in metrics),
+                  key=lambda row: row["job"])
+    tool = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    sys.stderr.write(summarize_metrics(tool, rows) + "\n")
+    if args.metrics_file is not None:
+        with open(args.metrics_file, "w") as fid:
+            write_metrics(rows, fid)
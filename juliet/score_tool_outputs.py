@@ -43,7 +43,10 @@ import csv
 import logging
 from pathlib import PurePath
 from collections import defaultdict, namedtuple
-import xml.etree.ElementTree as ET
+
+from sparser import compression
+
+import manifest_index
 
 Alert = namedtuple('Alert', ["tool", "checker", "file", "line", "message"])
 
@@ -69,7 +72,7 @@ def is_whitelisted(alert, whitelist):
 
 def load_alerts(alerts_path, whitelist):
     result = []
-    with open(alerts_path, "r") as fid:
+    with compression.open_text_input(alerts_path) as fid:
         for alert in csv.reader(fid):
             try:
                 alert_obj = Alert._make(alert)
@@ -81,22 +84,84 @@ def load_alerts(alerts_path, whitelist):
 
 
 def get_flaws(manifest_file, cwes):
-    tree = ET.parse(manifest_file)
-    root = tree.getroot()
+    """Get the flaw locations of each CWE and the CWEs of each file
+
+    Args:
+        manifest_file (str): path to the Juliet manifest.xml
+        cwes (set of int): CWEs to score
+
+    Returns:
+        flaws (dict): maps each CWE to the list of its (file name, line)
+            flaw locations
+        file_cwes (dict): maps the name of each file of a test case of the
+            CWEs to the set of CWEs of its test case
+    """
+    conn = manifest_index.open_index(manifest_file)
     flaws = defaultdict(list)
-    for testcase in root.iter("testcase"):
-        for testfile in testcase.iter("file"):
-            name = testfile.get("path")
+    try:
+        for name, line, _, cwe in manifest_index.iter_flaws(conn):
             if name.endswith(".cpp"):
                 continue
-
-            for flaw in testfile.iter("flaw"):
-                cwe_str = flaw.get("name").split(":")[0]
-                cwe = int(cwe_str.replace("CWE-", "").lstrip("0"))
-                if cwe in cwes:
-                    line = int(flaw.get("line"))
-                    flaws[name].append(line)
-    return flaws
+            if cwe in cwes:
+                flaws[cwe].append((name, line))
+        file_cwes = manifest_index.get_file_cwes(conn, cwes)
+    finally:
+        conn.close()
+    return flaws, file_cwes
+
+
+def score_alerts(alerts, flaws, file_cwes, cwes):
+    """Count each tool's true and false positives and false negatives
+
+    A flaw is a true positive of a tool if the tool alerted on its line,
+    and a false negative otherwise. An alert is a false positive of a CWE
+    if it is not on a flaw of that CWE, and is in a file of one of the
+    CWE's test cases, or in a file that belongs to none of the CWEs
+    (e.g. testcasesupport files).
+
+    Args:
+        alerts (list of Alert): whitelisted alerts of all tools
+        flaws, file_cwes: as returned by get_flaws()
+        cwes (set of int): CWEs to score
+
+    Returns:
+        scores (dict): maps (cwe, tool) to {"tp": int, "fn": int,
+            "fp": int}
+    """
+    # CWEs of the flaws at each location
+    flaw_index = defaultdict(set)
+    for cwe, locations in flaws.items():
+        for location in locations:
+            flaw_index[location].add(cwe)
+
+    all_tools = set(a.tool for a in alerts)
+    scores = {(cwe, tool): {"tp": 0, "fn": 0, "fp": 0}
+              for cwe in cwes for tool in all_tools}
+
+    # Single pass over the alerts, noting hits and counting false positives
+    hits = defaultdict(set)
+    for alert in alerts:
+        name = PurePath(alert.file).name
+        location = (name, int(alert.line))
+        flaw_cwes = flaw_index.get(location, set())
+        if flaw_cwes:
+            hits[location].add(alert.tool)
+        for cwe in file_cwes.get(name, cwes) - flaw_cwes:
+            scores[(cwe, alert.tool)]["fp"] += 1
+
+    for cwe, locations in flaws.items():
+        for location in locations:
+            tools = hits.get(location, set())
+            for tool in tools:
+                # Indicate a positive response
+                scores[(cwe, tool)]["tp"] += 1
+                logging.debug("RESPONSE,%s,%s,%s,%d", cwe, tool, *location)
+            for other in (all_tools - tools):
+                # Indicate a negative response
+                scores[(cwe, other)]["fn"] += 1
+                logging.debug("NO_RESPONSE,%s,%s,%s,%d", cwe, other,
+                              *location)
+    return scores
 
 
 def load_checker_whitelist(whitelist_path):
@@ -112,6 +177,11 @@ if __name__ == "__main__":
     parser.add_argument("manifest")
     parser.add_argument("whitelist")
     parser.add_argument("alert_files", nargs="+")
+    parser.add_argument(
+        "--cwes",
+        type=lambda s: [int(cwe) for cwe in s.split(",")],
+        default=[121],
+        help="Comma-separated CWEs to score (default: 121)")
     parser.add_argument(
         '-v',
         action="store_const",
@@ -122,57 +192,18 @@ if __name__ == "__main__":
     args = parser.parse_args()
     logging.basicConfig(level=args.loglevel)
 
-    cwes = set([121])
-    flaws = get_flaws(args.manifest, cwes)
+    cwes = set(args.cwes)
+    flaws, file_cwes = get_flaws(args.manifest, cwes)
     whitelist = load_checker_whitelist(args.whitelist)
 
     alerts = []
     for alert_file in args.alert_files:
         alerts += load_alerts(alert_file, whitelist)
 
-    all_tools = set([a.tool for a in alerts])
-    alert_index = defaultdict(list)
-    for alert in alerts:
-        alert_index[(PurePath(alert.file).name, int(alert.line))].append(alert)
-
-    flaw_scores = {
-        # For each tool
-        tool: {
-            # True indicates a positive response
-            True: 0,
-            # False indicates a negative reponse
-            False: 0
-        }
-        for tool in all_tools
-    }
-
-    seen = set()
-    for filename, lines in flaws.items():
-        for line in lines:
-            seen.add((filename, line))
-            hits = alert_index[(filename, line)]
-            tools = set([h.tool for h in hits])
-
-            for tool in tools:
-                # Indicate a positive response
-                flaw_scores[tool][True] += 1
-                logging.debug("RESPONSE,%s,%s,%d", tool, filename, line)
-            for other in (all_tools - tools):
-                # Indicate a negative response
-                flaw_scores[other][False] += 1
-                logging.debug("NO_RESPONSE,%s,%s,%d", other, filename, line)
-
-    false_positives = defaultdict(int)
-
-    for alert in alerts:
-        location = (PurePath(alert.file).name, int(alert.line))
-        if location not in seen:
-            false_positives[alert.tool] += 1
+    scores = score_alerts(alerts, flaws, file_cwes, cwes)
 
     writer = csv.writer(sys.stdout)
-    writer.writerow(["tool", "tp", "fn", "fp"])
-    for tool in all_tools:
-        writer.writerow([
-            tool, flaw_scores[tool][True], flaw_scores[tool][False],
-            false_positives[tool]
-        ])
+    writer.writerow(["cwe", "tool", "tp", "fn", "fp"])
+    for (cwe, tool) in sorted(scores.keys()):
+        score = scores[(cwe, tool)]
+        writer.writerow([cwe, tool, score["tp"], score["fn"], score["fp"]])
@@ -0,0 +1,409 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""test_juliet.py: tests for running tools on Juliet and scoring them"""
+import logging
+import os
+import stat
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import cppcheck
+import manifest_index
+import runner
+import score_tool_outputs as sto
+
+MANIFEST = """<?xml version="1.0" encoding="utf-8"?>
+<container>
+  <testcase>
+    <file path="CWE121_a_01.c">
+      <flaw line="5" name="CWE-121: Stack-based Buffer Overflow"/>
+    </file>
+  </testcase>
+  <testcase>
+    <file path="CWE121_b_01a.c">
+      <flaw line="4" name="CWE-121: Stack-based Buffer Overflow"/>
+    </file>
+    <file path="CWE121_b_01b.c">
+      <mixed line="6" name="CWE-121: Stack-based Buffer Overflow"/>
+    </file>
+    <file path="CWE121_b.h"/>
+  </testcase>
+  <testcase>
+    <file path="CWE121_c_01.cpp">
+      <flaw line="3" name="CWE-121: Stack-based Buffer Overflow"/>
+    </file>
+  </testcase>
+  <testcase>
+    <file path="CWE122_a_01.c">
+      <flaw line="7" name="CWE-122: Heap-based Buffer Overflow"/>
+      <flaw line="9" name="CWE-190: Integer Overflow or Wraparound"/>
+    </file>
+  </testcase>
+  <testcase>
+    <file path="CWE476_a_01.c">
+      <flaw line="3" name="CWE-476: NULL Pointer Dereference"/>
+    </file>
+    <file path="missing.c"/>
+  </testcase>
+</container>
+"""
+
+FILES = {
+    "testcasesupport": ["std_testcase.h", "io.c"],
+    os.path.join("testcases", "CWE121", "s01"): [
+        "CWE121_a_01.c", "CWE121_b_01a.c", "CWE121_b_01b.c", "CWE121_b.h",
+        "CWE121_c_01.cpp"],
+    os.path.join("testcases", "CWE122", "s01"): ["CWE122_a_01.c"],
+    os.path.join("testcases", "CWE476", "s01"): ["CWE476_a_01.c"],
+}
+
+# Prints cppcheck --xml results to stderr: two errors in each source file,
+# one in the first include directory (testcasesupport) and one with no
+# location. Fails on more than STUB_MAX_SOURCES source files, if set.
+STUB_CPPCHECK = """#!{python}
+import os
+import sys
+
+args = sys.argv[1:]
+if args == ["--version"]:
+    sys.stdout.write("Cppcheck 1.84\\n")
+    sys.exit(0)
+sources = [arg for arg in args if arg.endswith(".c")]
+if len(sources) > int(os.environ.get("STUB_MAX_SOURCES", len(sources))):
+    sys.exit(1)
+support = args[args.index("-I") + 1]
+
+error = '<error id="{{0}}" severity="error" msg="{{0}}">{{1}}</error>'
+location = '<location file="{{0}}" line="{{1}}"/>'
+errors = []
+for path in sources:
+    for line in (1, 2):
+        errors.append(error.format("src", location.format(path, line)))
+errors.append(error.format(
+    "support", location.format(os.path.join(support, "std_testcase.h"), 1)))
+errors.append(error.format("noLocation", ""))
+sys.stderr.write(
+    '<?xml version="1.0" encoding="UTF-8"?>\\n<results version="2">\\n'
+    '<cppcheck version="1.84"/>\\n<errors>\\n{{}}\\n</errors>\\n'
+    '</results>\\n'.format("\\n".join(errors)))
+"""
+
+
+@pytest.fixture
+def juliet_dir(tmpdir):
+    """A tiny Juliet C directory: its manifest and (empty) test cases"""
+    root = tmpdir.mkdir("C")
+    root.join("manifest.xml").write(MANIFEST)
+    for (rel_dir, names) in FILES.items():
+        directory = root.join(rel_dir)
+        directory.ensure(dir=True)
+        for name in names:
+            directory.join(name).write(
+                "".join("/* {} line {} */\n".format(name, line)
+                        for line in range(1, 11)))
+    return str(root)
+
+
+@pytest.fixture
+def stub_cppcheck(tmpdir, monkeypatch):
+    """Put a stand-in for cppcheck first on the PATH"""
+    bin_dir = tmpdir.mkdir("bin")
+    path = bin_dir.join("cppcheck")
+    path.write(STUB_CPPCHECK.format(python=sys.executable))
+    path.chmod(path.stat().mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep +
+                       os.environ["PATH"])
+
+
+def get_test_cases(juliet_dir, cwes):
+    return list(runner.iter_test_cases(
+        os.path.join(juliet_dir, "manifest.xml"), cwes,
+        runner.build_file_index(juliet_dir)))
+
+
+def read_results(outdir):
+    """Read the errors of each cppcheck XML output in a directory"""
+    results = dict()
+    for name in os.listdir(outdir):
+        root = ET.parse(os.path.join(outdir, name)).getroot()
+        results[name] = [
+            (error.attrib, [(loc.tag, loc.attrib) for loc in error])
+            for error in root.iter("error")]
+    return results
+
+
+# The walk of the manifest XML that manifest_index replaces
+def walk_test_cases(manifest_file, cwes, file_index):
+    root = ET.parse(manifest_file).getroot()
+    for testcase in root.iter("testcase"):
+        src_files = []
+        headers = []
+        match = False
+        for testfile in testcase.iter("file"):
+            name = testfile.get("path").strip()
+            if name not in file_index:
+                continue
+            path = file_index[name]
+            if path.endswith(".h"):
+                headers.append(path)
+            else:
+                if path.endswith(".cpp"):
+                    match = False
+                    break
+                src_files.append(path)
+            for flaw in testfile.iter("flaw"):
+                if manifest_index.parse_cwe(flaw.get("name")) in cwes:
+                    match = True
+        if match:
+            yield (src_files, headers)
+
+
+def walk_flaws(manifest_file, cwes):
+    root = ET.parse(manifest_file).getroot()
+    flaws = []
+    for testfile in root.iter("file"):
+        name = testfile.get("path")
+        if name.endswith(".cpp"):
+            continue
+        for flaw in testfile.iter("flaw"):
+            if manifest_index.parse_cwe(flaw.get("name")) in cwes:
+                flaws.append((name, int(flaw.get("line"))))
+    return flaws
+
+
+class TestFileIndex():
+    def test_shared_names(self, juliet_dir, caplog):
+        for cwe in ["CWE121", "CWE122", "CWE476"]:
+            for name in ["main.c", "Makefile"]:
+                with open(os.path.join(juliet_dir, "testcases", cwe,
+                                       name), "w"):
+                    pass
+        caplog.set_level(logging.DEBUG)
+        file_index = runner.build_file_index(juliet_dir)
+        assert file_index["main.c"] == os.path.join(
+            juliet_dir, "testcases", "CWE121", "main.c")
+        # A single summary rather than a warning per name
+        assert [record.levelno for record in caplog.records
+                if "shared" in record.msg] == [logging.INFO]
+        assert not [record for record in caplog.records
+                    if record.levelno >= logging.WARNING]
+
+    def test_updated(self, juliet_dir):
+        file_index = runner.build_file_index(juliet_dir)
+        assert os.path.isfile(os.path.join(juliet_dir,
+                                           runner.FILE_INDEX_NAME))
+        assert runner.FILE_INDEX_NAME not in file_index
+        assert runner.build_file_index(juliet_dir) == file_index
+
+        new_dir = os.path.join(juliet_dir, "testcases", "CWE121", "s02")
+        os.mkdir(new_dir)
+        with open(os.path.join(new_dir, "CWE121_d_01.c"), "w"):
+            pass
+        os.remove(file_index["io.c"])
+        updated = runner.build_file_index(juliet_dir)
+        assert updated["CWE121_d_01.c"] == os.path.join(
+            new_dir, "CWE121_d_01.c")
+        assert "io.c" not in updated
+
+
+class TestManifestIndex():
+    @pytest.mark.parametrize("cwes", [
+        set([121]), set([122]), set([190]), set([121, 476]), set([416])])
+    def test_test_cases_match_walk(self, juliet_dir, cwes):
+        manifest_file = os.path.join(juliet_dir, "manifest.xml")
+        file_index = runner.build_file_index(juliet_dir)
+        assert list(runner.iter_test_cases(
+            manifest_file, cwes, file_index)) == list(
+                walk_test_cases(manifest_file, cwes, file_index))
+
+    def test_flaws_match_walk(self, juliet_dir):
+        manifest_file = os.path.join(juliet_dir, "manifest.xml")
+        cwes = set([121, 122, 190, 476])
+        flaws, _ = sto.get_flaws(manifest_file, cwes)
+        assert sorted(location for locations in flaws.values()
+                      for location in locations) == sorted(
+                          walk_flaws(manifest_file, cwes))
+
+        conn = manifest_index.open_index(manifest_file)
+        try:
+            assert [(path, line, cwe) for (path, line, _, cwe)
+                    in manifest_index.iter_flaws(conn, ("mixed",))] == [
+                        ("CWE121_b_01b.c", 6, 121)]
+        finally:
+            conn.close()
+
+    def test_recompiled_on_change(self, juliet_dir):
+        manifest_file = os.path.join(juliet_dir, "manifest.xml")
+        index_file = manifest_file + ".index"
+        manifest_index.open_index(manifest_file).close()
+        assert manifest_index.is_current(index_file, manifest_file)
+
+        with open(manifest_file, "w") as fid:
+            fid.write(MANIFEST.replace("CWE-476", "CWE-416"))
+        assert not manifest_index.is_current(index_file, manifest_file)
+        assert get_test_cases(juliet_dir, set([476])) == []
+        assert len(get_test_cases(juliet_dir, set([416]))) == 1
+
+
+class TestBatches():
+    def test_iter_batches(self, juliet_dir):
+        tcs = get_test_cases(juliet_dir, set([121, 122, 476]))
+        assert [len(tc[0]) for tc in tcs] == [1, 2, 1, 1]
+        # The test cases without headers share a batch of up to 2 sources
+        assert list(runner.iter_batches(tcs, 2)) == [
+            [tcs[0], tcs[2]], [tcs[3]], [tcs[1]]]
+        # Full batches are run first
+        assert list(runner.iter_batches(tcs, 1)) == [
+            [tcs[0]], [tcs[2]], [tcs[3]], [tcs[1]]]
+
+    @pytest.mark.parametrize("fail_batch", [False, True])
+    def test_batches_match_single_runs(self, juliet_dir, stub_cppcheck,
+                                       tmpdir, monkeypatch, fail_batch):
+        tcs = get_test_cases(juliet_dir, set([121, 122, 476]))
+        tc_support = os.path.join(juliet_dir, "testcasesupport")
+
+        single_dir = str(tmpdir.mkdir("single"))
+        for tc in tcs:
+            runner.run_job(cppcheck.handler, [tc], tc_support, single_dir)
+        expected = read_results(single_dir)
+        assert len(expected) == len(tcs)
+
+        if fail_batch:
+            monkeypatch.setenv("STUB_MAX_SOURCES", "2")
+        batch_dir = str(tmpdir.mkdir("batch"))
+        metrics = []
+        for batch in runner.iter_batches(tcs, 10):
+            metrics += runner.run_job(
+                cppcheck.handler, batch, tc_support, batch_dir,
+                batch_handler=cppcheck.batch_handler)[2]
+        assert read_results(batch_dir) == expected
+        # A failed batch is retried one test case at a time
+        statuses = [run["status"] for run in metrics]
+        if fail_batch:
+            assert statuses == [1, 0, 0, 0, 0]
+        else:
+            assert statuses == [0, 0]
+
+
+class TestResultCache():
+    def test_keys(self, juliet_dir, tmpdir):
+        tc = get_test_cases(juliet_dir, set([121]))[1]
+        tc_support = os.path.join(juliet_dir, "testcasesupport")
+        cmd = cppcheck.get_command(tc, tc_support)
+        cache_dir = str(tmpdir.join("cache"))
+
+        def get_key(version=b"Cppcheck 1.84\n", cmd=cmd):
+            return runner.ResultCache(
+                cache_dir, tc_support, version).get_key(tc, cmd)
+
+        key = get_key()
+        assert get_key() == key
+        assert get_key(version=b"Cppcheck 1.85\n") != key
+        assert get_key(cmd=cmd + ["--inconclusive"]) != key
+
+        for path in tc[0] + tc[1] + [os.path.join(tc_support, "io.c")]:
+            with open(path, "a") as fid:
+                fid.write("/* changed */\n")
+            changed_key = get_key()
+            assert changed_key != key
+            key = changed_key
+
+    def test_cached_runs(self, juliet_dir, stub_cppcheck, tmpdir):
+        tcs = get_test_cases(juliet_dir, set([121, 122, 476]))
+        tc_support = os.path.join(juliet_dir, "testcasesupport")
+        cache = runner.ResultCache(
+            str(tmpdir.join("cache")), tc_support,
+            runner.get_tool_version(["cppcheck", "--version"]))
+
+        results = []
+        for name in ["first", "second"]:
+            outdir = str(tmpdir.mkdir(name))
+            hits, num_tcs, metrics = runner.run_job(
+                cppcheck.handler, tcs, tc_support, outdir,
+                get_command=cppcheck.get_command, cache=cache,
+                batch_handler=cppcheck.batch_handler)
+            results.append((hits, num_tcs, len(metrics),
+                            read_results(outdir)))
+        assert results[0][:3] == (0, 4, 1)
+        assert results[1][:3] == (4, 4, 0)
+        assert results[1][3] == results[0][3]
+
+
+class TestRunTool():
+    def test_metrics(self, tmpdir):
+        metrics = runner.run_tool(["sh", "-c", "exit 3"], str(tmpdir))
+        assert metrics["status"] == 3
+        assert metrics["wall"] >= 0
+
+    def test_timeout_kills_group(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(runner, "_limits", runner.Limits(0.5, 0, 0))
+        # The subprocess holding stdout open must be killed too
+        metrics = runner.run_tool(
+            ["sh", "-c", "sleep 10 & sleep 10"], str(tmpdir))
+        assert metrics["status"] == runner.TIMEOUT_STATUS
+        assert metrics["wall"] < 10
+
+
+class TestScoreAlerts():
+    def test_per_cwe_counts(self, juliet_dir):
+        cwes = set([121, 122])
+        flaws, file_cwes = sto.get_flaws(
+            os.path.join(juliet_dir, "manifest.xml"), cwes)
+        alerts = [
+            sto.Alert(tool, "checker", path, str(line), "")
+            for (tool, path, line) in [
+                # On a flaw
+                ("tool_x", "testcases/CWE121/s01/CWE121_a_01.c", 5),
+                # On a mixed line, which is not a flaw
+                ("tool_x", "testcases/CWE121/s01/CWE121_b_01b.c", 6),
+                # In no test case, so a false positive of every CWE
+                ("tool_x", "testcasesupport/std_testcase.h", 1),
+                # On a flaw of an unscored CWE
+                ("tool_x", "testcases/CWE122/s01/CWE122_a_01.c", 9),
+                ("tool_y", "testcases/CWE122/s01/CWE122_a_01.c", 7),
+                ("tool_y", "testcases/CWE121/s01/CWE121_a_01.c", 2),
+            ]]
+        assert sto.score_alerts(alerts, flaws, file_cwes, cwes) == {
+            (121, "tool_x"): {"tp": 1, "fn": 1, "fp": 2},
+            (122, "tool_x"): {"tp": 0, "fn": 1, "fp": 2},
+            (121, "tool_y"): {"tp": 0, "fn": 2, "fp": 1},
+            (122, "tool_y"): {"tp": 1, "fn": 0, "fp": 0},
+        }
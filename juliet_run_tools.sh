@@ -56,12 +56,36 @@ fi
 
 mkdir -p $working_dir/alerts
 
+# CWEs whose test cases are analyzed and scored
+JULIET_CWES="${JULIET_CWES:-121}"
+
+# Number of test cases each tool analyzes in parallel
+JULIET_JOBS="${JULIET_JOBS:-$(nproc)}"
+
+# Number of source files cppcheck analyzes per run. frama-c cannot be
+# batched, as with -DINCLUDEMAIN each test case defines its own main
+JULIET_BATCH_SIZE="${JULIET_BATCH_SIZE:-50}"
+
+# Tool outputs are cached by test case, command line and tool version, so
+# reruns only run the tools on test cases whose inputs changed
+cache_dir=/mnt/data/tool_cache
+
+# Bounds on each tool run; the time and exit status of each run are
+# written to <working_dir>/metrics
+SA_TOOL_TIMEOUT="${SA_TOOL_TIMEOUT:-600}"
+limit_args="--timeout $SA_TOOL_TIMEOUT --cpu_limit ${SA_TOOL_CPU_LIMIT:-0}"
+limit_args="$limit_args --mem_limit ${SA_TOOL_MEM_LIMIT:-0}"
+mkdir -p $working_dir/metrics
+
 echo "Running cppcheck"
 mkdir -p $working_dir/cppcheck
 begin=$(date +%s)
 DATA_DIR=$working_dir docker-compose run --rm \
     -v $(pwd)/juliet:/juliet cppcheck \
-    bash -c "python /juliet/cppcheck.py /mnt/data/src/C /mnt/data/cppcheck 121"
+    bash -c "python /juliet/cppcheck.py /mnt/data/src/C /mnt/data/cppcheck $JULIET_CWES \
+    --jobs $JULIET_JOBS --cache_dir $cache_dir/cppcheck $limit_args \
+    --batch_size $JULIET_BATCH_SIZE \
+    --metrics_file /mnt/data/metrics/cppcheck.csv"
 DATA_DIR=$working_dir docker-compose run --rm tool_parser \
     bash -c "find /mnt/data/cppcheck -type f | xargs sparser cppcheck_xml" \
     > $working_dir/alerts/cppcheck.csv
@@ -73,7 +97,9 @@ mkdir -p $working_dir/clang_sa
 begin=$(date +%s)
 DATA_DIR=$working_dir docker-compose run --rm \
     -v $(pwd)/juliet:/juliet clang_sa \
-    bash -c "python /juliet/clang_sa.py /mnt/data/src/C /mnt/data/clang_sa 121"
+    bash -c "python /juliet/clang_sa.py /mnt/data/src/C /mnt/data/clang_sa $JULIET_CWES \
+    --jobs $JULIET_JOBS --cache_dir $cache_dir/clang_sa $limit_args \
+    --metrics_file /mnt/data/metrics/clang_sa.csv"
 DATA_DIR=$working_dir docker-compose run --rm tool_parser \
     bash -c "find /mnt/data/clang_sa -type f | xargs sparser clang_sa_plist" \
     > $working_dir/alerts/clang_sa.csv
@@ -85,15 +111,19 @@ mkdir -p $working_dir/frama-c
 begin=$(date +%s)
 DATA_DIR=$working_dir docker-compose run --rm \
     -v $(pwd)/juliet:/juliet frama-c \
-    bash -c "python /juliet/frama-c.py /mnt/data/src/C /mnt/data/frama-c 121"
+    bash -c "python /juliet/frama-c.py /mnt/data/src/C /mnt/data/frama-c $JULIET_CWES \
+    --jobs $JULIET_JOBS --cache_dir $cache_dir/frama-c $limit_args \
+    --metrics_file /mnt/data/metrics/frama-c.csv"
 DATA_DIR=$working_dir docker-compose run --rm tool_parser \
     bash -c "find /mnt/data/frama-c -type f | xargs sparser framac_warnings" \
     > $working_dir/alerts/frama-c.csv
 end=$(date +%s)
 echo Done, took: $(expr $end - $begin) seconds
 
-DATA_DIR=$working_dir docker-compose run --rm juliet \
-    bash -c "python /juliet/score_tool_outputs.py \
+# Scored in the tool_parser container, as the scorer reads alerts with sparser
+DATA_DIR=$working_dir docker-compose run --rm \
+    -v $(pwd)/juliet:/juliet tool_parser \
+    bash -c "python /juliet/score_tool_outputs.py --cwes ${JULIET_CWES// /,} \
         /mnt/data/src/C/manifest.xml \
         /juliet/checkers.yaml \
         /mnt/data/alerts/*.csv > /mnt/data/tool_confusion_matrix.csv"  
@@ -41,7 +41,6 @@ import json
 import os
 import pickle
 import sys
-import xml.etree.ElementTree as ET
 
 import numpy as np
 import pandas as pd
@@ -56,6 +55,7 @@ sys_path_parent = os.path.abspath('..')
 if sys_path_parent not in sys.path:
     sys.path.append(sys_path_parent)
 from sa_babi.sa_tag import Tag
+from juliet import manifest_index
 
 # define names for the simple tokenization CSV
 SIMP_TOK_NAMES = ['fname', 'kind', 'text', 'line', 'col', 'from_expansion']
@@ -642,20 +642,14 @@ def get_vuln_lines():
                 * line num (int)
                 * CWE (str)
     """
-    tree = ET.parse(JULIET_MANIFEST_PATH)
-    root = tree.getroot()
-
-    vuln_lines = dict()
-    for testcase in root:
-        for file_node in testcase:
-            name = file_node.attrib['path']
-            if name not in vuln_lines:
-                vuln_lines[name] = []
-            for flaw_node in file_node:
-                attrs = flaw_node.attrib
-                line_num = int(attrs['line'])
-                cwe = attrs['name']
-                vuln_lines[name].append((line_num, cwe))
+    conn = manifest_index.open_index(JULIET_MANIFEST_PATH)
+    try:
+        vuln_lines = {name: [] for name in manifest_index.iter_file_paths(conn)}
+        for name, line_num, cwe, _ in manifest_index.iter_flaws(
+                conn, kinds=("flaw", "mixed")):
+            vuln_lines[name].append((line_num, cwe))
+    finally:
+        conn.close()
 
     return vuln_lines
 
@@ -46,6 +46,8 @@ import string
 import sys
 import json
 
+import numpy as np
+
 import templates
 
 # TODO: move away from this ugly hack by merging the conda enviroment in pipeline/ into Docker
@@ -72,6 +74,11 @@ CHARSET = string.digits + string.ascii_letters
 # the number of bytes in each hash filename
 FNAME_HASHLEN = 5
 
+# integer generator parameters recorded by -params_file; parameters a
+# generator does not use are recorded as -1
+PARAM_NAMES = ['buf_len', 'idx_init', 'max_idx', 'thresh', 'true_idx',
+               'false_idx', 'chk']
+
 # command-line argument default values
 # number of instances to generate
 DEFAULT_NUM_INSTANCES = 12000
@@ -117,16 +124,19 @@ def main(args):
     generate_metadata = args.metadata_file is not None
     # This dict is used to store instance metadata
     tag_metadata = {}
+    # Columns of generator parameters, one entry per instance
+    param_columns = {name: [] for name in ['instance', 'generator'] +
+                     PARAM_NAMES}
     inst_num = 0
 
     while inst_num < num_instances:
         # generate example
         gen = generators[inst_num % num_generators]
         if gen is gen_tautonly_linear_example:
-            instance_str, tags = gen()
+            instance_str, tags, params = gen()
         else:
             include_cond_bufwrite = not taut_only
-            instance_str, tags = gen(
+            instance_str, tags, params = gen(
                 include_cond_bufwrite=include_cond_bufwrite)
 
         # generate filename
@@ -139,6 +149,10 @@ def main(args):
 
         # insert record into metadata for this c file
         tag_metadata[fname] = [tag.value for tag in tags]
+        param_columns['instance'].append(fname)
+        param_columns['generator'].append(gen.__name__)
+        for name in PARAM_NAMES:
+            param_columns[name].append(params.get(name, -1))
         inst_num += 1
 
         # write to file
@@ -156,15 +170,41 @@ def main(args):
         with open(args.metadata_file, 'w') as f:
             json.dump(metadata, f)
 
+    if args.params_file is not None:
+        save_params(args.params_file, param_columns)
+
     return 0
 
 
+def save_params(path, param_columns):
+    """Save generator parameters as a columnar .npz file
+
+    Each column is stored as its own array, so that a consumer can load
+    just the columns it needs, e.g. np.load(path)['buf_len'].
+
+    Args:
+        path (str): path to the .npz file to write
+        param_columns (dict): maps column name to list of values, with
+            'instance' (file name), 'generator' (function name) and each
+            name in PARAM_NAMES
+    """
+    arrays = {
+        'instance': np.array(param_columns['instance'], dtype=str),
+        'generator': np.array(param_columns['generator'], dtype=str)
+    }
+    for name in PARAM_NAMES:
+        arrays[name] = np.array(param_columns[name], dtype=np.int16)
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+
+
 def gen_cond_example(include_cond_bufwrite=True):
     """Generate conditional example
 
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     anon_vars = _get_anon_vars()
     buf_var, idx_var, thresh_var = anon_vars[:3]
@@ -203,6 +243,7 @@ def gen_while_example(include_cond_bufwrite=True):
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     anon_vars = _get_anon_vars()
     buf_var, idx_var, max_var = anon_vars[:3]
@@ -235,6 +276,7 @@ def gen_for_example(include_cond_bufwrite=True):
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     anon_vars = _get_anon_vars()
     buf_var, idx_var, max_var = anon_vars[:3]
@@ -267,6 +309,7 @@ def gen_fv_cond_example(include_cond_bufwrite=True):
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     anon_vars = _get_anon_vars()
     buf_var, idx_var, chk_var = anon_vars[:3]
@@ -299,6 +342,7 @@ def gen_fv_while_example(include_cond_bufwrite=True):
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     anon_vars = _get_anon_vars()
     buf_var, idx_var, max_var, chk_var = anon_vars[:4]
@@ -334,6 +378,7 @@ def gen_fv_for_example(include_cond_bufwrite=True):
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     anon_vars = _get_anon_vars()
     buf_var, idx_var, max_var, chk_var = anon_vars[:4]
@@ -369,6 +414,7 @@ def gen_tautonly_linear_example():
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): sampled parameters, keyed by name in PARAM_NAMES
     """
     # this intentionally has only flow-insensitive buffer writes
     include_cond_bufwrite = False
@@ -401,6 +447,7 @@ def _assemble_general_example(dec_init_pairs, main_lines, dummy_vars,
     Returns:
         instance_str (str): str of code example
         tags (list of Tag): tag for each line representing buffer safety
+        params (dict): the entries of substitutions named in PARAM_NAMES
 
     Ensures:
         len(instance_str.split("\n")) == len(tags)
@@ -415,9 +462,11 @@ def _assemble_general_example(dec_init_pairs, main_lines, dummy_vars,
     lines, body_tags = _get_lines(dec_init_pairs, main_lines,
                                   dummy_vars, safe, include_cond_bufwrite)
     tags = _get_tags(body_tags)
+    params = {name: substitutions[name] for name in PARAM_NAMES
+              if name in substitutions}
     instance_str = _get_instance_str(lines, substitutions,
                                      templates.FUNC_TMPL_STR, tags)
-    return instance_str, tags
+    return instance_str, tags, params
 
 
 def _get_anon_vars():
@@ -726,9 +775,9 @@ def _test(verbose=False):
     def run_tests(gen, kwargs=None):
         for test_num in range(num_tests_each):
             if kwargs is None:
-                instance_str, tags = gen()
+                instance_str, tags, params = gen()
             else:
-                instance_str, tags = gen(**kwargs)
+                instance_str, tags, params = gen(**kwargs)
 
             if verbose and test_num == 0:
                 if kwargs is not None:
@@ -741,6 +790,7 @@ def _test(verbose=False):
             assert(isinstance(tags, list))
             for itm in tags:
                 assert(isinstance(itm, Tag))
+            assert(set(params) <= set(PARAM_NAMES))
 
             cond_in_tags = (Tag.BUFWRITE_COND_UNSAFE in tags or
                             Tag.BUFWRITE_COND_SAFE in tags)
@@ -798,6 +848,12 @@ def _get_args():
               "json metadata about the generated instances"),
         metavar="<path>")
 
+    parser.add_argument('-params_file',
+        help=("(str) Path to a .npz file which shall be used to store the "
+              "generator and sampled parameters of each instance, one "
+              "array per column"),
+        metavar="<path>")
+
     parser.add_argument('--taut_only',
         action='store_true',
         help=("If passed, then generate examples with only flow-insensitive "
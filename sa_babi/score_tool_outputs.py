@@ -36,18 +36,53 @@
 # 
 # DM18-0995
 # 
+import os
 import re
 import yaml
 import json
 import csv
+import hashlib
 import logging
+import warnings
 from pathlib import PurePath
 from collections import defaultdict, namedtuple
+
+import numpy as np
+
+import sparser
+from sparser import columnar, compression
+from sparser.store import AlertStore
+
 #from generate import Tag
 from sa_tag import Tag
 
 Alert = namedtuple('Alert', ["tool", "checker", "file", "line", "message"])
 
+# Flattened view of every tagged line of every scored instance
+LineTable = namedtuple('LineTable', ["instances", "offsets", "instance", "tag"])
+
+# (kind, unsafe tag, safe tag) for each set of tags that is scored
+TAG_SETS = [
+    ("cond", Tag.BUFWRITE_COND_UNSAFE, Tag.BUFWRITE_COND_SAFE),
+    ("taut", Tag.BUFWRITE_TAUT_UNSAFE, Tag.BUFWRITE_TAUT_SAFE),
+]
+
+# The kinds of confusion matrices written for each tool
+KINDS = [set_name for (set_name, _, _) in TAG_SETS] + ["all"]
+
+# Voting rules for combining the responses of several tools
+ENSEMBLE_RULES = ["any", "all", "majority"]
+
+# Ensembles are scored over every subset of at most this many tools
+MAX_ENSEMBLE_TOOLS = 16
+
+# The sparser parser for the raw outputs in each tool output directory
+RAW_OUTPUT_PARSERS = {
+    "clang_sa": "clang_sa_plist",
+    "cppcheck": "cppcheck_xml",
+    "frama-c": "framac_warnings",
+}
+
 
 def get_tag_for_alert(alert, defects):
     tags = defects.get(alert.file)
@@ -78,7 +113,7 @@ def is_whitelisted(alert, whitelist):
 
 def load_alerts(alerts_path, whitelist):
     result = []
-    with open(alerts_path, "r") as fid:
+    with compression.open_text_input(alerts_path) as fid:
         for alert in csv.reader(fid):
             alert_obj = Alert._make(alert)
             if is_whitelisted(alert_obj, whitelist):
@@ -86,6 +121,175 @@ def load_alerts(alerts_path, whitelist):
     return result
 
 
+def is_columnar(alerts_path):
+    """Whether an alert file is columnar (NPZ) rather than CSV
+
+    Like compression, this is recognized by content: NPZ files are zip
+    archives.
+    """
+    with compression.open_input(alerts_path) as fid:
+        return fid.read(4) == b"PK\x03\x04"
+
+
+def load_columnar_hits(alerts_path, whitelist):
+    """Load the whitelisted hits of each tool from a columnar alert file
+
+    Checkers are matched against the whitelist once per distinct checker,
+    and the alerts of each tool are reduced to distinct (path, line) pairs
+    before building hits, so large files load without an Alert per row.
+    Message rules are still checked per alert, but only for alerts that
+    no checker rule already allows.
+
+    Args:
+        alerts_path (str): NPZ file written by sparser --format npz
+        whitelist (dict): as returned by load_checker_whitelist()
+
+    Returns:
+        dict: maps each tool with whitelisted alerts to its set of
+            (instance, line) hits
+    """
+    table = columnar.load(alerts_path)
+    names = dict()
+
+    hits = dict()
+    for tool_code, tool in enumerate(table.tools):
+        tool = str(tool)
+        rules = whitelist.get(tool) or {}
+        checker_rules = rules.get("checkers") or []
+        message_rules = rules.get("messages") or []
+
+        checker_ok = np.array(
+            [any(follows_rule(rule, str(checker)) for rule in checker_rules)
+             for checker in table.checkers], dtype=bool)
+        in_tool = table.tool == tool_code
+        keep = in_tool & checker_ok[table.checker]
+        if message_rules:
+            for i in np.flatnonzero(in_tool & ~keep):
+                message = columnar.get_message(table, i)
+                if any(follows_rule(rule, message) for rule in message_rules):
+                    keep[i] = True
+        if not keep.any():
+            continue
+
+        # Distinct (path, line) pairs, as one sortable int64 key each
+        lines = table.line[keep].astype(np.int64)
+        stride = int(lines.max()) + 1
+        keys = np.unique(table.path[keep].astype(np.int64) * stride + lines)
+        for path in np.unique(keys // stride).tolist():
+            if path not in names:
+                names[path] = PurePath(table.paths[path]).name
+        hits[tool] = set(
+            (names[key // stride], key % stride) for key in keys.tolist())
+    return hits
+
+
+def is_sqlite(alerts_path):
+    """Whether an alert file is an SQLite alert store rather than CSV"""
+    return alerts_path.endswith(".sqlite")
+
+
+def load_sqlite_hits(alerts_path, whitelist):
+    """Load the whitelisted hits of each tool from an SQLite alert store
+
+    The checker whitelist is translated into one indexed query per tool,
+    so only the distinct (path, line) pairs of whitelisted alerts are
+    read from the store.
+
+    Args:
+        alerts_path (str): SQLite file written by sparser --sqlite
+        whitelist (dict): as returned by load_checker_whitelist()
+
+    Returns:
+        dict: maps each tool with whitelisted alerts to its set of
+            (instance, line) hits
+    """
+    def split_rules(rules):
+        names = [rule for rule in rules if type(rule) is str]
+        patterns = [rule["regex"] for rule in rules
+                    if type(rule) is dict and "regex" in rule]
+        return names, patterns
+
+    hits = dict()
+    with AlertStore(alerts_path) as alert_store:
+        for tool in alert_store.tools():
+            rules = whitelist.get(tool) or {}
+            checkers, checker_patterns = split_rules(
+                rules.get("checkers") or [])
+            messages, message_patterns = split_rules(
+                rules.get("messages") or [])
+            locations = alert_store.locations(
+                tool, kinds=checkers, kind_patterns=checker_patterns,
+                messages=messages, message_patterns=message_patterns)
+            if locations:
+                hits[tool] = set((PurePath(path).name, int(line))
+                                 for (path, line) in locations)
+    return hits
+
+
+def load_alert_file_tools(alerts_path):
+    """Get the names of all tools with alerts in an alert file"""
+    if is_sqlite(alerts_path):
+        with AlertStore(alerts_path) as alert_store:
+            return alert_store.tools()
+    if is_columnar(alerts_path):
+        table = columnar.load(alerts_path)
+        return sorted(str(table.tools[code]) for code in np.unique(table.tool))
+    with compression.open_text_input(alerts_path) as fid:
+        return sorted(set(row[0] for row in csv.reader(fid) if row))
+
+
+def get_raw_output_parser(tool_dir):
+    """Get the sparser ParserInfo for a directory of raw tool outputs
+
+    The parser is chosen by the directory name, e.g. "cppcheck".
+    """
+    tool = os.path.basename(os.path.normpath(tool_dir))
+    if tool not in RAW_OUTPUT_PARSERS:
+        raise ValueError("Unknown tool output directory: '{}'".format(tool_dir))
+    return sparser.Registry[RAW_OUTPUT_PARSERS[tool]]
+
+
+def iter_raw_output_files(tool_dir):
+    for name in sorted(os.listdir(tool_dir)):
+        path = os.path.join(tool_dir, name)
+        if not name.startswith(".") and os.path.isfile(path):
+            yield path
+
+
+def load_raw_alerts(tool_dir, whitelist):
+    """Parse a directory of raw tool outputs directly into alerts
+
+    This skips writing, sorting and re-reading the intermediate alert
+    CSV files produced by sa_parse_tool_outputs.sh. Outputs compressed
+    with gzip or zstd are decompressed as they are parsed.
+    """
+    parser = get_raw_output_parser(tool_dir).cls()
+    result = []
+    for path in iter_raw_output_files(tool_dir):
+        with compression.open_input(path) as fid:
+            for diag in parser.load_iter(fid):
+                location = diag.message.location
+                if location is None:
+                    continue
+                alert_obj = Alert(
+                    tool=diag.tool_info.name,
+                    checker=diag.kind or "",
+                    file=location.path,
+                    line=location.line_start,
+                    message=diag.message.text or "")
+                if is_whitelisted(alert_obj, whitelist):
+                    result.append(alert_obj)
+    return result
+
+
+def get_tool_hits(alerts):
+    """Get the set of (instance, line) pairs each tool alerted on"""
+    hits = defaultdict(set)
+    for alert in alerts:
+        hits[alert.tool].add((PurePath(alert.file).name, int(alert.line)))
+    return dict(hits)
+
+
 def is_unsafe_tag(tag):
     return tag == Tag.BUFWRITE_COND_UNSAFE or tag == Tag.BUFWRITE_TAUT_UNSAFE
 
@@ -122,15 +326,702 @@ def load_checker_whitelist(whitelist_path):
     return data
 
 
+def hash_file(path, block_size=1 << 20):
+    """Get the hex sha256 digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fid:
+        for block in iter(lambda: fid.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_dir(tool_dir):
+    """Get the hex sha256 digest of the raw outputs in a directory"""
+    digest = hashlib.sha256()
+    for path in iter_raw_output_files(tool_dir):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        digest.update(hash_file(path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_json(obj):
+    """Get the hex sha256 digest of a json-serializable object"""
+    data = json.dumps(obj, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ScoreCache(object):
+    """An on-disk store of partial, per-tool confusion counts
+
+    The cache lives in a directory holding a single json index. Alert
+    files (and directories of raw tool outputs) are identified by the
+    sha256 of their contents, and the score
+    of a tool is stored under a key derived from the digests of the
+    alert files it appears in, its section of the checker whitelist and
+    the digest of the scored manifest. A tool only needs to be rescored
+    when one of these inputs changes.
+
+    Only the entries used since the cache was opened are saved, and the
+    per-line responses of the others are deleted, so the cache does not
+    grow as alert files change. Runs that score different manifests
+    (e.g. with and without --sound_only) should use separate directories.
+
+    Args:
+        cache_dir (str): path to the cache directory; created if missing
+    """
+
+    INDEX_FNAME = "index.json"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, self.INDEX_FNAME)
+        self.index = {"files": {}, "scores": {}}
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "r") as fid:
+                self.index = json.load(fid)
+        # The file digests and score keys used since opening
+        self.used_files = set()
+        self.used_scores = set()
+
+    def get_file_tools(self, file_digest):
+        self.used_files.add(file_digest)
+        return self.index["files"].get(file_digest)
+
+    def put_file_tools(self, file_digest, tools):
+        self.used_files.add(file_digest)
+        self.index["files"][file_digest] = list(tools)
+
+    def __contains__(self, key):
+        return key in self.index["scores"]
+
+    def get_scores(self, key):
+        """Get cached tool scores, or None if the tool had no alerts"""
+        self.used_scores.add(key)
+        entry = self.index["scores"][key]
+        if entry is None:
+            return None
+        return {
+            int(tag): {False: counts[0], True: counts[1]}
+            for tag, counts in entry.items()
+        }
+
+    def put_scores(self, key, tool_scores):
+        self.used_scores.add(key)
+        entry = None
+        if tool_scores is not None:
+            entry = {
+                str(tag): [counts[False], counts[True]]
+                for tag, counts in tool_scores.items()
+            }
+        self.index["scores"][key] = entry
+
+    def get_fired(self, key, num_lines):
+        """Get the cached per-line responses of a tool, if any"""
+        path = os.path.join(self.cache_dir, key + ".npy")
+        if not os.path.isfile(path):
+            return None
+        return np.unpackbits(np.load(path))[:num_lines].astype(bool)
+
+    def put_fired(self, key, fired):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.save(os.path.join(self.cache_dir, key + ".npy"),
+                np.packbits(fired))
+
+    def save(self):
+        """Write the index of the used entries, and prune the others"""
+        self.index = {
+            "files": {digest: tools
+                      for (digest, tools) in self.index["files"].items()
+                      if digest in self.used_files},
+            "scores": {key: entry
+                       for (key, entry) in self.index["scores"].items()
+                       if key in self.used_scores},
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as fid:
+            json.dump(self.index, fid)
+        os.replace(tmp_path, self.index_path)
+
+        for name in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(name)
+            if ext == ".npy" and key not in self.index["scores"]:
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+def score_tool(tool, instance_tags, hits):
+    """Count the responses of one tool to every tagged line
+
+    Args:
+        tool (str): tool name, for logging
+        instance_tags (dict): as returned by load_tags()
+        hits (set of tuple): (instance, line) pairs the tool alerted on
+
+    Returns:
+        tool_scores (dict): tool_scores[tag][response] is the number of
+            lines with this tag value where the tool did (True) or did
+            not (False) respond
+    """
+    tool_scores = {
+        # For each tag
+        tag: {
+            # True indicates a positive response
+            True: 0,
+            # False indicates a negative reponse
+            False: 0
+        }
+        for tag in [e.value for e in Tag]
+    }
+
+    for instance, tags in instance_tags.items():
+        for tag, line in zip(tags, range(1, len(tags) + 1)):
+            # Hits are positive response to the tag
+            hit = (instance, line) in hits
+            tool_scores[tag][hit] += 1
+            logging.debug("%s,%s,%s,%s,%d",
+                          "RESPONSE" if hit else "NO_RESPONSE",
+                          Tag(tag).name, tool, instance, line)
+    return tool_scores
+
+
+def get_line_table(instance_tags):
+    """Flatten the tags of every instance into per-line arrays
+
+    Args:
+        instance_tags (dict): as returned by load_tags()
+
+    Returns:
+        LineTable, with attributes:
+            instances (list of str): instance names
+            offsets (np.ndarray) [num_instances + 1]: lines of instance i
+                are at indices offsets[i]:offsets[i + 1]
+            instance (np.ndarray) [num_lines]: instance index of each line
+            tag (np.ndarray) [num_lines]: tag value of each line
+    """
+    instances = list(instance_tags)
+    lengths = np.array([len(instance_tags[name]) for name in instances],
+                       dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    instance = np.repeat(np.arange(len(instances)), lengths)
+    tag = np.fromiter(
+        (tag for name in instances for tag in instance_tags[name]),
+        dtype=np.int8, count=int(offsets[-1]))
+    return LineTable(instances, offsets, instance, tag)
+
+
+def get_fired(line_table, hits):
+    """Get a boolean array of the tagged lines a tool responded to
+
+    Args:
+        line_table (LineTable): as returned by get_line_table()
+        hits (set of tuple): (instance, line) pairs the tool alerted on
+
+    Returns:
+        fired (np.ndarray) [num_lines] of bool
+    """
+    instance_idx = {name: i for (i, name) in enumerate(line_table.instances)}
+    fired = np.zeros(len(line_table.tag), dtype=bool)
+    for (name, line) in hits:
+        i = instance_idx.get(name)
+        if i is None:
+            continue
+        start, end = line_table.offsets[i], line_table.offsets[i + 1]
+        if 1 <= line <= end - start:
+            fired[start + line - 1] = True
+    return fired
+
+
+def score_tools(instance_tags, alert_files, whitelist, cache=None,
+                manifest_digest=None, line_table=None):
+    """Score every tool with whitelisted alerts in the alert files
+
+    Args:
+        instance_tags (dict): as returned by load_tags()
+        alert_files (list of str): paths to alert CSV files, which may
+            be compressed with gzip (.gz) or zstd (.zst), columnar
+            alert files (see load_columnar_hits()), SQLite alert stores
+            (see load_sqlite_hits()) or directories of raw tool outputs
+            (see load_raw_alerts())
+        whitelist (dict): as returned by load_checker_whitelist()
+        cache (ScoreCache): if given, reuse the scores of tools whose
+            inputs did not change, and store the scores of those that did
+        manifest_digest (str): identifies instance_tags in the cache
+        line_table (LineTable): if given, also get the per-line
+            responses of each tool
+
+    Returns:
+        scores (dict): scores[tool] as returned by score_tool()
+        fired (dict): fired[tool] as returned by get_fired(), empty if
+            line_table is None
+    """
+    hits_by_file = dict()
+
+    def get_hits(path):
+        if path not in hits_by_file:
+            if os.path.isdir(path):
+                hits_by_file[path] = get_tool_hits(
+                    load_raw_alerts(path, whitelist))
+            elif is_columnar(path):
+                hits_by_file[path] = load_columnar_hits(path, whitelist)
+            elif is_sqlite(path):
+                hits_by_file[path] = load_sqlite_hits(path, whitelist)
+            else:
+                hits_by_file[path] = get_tool_hits(
+                    load_alerts(path, whitelist))
+        return hits_by_file[path]
+
+    file_digests = dict()
+    tool_files = defaultdict(list)
+    for path in alert_files:
+        if cache is None:
+            tools = set(get_hits(path))
+        elif os.path.isdir(path):
+            file_digests[path] = hash_dir(path)
+            tools = [get_raw_output_parser(path).tool_name]
+        else:
+            file_digests[path] = hash_file(path)
+            tools = cache.get_file_tools(file_digests[path])
+            if tools is None:
+                tools = load_alert_file_tools(path)
+                cache.put_file_tools(file_digests[path], tools)
+        for tool in tools:
+            tool_files[tool].append(path)
+
+    scores = dict()
+    fired = dict()
+    for tool, paths in tool_files.items():
+        key = None
+        if cache is not None:
+            key = hash_json([
+                tool,
+                sorted(file_digests[path] for path in paths),
+                whitelist.get(tool),
+                manifest_digest])
+            if key in cache:
+                tool_scores = cache.get_scores(key)
+                tool_fired = None
+                if tool_scores is not None and line_table is not None:
+                    tool_fired = cache.get_fired(key, len(line_table.tag))
+                if line_table is None or tool_scores is None \
+                        or tool_fired is not None:
+                    logging.info("Using cached scores for %s", tool)
+                    if tool_scores is not None:
+                        scores[tool] = tool_scores
+                    if tool_fired is not None:
+                        fired[tool] = tool_fired
+                    continue
+
+        logging.info("Scoring %s", tool)
+        hits = set()
+        for path in paths:
+            hits |= get_hits(path).get(tool, set())
+        tool_scores = None
+        if hits:
+            tool_scores = score_tool(tool, instance_tags, hits)
+            scores[tool] = tool_scores
+            if line_table is not None:
+                fired[tool] = get_fired(line_table, hits)
+        if cache is not None:
+            cache.put_scores(key, tool_scores)
+            if tool in fired:
+                cache.put_fired(key, fired[tool])
+
+    if cache is not None:
+        cache.save()
+    return scores, fired
+
+
+def write_confusion_matrices(scores, fid):
+    """Write per-tool confusion matrices for each tag set as CSV"""
+    writer = csv.writer(fid)
+    writer.writerow(["tool", "kind", "tp", "tn", "fp", "fn"])
+
+    for tool in sorted(scores.keys()):
+        tool_scores = scores[tool]
+        conf_matrices = []
+        for (set_name, unsafe, safe) in TAG_SETS:
+            conf_matrix = [
+                # Positive response + UNSAFE == True Positive
+                tool_scores[unsafe.value][True],
+                # Negative response + SAFE == True Negative
+                tool_scores[safe.value][False],
+                # Positive response + SAFE == False Positive
+                tool_scores[safe.value][True],
+                # Negative response + UNSAFE == False Negative
+                tool_scores[unsafe.value][False]
+            ]
+            writer.writerow([tool, set_name] + conf_matrix)
+            conf_matrices.append(conf_matrix)
+        combined_matrix = [sum(a) for a in zip(*conf_matrices)]
+        writer.writerow([tool, "all"] + combined_matrix)
+
+
+def get_instance_confusions(line_table, fired):
+    """Get the confusion matrix of a tool on each instance
+
+    Args:
+        line_table (LineTable): as returned by get_line_table()
+        fired (np.ndarray): as returned by get_fired()
+
+    Returns:
+        confusions (np.ndarray) [num_instances, len(KINDS), 4]: the
+            (tp, tn, fp, fn) counts of each instance for each kind
+    """
+    num_instances = len(line_table.instances)
+    confusions = np.zeros((num_instances, len(KINDS), 4), dtype=np.int64)
+    for (kind_idx, (_, unsafe, safe)) in enumerate(TAG_SETS):
+        is_unsafe = line_table.tag == unsafe.value
+        is_safe = line_table.tag == safe.value
+        cells = [is_unsafe & fired, is_safe & ~fired,
+                 is_safe & fired, is_unsafe & ~fired]
+        for (cell_idx, cell) in enumerate(cells):
+            confusions[:, kind_idx, cell_idx] = np.bincount(
+                line_table.instance[cell], minlength=num_instances)
+    confusions[:, -1] = confusions[:, :-1].sum(axis=1)
+    return confusions
+
+
+def get_metrics(confusions):
+    """Get accuracy, precision, recall and F1 from (tp, tn, fp, fn) counts
+
+    Args:
+        confusions (np.ndarray) [..., 4]
+
+    Returns:
+        metrics (dict): maps metric name to np.ndarray [...]; undefined
+            values (zero denominators) are nan
+    """
+    tp, tn, fp, fn = [confusions[..., i].astype(np.float64) for i in range(4)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "accuracy": (tp + tn) / (tp + tn + fp + fn),
+            "precision": tp / (tp + fp),
+            "recall": tp / (tp + fn),
+            "f1": 2 * tp / (2 * tp + fp + fn)
+        }
+
+
+def bootstrap_confusions(confusions, num_replicates, rng,
+                         max_chunk_elems=1 << 24):
+    """Resample instances with replacement and total their confusions
+
+    Each replicate is a row of multinomial instance weights, so a chunk
+    of replicates is totaled with a single matrix product. The weights are
+    drawn by counting uniformly sampled instance indices, which is an
+    exact multinomial draw and much faster than rng.multinomial() when
+    there are many instances.
+
+    Args:
+        confusions (np.ndarray) [num_instances, ...]: per-instance counts
+        num_replicates (int): number of bootstrap replicates
+        rng (np.random.RandomState)
+        max_chunk_elems (int): bound on the size of each weights matrix
+
+    Returns:
+        totals (np.ndarray) [num_replicates, ...]
+    """
+    num_instances = confusions.shape[0]
+    flat = confusions.reshape(num_instances, -1).astype(np.float64)
+    chunk_size = max(1, max_chunk_elems // num_instances)
+
+    totals = np.empty((num_replicates, flat.shape[1]))
+    for start in range(0, num_replicates, chunk_size):
+        size = min(chunk_size, num_replicates - start)
+        # Offset the samples of each replicate into its own row
+        samples = rng.randint(num_instances, size=(size, num_instances))
+        samples += num_instances * np.arange(size)[:, np.newaxis]
+        weights = np.bincount(samples.ravel(), minlength=size * num_instances)
+        weights = weights.reshape(size, num_instances).astype(np.float64)
+        totals[start:start + size] = weights.dot(flat)
+    return totals.reshape((num_replicates,) + confusions.shape[1:])
+
+
+def write_confidence_intervals(line_table, fired, fid, num_replicates=1000,
+                               confidence=0.95, seed=None):
+    """Write bootstrap confidence intervals of per-tool metrics as CSV
+
+    All tools are scored on the same resampled instances.
+
+    Args:
+        line_table (LineTable): as returned by get_line_table()
+        fired (dict): as returned by score_tools()
+        fid (file-like object): output
+        num_replicates (int): number of bootstrap replicates
+        confidence (float): confidence level of the intervals
+        seed (int): seed for the resampling
+    """
+    tools = sorted(fired.keys())
+    writer = csv.writer(fid)
+    writer.writerow(["tool", "kind", "metric", "value", "lower", "upper"])
+    if not tools or not line_table.instances:
+        return
+
+    # [num_instances, num_tools, len(KINDS), 4]
+    confusions = np.stack(
+        [get_instance_confusions(line_table, fired[tool]) for tool in tools],
+        axis=1)
+    rng = np.random.RandomState(seed)
+    replicates = get_metrics(
+        bootstrap_confusions(confusions, num_replicates, rng))
+    values = get_metrics(confusions.sum(axis=0))
+
+    alpha = 100 * (1 - confidence) / 2
+    for metric in ["accuracy", "precision", "recall", "f1"]:
+        with warnings.catch_warnings():
+            # All-nan slices (undefined metrics) give nan bounds
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            lower, upper = np.nanpercentile(
+                replicates[metric], [alpha, 100 - alpha], axis=0)
+        for (tool_idx, tool) in enumerate(tools):
+            for (kind_idx, kind) in enumerate(KINDS):
+                writer.writerow([
+                    tool, kind, metric,
+                    values[metric][tool_idx, kind_idx],
+                    lower[tool_idx, kind_idx], upper[tool_idx, kind_idx]])
+
+
+def score_ensembles(line_table, fired, tools, max_chunk_elems=1 << 22):
+    """Score every subset of tools under each voting rule
+
+    Each tagged line gets a bitset of the tools that fired on it (bit i
+    for tools[i]). Lines are then reduced to counts per distinct
+    (bitset, tag) pair, so each chunk of subsets is scored under every
+    rule with bitwise operations and a matrix product over those counts.
+
+    Args:
+        line_table (LineTable): as returned by get_line_table()
+        fired (dict): as returned by score_tools()
+        tools (list of str): tools to combine
+        max_chunk_elems (int): bound on the size of the [subsets,
+            patterns] vote matrix of each chunk
+
+    Returns:
+        masks (np.ndarray) [2 ** len(tools) - 1]: bitset of each subset
+        confusions (np.ndarray)
+            [len(ENSEMBLE_RULES), len(masks), len(KINDS), 4]: (tp, tn, fp,
+            fn) counts of each subset under each rule
+    """
+    num_tools = len(tools)
+    if num_tools > MAX_ENSEMBLE_TOOLS:
+        raise ValueError("Can only combine up to {} tools, got {}".format(
+            MAX_ENSEMBLE_TOOLS, num_tools))
+
+    bits = np.zeros(len(line_table.tag), dtype=np.int64)
+    for (i, tool) in enumerate(tools):
+        bits |= fired[tool].astype(np.int64) << i
+
+    masks = np.arange(1, 2 ** num_tools, dtype=np.int64)
+    popcount = np.zeros(2 ** num_tools, dtype=np.int64)
+    for i in range(num_tools):
+        popcount += (np.arange(2 ** num_tools) >> i) & 1
+    sizes = popcount[masks][:, np.newaxis]
+
+    confusions = np.zeros(
+        (len(ENSEMBLE_RULES), len(masks), len(KINDS), 4), dtype=np.int64)
+    for (kind_idx, (_, unsafe, safe)) in enumerate(TAG_SETS):
+        is_unsafe = line_table.tag == unsafe.value
+        is_safe = line_table.tag == safe.value
+        patterns, inverse = np.unique(
+            bits[is_unsafe | is_safe], return_inverse=True)
+        unsafe_counts = np.bincount(
+            inverse, weights=is_unsafe[is_unsafe | is_safe],
+            minlength=len(patterns))
+        safe_counts = np.bincount(
+            inverse, weights=is_safe[is_unsafe | is_safe],
+            minlength=len(patterns))
+
+        chunk_size = max(1, max_chunk_elems // max(1, len(patterns)))
+        for start in range(0, len(masks), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            # [chunk_size, num_patterns]
+            votes = popcount[masks[chunk, np.newaxis]
+                             & patterns[np.newaxis, :]]
+            positives = [votes > 0, votes == sizes[chunk],
+                         2 * votes > sizes[chunk]]
+            for (rule_idx, positive) in enumerate(positives):
+                tp = positive.dot(unsafe_counts)
+                fp = positive.dot(safe_counts)
+                confusions[rule_idx, chunk, kind_idx] = np.stack([
+                    tp, safe_counts.sum() - fp, fp,
+                    unsafe_counts.sum() - tp], axis=1)
+    confusions[:, :, -1] = confusions[:, :, :-1].sum(axis=2)
+    return masks, confusions
+
+
+def write_ensemble_matrices(line_table, fired, fid):
+    """Write confusion matrices of every ensemble of tools as CSV
+
+    An ensemble responds to a line if any, all or a strict majority of
+    its tools do.
+    """
+    tools = sorted(fired.keys())
+    writer = csv.writer(fid)
+    writer.writerow(["tools", "rule", "kind", "tp", "tn", "fp", "fn"])
+    if not tools:
+        return
+
+    masks, confusions = score_ensembles(line_table, fired, tools)
+    for (mask_idx, mask) in enumerate(masks):
+        names = "+".join(
+            tool for (i, tool) in enumerate(tools) if (mask >> i) & 1)
+        for (rule_idx, rule) in enumerate(ENSEMBLE_RULES):
+            for (kind_idx, kind) in enumerate(KINDS):
+                writer.writerow([names, rule, kind] +
+                                list(confusions[rule_idx, mask_idx, kind_idx]))
+
+
+def load_params(params_path, instances):
+    """Load the generator parameters of instances from a columnar store
+
+    Args:
+        params_path (str): .npz file written by generate.py -params_file
+        instances (list of str): instance names
+
+    Returns:
+        columns (dict): maps column name to np.ndarray
+        rows (np.ndarray) [len(instances)]: row of each instance in the
+            columns, or -1 if it has no parameters
+    """
+    with np.load(params_path) as data:
+        columns = {name: data[name] for name in data.files}
+    row_of = {name: i for (i, name) in enumerate(columns["instance"])}
+    rows = np.array([row_of.get(name, -1) for name in instances],
+                    dtype=np.int64)
+    return columns, rows
+
+
+def get_slices(spec, columns, rows):
+    """Group instances by the value of a parameter
+
+    Args:
+        spec (str): a column name, or the difference of two integer
+            columns (e.g. "buf_len-max_idx"), optionally followed by
+            ":<width>" to group integer values into bins of that
+            (positive) width
+        columns, rows: as returned by load_params()
+
+    Returns:
+        labels (list of str): the label of each slice
+        groups (np.ndarray) [len(rows)]: the slice of each instance
+    """
+    expr, _, width = spec.partition(":")
+    names = expr.split("-")
+    if len(names) > 2 or (width and not (width.isdigit() and int(width) > 0)):
+        raise ValueError("Invalid slice: '{}'".format(spec))
+    for name in names:
+        if name not in columns:
+            raise ValueError("Unknown parameter '{}' in slice '{}'".format(
+                name, spec))
+
+    valid = rows >= 0
+    operands = [columns[name][np.where(valid, rows, 0)] for name in names]
+    if operands[0].dtype.kind in "US":
+        if len(names) > 1 or width:
+            raise ValueError("Cannot subtract or bin '{}'".format(expr))
+        values = operands[0]
+    else:
+        # Unused parameters are recorded as -1
+        for operand in operands:
+            valid &= operand != -1
+        values = operands[0].astype(np.int64)
+        if len(names) == 2:
+            values = values - operands[1]
+        if width:
+            values = (values // int(width)) * int(width)
+
+    keys, inverse = np.unique(values[valid], return_inverse=True)
+    if width:
+        labels = ["[{}, {})".format(key, key + int(width)) for key in keys]
+    else:
+        labels = [str(key) for key in keys]
+    groups = np.full(len(rows), len(keys), dtype=np.int64)
+    groups[valid] = inverse
+    if not valid.all():
+        labels.append("NA")
+    return labels, groups
+
+
+def write_sliced_matrices(line_table, fired, params_path, slice_specs, fid):
+    """Write per-tool confusion matrices for slices of the instances
+
+    Args:
+        line_table (LineTable): as returned by get_line_table()
+        fired (dict): as returned by score_tools()
+        params_path (str): .npz file written by generate.py -params_file
+        slice_specs (list of str): parameters to slice by, see get_slices()
+        fid (file-like object): output
+    """
+    writer = csv.writer(fid)
+    writer.writerow(["tool", "slice", "value", "kind", "tp", "tn", "fp", "fn"])
+
+    columns, rows = load_params(params_path, line_table.instances)
+    slices = [(spec,) + get_slices(spec, columns, rows)
+              for spec in slice_specs]
+    for tool in sorted(fired.keys()):
+        confusions = get_instance_confusions(line_table, fired[tool])
+        flat = confusions.reshape(len(rows), -1)
+        for (spec, labels, groups) in slices:
+            totals = np.stack([
+                np.bincount(groups, weights=flat[:, j],
+                            minlength=len(labels))
+                for j in range(flat.shape[1])], axis=1).astype(np.int64)
+            totals = totals.reshape((len(labels),) + confusions.shape[1:])
+            for (group, label) in enumerate(labels):
+                for (kind_idx, kind) in enumerate(KINDS):
+                    writer.writerow([tool, spec, label, kind] +
+                                    list(totals[group, kind_idx]))
+
+
 if __name__ == "__main__":
     import argparse
     import sys
     parser = argparse.ArgumentParser()
     parser.add_argument("manifest")
     parser.add_argument("whitelist")
-    parser.add_argument("alert_files", nargs="+")
+    parser.add_argument(
+        "alert_files", nargs="+",
+        help=("Alert CSV files, columnar alert files (.npz, written by "
+              "sparser --format npz), either optionally compressed (.gz "
+              "or .zst), SQLite alert stores (.sqlite, "
+              "written by sparser --sqlite), or raw tool output "
+              "directories named after their tool ({}), which are parsed "
+              "in-process with sparser".format(", ".join(sorted(RAW_OUTPUT_PARSERS)))))
     parser.add_argument("--validation_set")
     parser.add_argument("--sound_only", action="store_true")
+    parser.add_argument(
+        "--cache_dir",
+        help=("Directory in which to keep per-tool scores, so that only "
+              "tools whose alerts, whitelist or manifest changed are "
+              "rescored"))
+    parser.add_argument(
+        "--bootstrap_file",
+        help=("If given, write bootstrap confidence intervals of each "
+              "tool's accuracy, precision, recall and F1 to this CSV file"))
+    parser.add_argument(
+        "--bootstrap_replicates", type=int, default=1000,
+        help="Number of bootstrap replicates; default 1000")
+    parser.add_argument(
+        "--confidence", type=float, default=0.95,
+        help="Confidence level of bootstrap intervals; default 0.95")
+    parser.add_argument(
+        "--seed", type=int,
+        help="Seed for bootstrap resampling")
+    parser.add_argument(
+        "--ensemble_file",
+        help=("If given, write confusion matrices of every subset of tools "
+              "combined under any-of, all-of and majority voting to this "
+              "CSV file"))
+    parser.add_argument(
+        "--params_file",
+        help="Generator parameters written by generate.py -params_file")
+    parser.add_argument(
+        "--slice_by", action="append", default=[],
+        help=("Parameter to slice confusion matrices by, e.g. generator, "
+              "buf_len:10 (bins of width 10) or buf_len-max_idx; may be "
+              "repeated. Requires --params_file and --slice_file"))
+    parser.add_argument(
+        "--slice_file",
+        help="If given, write the sliced confusion matrices to this CSV file")
     parser.add_argument(
         '-v',
         action="store_const",
@@ -140,6 +1031,10 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
     logging.basicConfig(level=args.loglevel)
+    if args.slice_file is not None and args.params_file is None:
+        parser.error("--slice_file requires --params_file")
+    if args.slice_by and args.slice_file is None:
+        parser.error("--slice_by requires --slice_file")
 
     validation_set = None
     if args.validation_set is not None:
@@ -154,70 +1049,38 @@ if __name__ == "__main__":
         sound_only=args.sound_only)
     whitelist = load_checker_whitelist(args.whitelist)
 
-    alerts = []
-    for alert_file in args.alert_files:
-        alerts += load_alerts(alert_file, whitelist)
+    cache = None
+    manifest_digest = None
+    if args.cache_dir is not None:
+        cache = ScoreCache(args.cache_dir)
+        manifest_digest = hash_json([
+            hash_file(args.manifest),
+            None if args.validation_set is None
+            else hash_file(args.validation_set),
+            args.sound_only])
 
-    all_tools = set([a.tool for a in alerts])
-    alert_index = defaultdict(set)
-    for alert in alerts:
-        alert_index[(PurePath(alert.file).name,
-                     int(alert.line))].add(alert.tool)
-
-    scores = {
-        # For each tool
-        tool: {
-            # For each tag
-            tag: {
-                # True indicates a positive response
-                True: 0,
-                # False indicates a negative reponse
-                False: 0
-            }
-            for tag in [e.value for e in Tag]
-        }
-        for tool in all_tools
-    }
+    line_table = None
+    if args.bootstrap_file is not None or args.ensemble_file is not None \
+            or args.slice_file is not None:
+        line_table = get_line_table(instance_tags)
 
-    for instance, tags in instance_tags.items():
-        for tag, line in zip(tags, range(1, len(tags) + 1)):
-            # Hits are positive response to the tag
-            hits = alert_index[(instance, line)]
-
-            for hit in hits:
-                # Indicate a positive response
-                scores[hit][tag][True] += 1
-                logging.debug("RESPONSE,%s,%s,%s,%d",
-                              Tag(tag).name, hit, instance, line)
-            for other in (all_tools - hits):
-                # Indicate a negative response
-                scores[other][tag][False] += 1
-                logging.debug("NO_RESPONSE,%s,%s,%s,%d",
-                              Tag(tag).name, other, instance, line)
-
-    tag_sets = [
-        ("cond", Tag.BUFWRITE_COND_UNSAFE, Tag.BUFWRITE_COND_SAFE),
-        ("taut", Tag.BUFWRITE_TAUT_UNSAFE, Tag.BUFWRITE_TAUT_SAFE),
-    ]
-
-    writer = csv.writer(sys.stdout)
-    writer.writerow(["tool", "kind", "tp", "tn", "fp", "fn"])
+    scores, fired = score_tools(
+        instance_tags, args.alert_files, whitelist, cache=cache,
+        manifest_digest=manifest_digest, line_table=line_table)
+    write_confusion_matrices(scores, sys.stdout)
 
-    for tool in sorted(scores.keys()):
-        tool_scores = scores[tool]
-        conf_matrices = []
-        for (set_name, unsafe, safe) in tag_sets:
-            conf_matrix = [
-                # Positive response + UNSAFE == True Positive
-                tool_scores[unsafe.value][True],
-                # Negative response + SAFE == True Negative
-                tool_scores[safe.value][False],
-                # Positive response + SAFE == False Positive
-                tool_scores[safe.value][True],
-                # Negative response + UNSAFE == False Negative
-                tool_scores[unsafe.value][False]
-            ]
-            writer.writerow([tool, set_name] + conf_matrix)
-            conf_matrices.append(conf_matrix)
-        combined_matrix = [sum(a) for a in zip(*conf_matrices)]
-        writer.writerow([tool, "all"] + combined_matrix)
+    if args.bootstrap_file is not None:
+        with open(args.bootstrap_file, "w") as fid:
+            write_confidence_intervals(
+                line_table, fired, fid,
+                num_replicates=args.bootstrap_replicates,
+                confidence=args.confidence, seed=args.seed)
+
+    if args.ensemble_file is not None:
+        with open(args.ensemble_file, "w") as fid:
+            write_ensemble_matrices(line_table, fired, fid)
+
+    if args.slice_file is not None:
+        with open(args.slice_file, "w") as fid:
+            write_sliced_matrices(line_table, fired, args.params_file,
+                                  args.slice_by or ["generator"], fid)
@@ -0,0 +1,332 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""test_score_tool_outputs.py: tests for scoring tool outputs"""
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+import sparser
+from sparser import columnar, compression
+
+import score_tool_outputs as sto
+from sa_tag import Tag
+
+CPPCHECK_OUTPUTS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+    "sparser", "tests", "real_outputs", "cppcheck")
+
+OTHER = Tag.OTHER.value
+BODY = Tag.BODY.value
+COND_SAFE = Tag.BUFWRITE_COND_SAFE.value
+COND_UNSAFE = Tag.BUFWRITE_COND_UNSAFE.value
+TAUT_SAFE = Tag.BUFWRITE_TAUT_SAFE.value
+TAUT_UNSAFE = Tag.BUFWRITE_TAUT_UNSAFE.value
+
+INSTANCE_TAGS = {
+    "a.c": [OTHER, BODY, COND_UNSAFE, COND_SAFE, OTHER],
+    "b.c": [OTHER, TAUT_UNSAFE, TAUT_SAFE, OTHER],
+    "c.c": [OTHER, COND_UNSAFE, TAUT_SAFE, OTHER],
+}
+
+WHITELIST = {
+    "tool_a": {"checkers": ["overflow"]},
+    "tool_b": {"checkers": [{"regex": "bounds.*"}]},
+}
+
+ALERTS = {
+    "a.csv": [
+        ["tool_a", "overflow", "a.c", "3", "write past end"],
+        ["tool_a", "overflow", "a.c", "4", "write past end"],
+        ["tool_a", "overflow", "b.c", "2", "write past end"],
+        ["tool_a", "unused", "c.c", "2", "not whitelisted"],
+    ],
+    "b.csv": [
+        ["tool_b", "bounds_check", "a.c", "3", "index out of bounds"],
+        ["tool_b", "bounds_check", "c.c", "2", "index out of bounds"],
+        ["tool_b", "bounds_check", "c.c", "3", "index out of bounds"],
+    ],
+}
+
+
+def write_alerts(directory, alerts=ALERTS):
+    """Write alert CSV files, returning their paths"""
+    paths = []
+    for name in sorted(alerts):
+        path = os.path.join(directory, name)
+        with open(path, "w") as fid:
+            csv.writer(fid).writerows(alerts[name])
+        paths.append(path)
+    return paths
+
+
+def normalize(alert):
+    """Make the line numbers of parsed and loaded alerts comparable"""
+    return alert._replace(line=int(alert.line))
+
+
+def assert_same_scores(result, expected):
+    (scores, fired), (expected_scores, expected_fired) = result, expected
+    assert scores == expected_scores
+    assert sorted(fired) == sorted(expected_fired)
+    for tool in fired:
+        assert np.array_equal(fired[tool], expected_fired[tool])
+
+
+class TestScoreCache():
+    def test_matches_uncached(self, tmpdir):
+        paths = write_alerts(str(tmpdir))
+        cache_dir = str(tmpdir.join("cache"))
+        line_table = sto.get_line_table(INSTANCE_TAGS)
+
+        def score(cache=None):
+            return sto.score_tools(
+                INSTANCE_TAGS, paths, WHITELIST, cache=cache,
+                manifest_digest="manifest", line_table=line_table)
+
+        expected = score()
+        assert sorted(expected[0]) == ["tool_a", "tool_b"]
+        # Scored into the cache, then read back from it
+        for _ in range(2):
+            assert_same_scores(score(sto.ScoreCache(cache_dir)), expected)
+
+        # Rescored once an alert file changes, and the old entry is pruned
+        alerts = dict(ALERTS, **{"a.csv": ALERTS["a.csv"][1:]})
+        write_alerts(str(tmpdir), alerts)
+        expected = score()
+        assert_same_scores(score(sto.ScoreCache(cache_dir)), expected)
+        cache = sto.ScoreCache(cache_dir)
+        assert len(cache.index["scores"]) == 2
+        assert len([name for name in os.listdir(cache_dir)
+                    if name.endswith(".npy")]) == 2
+
+    def test_scores_without_line_table(self, tmpdir):
+        paths = write_alerts(str(tmpdir))
+        cache_dir = str(tmpdir.join("cache"))
+        expected = sto.score_tools(INSTANCE_TAGS, paths, WHITELIST)
+        for _ in range(2):
+            assert sto.score_tools(
+                INSTANCE_TAGS, paths, WHITELIST,
+                cache=sto.ScoreCache(cache_dir),
+                manifest_digest="manifest") == expected
+
+
+class TestBootstrap():
+    def test_identical_instances(self):
+        confusions = np.tile([[[1, 2, 3, 4]]], (5, 1, 1))
+        totals = sto.bootstrap_confusions(
+            confusions, 50, np.random.RandomState(0))
+        assert totals.shape == (50, 1, 4)
+        assert (totals == [[5, 10, 15, 20]]).all()
+
+    def test_chunks_keep_draws(self):
+        confusions = np.random.RandomState(1).randint(5, size=(7, 3, 4))
+        expected = sto.bootstrap_confusions(
+            confusions, 20, np.random.RandomState(0))
+        totals = sto.bootstrap_confusions(
+            confusions, 20, np.random.RandomState(0), max_chunk_elems=21)
+        assert np.array_equal(totals, expected)
+
+    def test_known_intervals(self):
+        # The tool finds one of two bugs, so a replicate has a recall of
+        # 0, 0.5 or 1 with probabilities 1/4, 1/2 and 1/4
+        line_table = sto.get_line_table(
+            {"a.c": [COND_UNSAFE], "b.c": [COND_UNSAFE]})
+        fired = {"tool_a": np.array([True, False])}
+
+        def write_intervals(seed):
+            fid = io.StringIO()
+            sto.write_confidence_intervals(
+                line_table, fired, fid, num_replicates=1000, seed=seed)
+            return fid.getvalue()
+
+        output = write_intervals(0)
+        assert output == write_intervals(0)
+        intervals = {
+            (row[1], row[2]): [float(value) for value in row[3:]]
+            for row in list(csv.reader(io.StringIO(output)))[1:]}
+        assert intervals[("cond", "recall")] == [0.5, 0.0, 1.0]
+        assert intervals[("all", "accuracy")] == [0.5, 0.0, 1.0]
+        # Precision is 1 whenever it is defined
+        assert intervals[("cond", "precision")] == [1.0, 1.0, 1.0]
+
+
+class TestAlertFiles():
+    def test_detected_by_content(self, tmpdir):
+        # Compressed and columnar alert files are recognized whatever they
+        # are named, as sparser recognizes compressed tool outputs
+        expected = sto.score_tools(
+            INSTANCE_TAGS, write_alerts(str(tmpdir)), WHITELIST)
+        a_path = str(tmpdir.join("a.csv"))
+        with compression.open_output(a_path + ".gz", "w") as out_file:
+            csv.writer(out_file).writerows(ALERTS["a.csv"])
+        os.rename(a_path + ".gz", a_path)
+        b_path = str(tmpdir.join("b.csv"))
+        columnar.save(columnar.to_table(
+            [row[:3] + [int(row[3])] + row[4:] for row in ALERTS["b.csv"]]),
+            b_path)
+
+        assert not sto.is_columnar(a_path)
+        assert sto.is_columnar(b_path)
+        assert sto.score_tools(
+            INSTANCE_TAGS, [a_path, b_path], WHITELIST) == expected
+
+
+class TestRawAlerts():
+    def test_matches_parsed_csv(self, tmpdir, monkeypatch):
+        tool_dir = str(tmpdir.join("cppcheck"))
+        os.mkdir(tool_dir)
+        for name in sorted(os.listdir(CPPCHECK_OUTPUTS)):
+            with open(os.path.join(CPPCHECK_OUTPUTS, name), "rb") as in_file:
+                with compression.open_output(
+                        os.path.join(tool_dir, name + ".gz")) as out_file:
+                    out_file.write(in_file.read())
+
+        # The alert CSV that sa_parse_tool_outputs.sh would write
+        csv_path = str(tmpdir.join("cppcheck.csv"))
+        monkeypatch.setattr(sys, "argv", [
+            "sparser", "cppcheck_xml", CPPCHECK_OUTPUTS, "--output", csv_path])
+        sparser.parser_entrypoint()
+
+        whitelist = {"cppcheck": {"checkers": ["arrayIndexOutOfBounds"]}}
+        alerts = sto.load_raw_alerts(tool_dir, whitelist)
+        assert alerts
+        assert set(alert.checker for alert in alerts) == set(
+            ["arrayIndexOutOfBounds"])
+        assert sorted(map(normalize, alerts)) == sorted(
+            map(normalize, sto.load_alerts(csv_path, whitelist)))
+
+    def test_unknown_tool_dir(self, tmpdir):
+        with pytest.raises(ValueError):
+            sto.load_raw_alerts(str(tmpdir.mkdir("lint")), {})
+
+
+def random_fired(num_tools, seed=0):
+    """A random line table, and the random responses of tools to it"""
+    rng = np.random.RandomState(seed)
+    instance_tags = {
+        "{}.c".format(i): list(rng.randint(OTHER, TAUT_UNSAFE + 1, size=8))
+        for i in range(20)}
+    line_table = sto.get_line_table(instance_tags)
+    fired = {"tool_{}".format(i): rng.rand(len(line_table.tag)) < 0.4
+             for i in range(num_tools)}
+    return line_table, fired
+
+
+class TestEnsembles():
+    def test_single_tool(self):
+        line_table, fired = random_fired(1)
+        masks, confusions = sto.score_ensembles(line_table, fired, ["tool_0"])
+        expected = sto.get_instance_confusions(
+            line_table, fired["tool_0"]).sum(axis=0)
+        assert list(masks) == [1]
+        for rule_idx in range(len(sto.ENSEMBLE_RULES)):
+            assert np.array_equal(confusions[rule_idx, 0], expected)
+
+    def test_voting_rules(self):
+        line_table, fired = random_fired(3)
+        tools = sorted(fired)
+        masks, confusions = sto.score_ensembles(line_table, fired, tools)
+        votes = sum(fired[tool].astype(int) for tool in tools)
+        expected = [votes > 0, votes == 3, votes >= 2]
+        for (rule_idx, responses) in enumerate(expected):
+            assert np.array_equal(
+                confusions[rule_idx, list(masks).index(7)],
+                sto.get_instance_confusions(line_table, responses).sum(axis=0))
+
+    def test_chunks(self):
+        line_table, fired = random_fired(4)
+        tools = sorted(fired)
+        expected = sto.score_ensembles(line_table, fired, tools)[1]
+        confusions = sto.score_ensembles(
+            line_table, fired, tools, max_chunk_elems=1)[1]
+        assert np.array_equal(confusions, expected)
+
+
+def write_params(path, **columns):
+    np.savez(path, instance=np.array(["a.c", "b.c", "c.c"]), **columns)
+    return path
+
+
+class TestSlices():
+    def test_single_column(self, tmpdir):
+        params_path = write_params(
+            str(tmpdir.join("params.npz")), buf_len=np.array([10, 20, 10]))
+        line_table = sto.get_line_table(INSTANCE_TAGS)
+        hits = set([("a.c", 3), ("a.c", 4), ("b.c", 2)])
+        fired = {"tool_a": sto.get_fired(line_table, hits)}
+
+        fid = io.StringIO()
+        sto.write_sliced_matrices(
+            line_table, fired, params_path, ["buf_len"], fid)
+        rows = list(csv.reader(io.StringIO(fid.getvalue())))[1:]
+        counts = {(row[2], row[3]): [int(x) for x in row[4:]] for row in rows}
+        assert len(rows) == len(counts) == 6
+        # a.c and c.c: (tp, tn, fp, fn) of each kind
+        assert counts[("10", "cond")] == [1, 0, 1, 1]
+        assert counts[("10", "taut")] == [0, 1, 0, 0]
+        assert counts[("10", "all")] == [1, 1, 1, 1]
+        # b.c
+        assert counts[("20", "cond")] == [0, 0, 0, 0]
+        assert counts[("20", "taut")] == [1, 1, 0, 0]
+        assert counts[("20", "all")] == [1, 1, 0, 0]
+
+    def test_missing_values(self, tmpdir):
+        params_path = write_params(
+            str(tmpdir.join("params.npz")), buf_len=np.array([10, 25, -1]),
+            generator=np.array(["cond", "taut", "cond"]))
+        columns, rows = sto.load_params(params_path, ["c.c", "d.c", "b.c"])
+        assert list(rows) == [2, -1, 1]
+
+        # Instances without parameters, or with unused ones, are NA
+        labels, groups = sto.get_slices("buf_len:20", columns, rows)
+        assert labels == ["[20, 40)", "NA"]
+        assert list(groups) == [1, 1, 0]
+        labels, groups = sto.get_slices("generator", columns, rows)
+        assert labels == ["cond", "taut", "NA"]
+        assert list(groups) == [0, 2, 1]
+
+        with pytest.raises(ValueError):
+            sto.get_slices("generator:10", columns, rows)
+        with pytest.raises(ValueError):
+            sto.get_slices("buf_len:0", columns, rows)
+        with pytest.raises(ValueError):
+            sto.get_slices("idx", columns, rows)
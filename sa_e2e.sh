@@ -68,11 +68,15 @@ begin=$(date +%s)
 end=$(date +%s)
 echo Done running tools, took: $(expr $end - $begin) seconds
 
-echo ++Parsing tool outputs...
-begin=$(date +%s)
-./sa_parse_tool_outputs.sh $working_dir $tools
-end=$(date +%s)
-echo Done parsing tool output, took: $(expr $end - $begin) seconds
+# With SA_SCORE_RAW set, the scorer parses raw tool outputs itself, and
+# with SA_TOOL_FUSED set the tools were parsed as they ran
+if [ -z "$SA_SCORE_RAW" ] && [ -z "$SA_TOOL_FUSED" ]; then
+    echo ++Parsing tool outputs...
+    begin=$(date +%s)
+    ./sa_parse_tool_outputs.sh $working_dir $tools
+    end=$(date +%s)
+    echo Done parsing tool output, took: $(expr $end - $begin) seconds
+fi
 
 echo ++Scoring tools...
 begin=$(date +%s)
@@ -54,4 +54,5 @@ DATA_DIR=$working_dir docker-compose run --rm sababi \
     /mnt/data/src \
     -seed $SA_SEED \
     -num_instances $num_instances \
-    -metadata_file /mnt/data/manifest.json
+    -metadata_file /mnt/data/manifest.json \
+    -params_file /mnt/data/params.npz
@@ -53,6 +53,13 @@ fi
 working_dir=$(realpath $1)
 export DATA_DIR=$working_dir
 
+# Set SA_ALERT_COMPRESS to gz or zst to compress the alert CSVs; tool
+# outputs are decompressed as they are parsed, whatever SA_TOOL_COMPRESS was
+alert_suffix=""
+if [ -n "$SA_ALERT_COMPRESS" ]; then
+    alert_suffix=".$SA_ALERT_COMPRESS"
+fi
+
 run_parser () {
     parser=""
     case $1 in
@@ -67,14 +74,13 @@ run_parser () {
         ;;
     esac
 
-    tmpdir=/mnt/data/alerts/$1
-    parallel="parallel --files --tmpdir $tmpdir --will-cite -X"
     if [ -d "$working_dir/$1" ]; then
-        script="cd /mnt/data/$1"
-        script="$script && mkdir -p $tmpdir"
-        script="$script && ls | $parallel sparser $parser {}"
-        script="$script && cat $tmpdir/*.par | sort | uniq > /mnt/data/alerts/${1}.csv"
-        script="$script && rm -r $tmpdir"
+        script="sparser $parser /mnt/data/$1 --jobs \$(nproc) --sort_unique"
+        script="$script --output /mnt/data/alerts/${1}.csv$alert_suffix"
+        if [ -n "$SA_PARSE_INCREMENTAL" ]; then
+            # Only parse outputs that are new or changed since the last run
+            script="$script --state /mnt/data/alerts/${1}.state"
+        fi
 
         if [ -n parser ]; then
             DATA_DIR=$working_dir docker-compose run \
@@ -52,15 +52,81 @@ fi
 working_dir=$(realpath $1)
 export DATA_DIR=$working_dir
 
+# Bounds on each tool run, see sa_tools/*/analyze_file.sh
+SA_TOOL_TIMEOUT="${SA_TOOL_TIMEOUT:-600}"
+limit_args="-e SA_TOOL_TIMEOUT=$SA_TOOL_TIMEOUT"
+limit_args="$limit_args -e SA_TOOL_CPU_LIMIT=$SA_TOOL_CPU_LIMIT"
+limit_args="$limit_args -e SA_TOOL_MEM_LIMIT=$SA_TOOL_MEM_LIMIT"
+# Compression of each tool output, gzip or zstd; sparser reads either
+limit_args="$limit_args -e SA_TOOL_COMPRESS=$SA_TOOL_COMPRESS"
+mkdir -p $working_dir/metrics
+
+# Print percentiles of the wall time of a tool's runs, and the number of
+# runs that timed out (status 124) or failed
+summarize_metrics() {
+    tail -n +2 $2 | sort -t, -k2 -g | awk -F, -v tool=$1 '
+        { wall[NR] = $2; cpu += $3 + $4
+          if ($5 == 124) timeouts++; else if ($5 != 0) failures++ }
+        function pct(p) { i = int((p * NR + 99) / 100); return wall[i < 1 ? 1 : i] }
+        END { if (NR == 0) { print tool ": no runs"; exit }
+              printf "%s: %d runs, wall seconds p50 %.2f p90 %.2f p99 %.2f " \
+                     "max %.2f, cpu seconds %.1f, %d timed out, %d failed\n",
+                     tool, NR, pct(50), pct(90), pct(99), wall[NR], cpu,
+                     timeouts, failures }'
+}
+
 script="cd /mnt/data/src && ls | parallel --will-cite --ungroup analyze_file.sh {}"
+
+# With SA_TOOL_FUSED set, sparser's tool driver runs each tool and parses
+# its outputs in memory into alerts/<tool>.csv, so that no raw outputs are
+# written unless SA_TOOL_KEEP_RAW is also set. sparser is mounted into the
+# tool containers for this. As in sa_parse_tool_outputs.sh, the alert CSVs
+# are compressed if SA_ALERT_COMPRESS is set, and kept raw outputs if
+# SA_TOOL_COMPRESS is, but only with gzip: the tool images lack the
+# zstandard package.
+fused_mounts="-v $(pwd)/sparser:/sparser"
+fused_script="PYTHONPATH=/sparser python -m sparser.driver"
+alert_suffix=""
+if [ -n "$SA_TOOL_FUSED" ]; then
+    if [ "$SA_ALERT_COMPRESS" = "zst" ] || \
+       { [ -n "$SA_TOOL_KEEP_RAW" ] && [ "$SA_TOOL_COMPRESS" = "zstd" ]; }; then
+        echo "SA_TOOL_FUSED only compresses with gzip:" \
+             "use SA_TOOL_COMPRESS=gzip and SA_ALERT_COMPRESS=gz" >&2
+        exit 1
+    fi
+    if [ -n "$SA_ALERT_COMPRESS" ]; then
+        alert_suffix=".$SA_ALERT_COMPRESS"
+    fi
+    mkdir -p $working_dir/alerts
+fi
+
 for service_name in "${@:2}"; do
     echo ++++Running tool: $service_name.
     start_time=$(date +%s)
 
-    mkdir -p $working_dir/$service_name
+    echo "job,wall,user,sys,status" > $working_dir/metrics/$service_name.csv
+    if [ -n "$SA_TOOL_FUSED" ]; then
+        command="$fused_script $service_name /mnt/data/src --jobs \$(nproc)"
+        command="$command --sort_unique"
+        command="$command --output /mnt/data/alerts/$service_name.csv$alert_suffix"
+        if [ -n "$SA_TOOL_KEEP_RAW" ]; then
+            command="$command --keep_raw /mnt/data/$service_name"
+            if [ "$SA_TOOL_COMPRESS" = "gzip" ]; then
+                command="$command --compress gz"
+            fi
+        fi
+        mounts=$fused_mounts
+    else
+        mkdir -p $working_dir/$service_name
+        command="$script /mnt/data/$service_name"
+        mounts=""
+    fi
     DATA_DIR=$working_dir docker-compose run \
-        --rm $service_name \
-        bash -c "$script /mnt/data/$service_name"
+        --rm $limit_args $mounts \
+        -e SA_TOOL_METRICS=/mnt/data/metrics/$service_name.csv \
+        $service_name \
+        bash -c "$command"
+    summarize_metrics $service_name $working_dir/metrics/$service_name.csv
 
     end_time=$(date +%s)
     echo Done running $service_name, took: $(expr $end_time - $start_time) seconds
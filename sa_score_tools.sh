@@ -49,16 +49,47 @@ if [ -f "$working_dir/validation_set" ]; then
     validation_arg="--validation_set /mnt/data/validation_set"
 fi
 
-DATA_DIR=$working_dir docker-compose run --rm sababi bash -c "\
-    python /sa_babi/score_tool_outputs.py $validation_arg \
+# Per-tool scores are cached here, so that only tools whose alerts,
+# checker whitelist or manifest changed are rescored on the next run. Each
+# cache only keeps what its last run used, so the full and sound-only
+# runs get one each.
+cache_dir="/mnt/data/score_cache"
+
+# Tools are scored inside the tool_parser container, as the scorer reads
+# alert files with sparser. By default, they are scored from the alert
+# CSVs made by sa_parse_tool_outputs.sh. If SA_SCORE_RAW is set, the raw
+# tool outputs are parsed and scored in one step instead.
+alert_args="/mnt/data/alerts/*.csv*"
+if [ -n "$SA_SCORE_RAW" ]; then
+    alert_args=""
+    for tool in clang_sa frama-c cppcheck; do
+        if [ -d "$working_dir/$tool" ]; then
+            alert_args="$alert_args /mnt/data/$tool"
+        fi
+    done
+fi
+
+# Break results down by generator if its parameters were saved
+slice_arg=""
+if [ -f "$working_dir/params.npz" ]; then
+    slice_arg="--params_file /mnt/data/params.npz --slice_by generator \
+    --slice_file /mnt/data/tool_slice_matrix.csv"
+fi
+
+DATA_DIR=$working_dir docker-compose run --rm -v $(pwd)/sa_babi:/sa_babi tool_parser bash -c "\
+    python /sa_babi/score_tool_outputs.py $validation_arg --cache_dir $cache_dir/all \
+    $slice_arg \
+    --bootstrap_file /mnt/data/tool_confidence_intervals.csv \
+    --ensemble_file /mnt/data/tool_ensemble_matrix.csv \
     /mnt/data/manifest.json \
     /sa_babi/checkers.yaml \
-    /mnt/data/alerts/*.csv > /mnt/data/tool_confusion_matrix.csv"
+    $alert_args > /mnt/data/tool_confusion_matrix.csv"
 
 
-DATA_DIR=$working_dir docker-compose run --rm sababi bash -c "\
-    python /sa_babi/score_tool_outputs.py $validation_arg \
+DATA_DIR=$working_dir docker-compose run --rm -v $(pwd)/sa_babi:/sa_babi tool_parser bash -c "\
+    python /sa_babi/score_tool_outputs.py $validation_arg --cache_dir $cache_dir/sound \
     --sound_only\
+    --bootstrap_file /mnt/data/tool_confidence_intervals_sound.csv \
     /mnt/data/manifest.json \
     /sa_babi/checkers.yaml \
-    /mnt/data/alerts/*.csv > /mnt/data/tool_confusion_matrix_sound.csv"
+    $alert_args > /mnt/data/tool_confusion_matrix_sound.csv"
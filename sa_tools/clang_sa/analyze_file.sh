@@ -42,10 +42,29 @@ out_dir=$2
 
 name=$(basename $cfile)
 
-clang \
+# Optional bounds on the run: SA_TOOL_TIMEOUT wall clock seconds,
+# SA_TOOL_CPU_LIMIT CPU seconds and SA_TOOL_MEM_LIMIT MB of memory; unset
+# or 0 means unbounded
+[ "${SA_TOOL_CPU_LIMIT:-0}" -gt 0 ] && ulimit -t $SA_TOOL_CPU_LIMIT
+[ "${SA_TOOL_MEM_LIMIT:-0}" -gt 0 ] && ulimit -v $(($SA_TOOL_MEM_LIMIT * 1024))
+
+# Time the run; its wall, user and system seconds and exit status (124 if
+# timed out) are appended to SA_TOOL_METRICS
+TIMEFORMAT="%R,%U,%S"
+metrics=$( { time timeout ${SA_TOOL_TIMEOUT:-0} clang \
     --analyze \
     -Xanalyzer -analyzer-output=plist \
     -Xanalyzer -analyzer-checker=alpha.security \
-    $cfile > /dev/null 2>&1 
+    $cfile > /dev/null 2>&1 ; echo $? ; } 2>&1 )
+
+if [ -n "$SA_TOOL_METRICS" ]; then
+    echo "$name,${metrics//$'\n'/,}" >> $SA_TOOL_METRICS
+fi
 
 mv "${name%.c}.plist" $out_dir/$name.clang_sa.xml
+
+# Optionally compress the output, SA_TOOL_COMPRESS=gzip or zstd
+case "$SA_TOOL_COMPRESS" in
+    gzip) gzip -f $out_dir/$name.clang_sa.xml ;;
+    zstd) zstd -q -f --rm $out_dir/$name.clang_sa.xml ;;
+esac
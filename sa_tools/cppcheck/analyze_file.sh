@@ -41,6 +41,27 @@ cfile=$1
 out_dir=$2
 
 name=$(basename $cfile)
-cppcheck --xml --enable=all $cfile \
+
+# Optional bounds on the run: SA_TOOL_TIMEOUT wall clock seconds,
+# SA_TOOL_CPU_LIMIT CPU seconds and SA_TOOL_MEM_LIMIT MB of memory; unset
+# or 0 means unbounded
+[ "${SA_TOOL_CPU_LIMIT:-0}" -gt 0 ] && ulimit -t $SA_TOOL_CPU_LIMIT
+[ "${SA_TOOL_MEM_LIMIT:-0}" -gt 0 ] && ulimit -v $(($SA_TOOL_MEM_LIMIT * 1024))
+
+# Time the run; its wall, user and system seconds and exit status (124 if
+# timed out) are appended to SA_TOOL_METRICS
+TIMEFORMAT="%R,%U,%S"
+metrics=$( { time timeout ${SA_TOOL_TIMEOUT:-0} \
+    cppcheck --xml --enable=all $cfile \
     2> $out_dir/$name.cppcheck.xml \
-    > /dev/null
+    > /dev/null ; echo $? ; } 2>&1 )
+
+if [ -n "$SA_TOOL_METRICS" ]; then
+    echo "$name,${metrics//$'\n'/,}" >> $SA_TOOL_METRICS
+fi
+
+# Optionally compress the output, SA_TOOL_COMPRESS=gzip or zstd
+case "$SA_TOOL_COMPRESS" in
+    gzip) gzip -f $out_dir/$name.cppcheck.xml ;;
+    zstd) zstd -q -f --rm $out_dir/$name.cppcheck.xml ;;
+esac
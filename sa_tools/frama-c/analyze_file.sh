@@ -42,4 +42,26 @@ out_dir=$2
 
 name=$(basename $cfile)
 outfile="$out_dir/$name.frama-c.txt"
-frama-c -val $cfile | grep warning > $outfile
+
+# Optional bounds on the run: SA_TOOL_TIMEOUT wall clock seconds,
+# SA_TOOL_CPU_LIMIT CPU seconds and SA_TOOL_MEM_LIMIT MB of memory; unset
+# or 0 means unbounded
+[ "${SA_TOOL_CPU_LIMIT:-0}" -gt 0 ] && ulimit -t $SA_TOOL_CPU_LIMIT
+[ "${SA_TOOL_MEM_LIMIT:-0}" -gt 0 ] && ulimit -v $(($SA_TOOL_MEM_LIMIT * 1024))
+
+# Time the run; its wall, user and system seconds and exit status (124 if
+# timed out) are appended to SA_TOOL_METRICS
+TIMEFORMAT="%R,%U,%S"
+exec 3>&2
+metrics=$( { time timeout ${SA_TOOL_TIMEOUT:-0} frama-c -val $cfile 2>&3 \
+    | grep warning > $outfile ; echo ${PIPESTATUS[0]} ; } 2>&1 )
+
+if [ -n "$SA_TOOL_METRICS" ]; then
+    echo "$name,${metrics//$'\n'/,}" >> $SA_TOOL_METRICS
+fi
+
+# Optionally compress the output, SA_TOOL_COMPRESS=gzip or zstd
+case "$SA_TOOL_COMPRESS" in
+    gzip) gzip -f $outfile ;;
+    zstd) zstd -q -f --rm $outfile ;;
+esac
@@ -0,0 +1,120 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Benchmark the clang_sa plist parser against a full plistlib parse
+
+The baseline reads each plist whole with plistlib, as the parser did
+before it read only the parts it needs, and then extracts the same
+diagnostics. Usage::
+
+    python benchmarks/clang_sa_plist.py [plist_dir] [--repeat N]
+"""
+import argparse
+import io
+import os
+import plistlib
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sparser import ClangAnalyzerPlistParser
+from sparser.model import Diagnostic, Message, Location, ToolInfo
+
+DEFAULT_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "real_outputs", "clang_sa")
+
+
+def load_full(input_file):
+    """Diagnostics from a plist read whole with plistlib"""
+    if hasattr(plistlib, "load"):
+        plist_data = plistlib.load(input_file)
+    else:
+        plist_data = plistlib.readPlist(input_file)
+    file_dict = plist_data['files']
+    tool_info = ToolInfo(
+        name="clang_sa", version=plist_data.get('clang_version'))
+    result = []
+    for entry in plist_data['diagnostics']:
+        location = entry["location"]
+        result.append(
+            Diagnostic(
+                tool_info=tool_info,
+                kind=entry["category"],
+                message=Message(
+                    text=entry["description"],
+                    location=Location(
+                        path=file_dict[location["file"]],
+                        line_start=location["line"]))))
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("plist_dir", nargs="?", default=DEFAULT_DIR)
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    contents = []
+    for name in sorted(os.listdir(args.plist_dir)):
+        with open(os.path.join(args.plist_dir, name), "rb") as fid:
+            contents.append(fid.read())
+
+    parser = ClangAnalyzerPlistParser()
+    loaders = [("plistlib", load_full), ("selective", parser.load)]
+    expected = [load_full(io.BytesIO(data)) for data in contents]
+    assert [parser.load(io.BytesIO(data)) for data in contents] == expected
+
+    num_bytes = sum(len(data) for data in contents)
+    print("{} files, {:.1f} kB, best of {} runs".format(
+        len(contents), num_bytes / 1e3, args.repeat))
+    baseline = None
+    for (name, load) in loaders:
+        seconds = min(
+            timeit.repeat(
+                lambda: [load(io.BytesIO(data)) for data in contents],
+                number=1,
+                repeat=args.repeat))
+        baseline = baseline or seconds
+        print("{:>10}: {:8.2f} ms {:6.1f} MB/s {:5.2f}x".format(
+            name, seconds * 1e3, num_bytes / seconds / 1e6,
+            baseline / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Measure the start-up cost of the sparser command line
+
+sa_parse_tool_outputs.sh and GNU parallel pipelines may launch sparser
+once per handful of files, so its fixed cost matters. This runs the
+command line on one small real output per parser, and an empty Python
+program for reference, and reports the best and median wall time of
+each. Usage::
+
+    python benchmarks/startup.py [--runs N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "..", "tests", "real_outputs")
+
+CLI = "import sparser; sparser.parser_entrypoint()"
+
+# (label, parser name, real output directory)
+CASES = [
+    ("cppcheck_xml", "cppcheck_xml", "cppcheck"),
+    ("clang_sa_plist", "clang_sa_plist", "clang_sa"),
+    ("framac_warnings", "framac_warnings", "frama-c"),
+    ("gcc_warnings", "gcc_warnings", "gcc"),
+]
+
+
+def time_command(command, runs, env):
+    times = []
+    with open(os.devnull, "wb") as devnull:
+        for _ in range(runs):
+            start = time.time()
+            subprocess.check_call(command, stdout=devnull, env=env)
+            times.append(time.time() - start)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.join(HERE, "..")] +
+        [path for path in [env.get("PYTHONPATH")] if path])
+
+    commands = [("python (empty)", [sys.executable, "-c", "pass"]),
+                ("import sparser", [sys.executable, "-c", "import sparser"])]
+    for (label, parser_name, tool_dir) in CASES:
+        tool_dir = os.path.join(DATA_DIR, tool_dir)
+        input_file = os.path.join(tool_dir, sorted(os.listdir(tool_dir))[0])
+        commands.append(
+            (label, [sys.executable, "-c", CLI, parser_name, input_file]))
+
+    print("best and median of {} runs".format(args.runs))
+    for (label, command) in commands:
+        best, median = time_command(command, args.runs, env)
+        print("{:>16}: {:7.1f} ms {:7.1f} ms".format(
+            label, best * 1e3, median * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Throughput and memory benchmarks of every parser
+
+For each registered parser with a generator in synthetic.py, this writes
+a large synthetic input and measures:
+
+- load_iter: parsing the input in-process, best of --repeat runs, and the
+  peak Python heap while parsing (with tracemalloc, where available)
+- cli: the sparser command line end to end, writing CSV to /dev/null,
+  best of --repeat runs, and the peak resident memory of the process
+  (on Linux)
+
+Results are printed, and appended as one JSON line per run to
+--results_file (by default benchmarks/results.jsonl, which git ignores)
+along with the git commit and Python version, so that runs before and
+after a parser change can be compared. Each run is
+compared with the latest earlier run of the same size on the same
+Python. Usage::
+
+    python benchmarks/suite.py [--diagnostics N] [--repeat N]
+        [--parsers name ...] [--results_file path]
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import sparser
+from synthetic import GENERATORS
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+CLI = "import sparser; sparser.parser_entrypoint()"
+
+# On Linux a child's ru_maxrss includes the memory of the parent when it
+# forked, so the command line reports its own peak from /proc instead
+PROC_STATUS = "/proc/self/status"
+REPORT_PEAK = ("; import sys; sys.stderr.write([line for line in open({!r}) "
+               "if line.startswith('VmHWM:')][0])".format(PROC_STATUS))
+
+DEFAULT_RESULTS_FILE = os.path.join(HERE, "results.jsonl")
+
+
+def get_commit():
+    """The git commit of the working tree, or None outside a repository"""
+    try:
+        with open(os.devnull, "wb") as devnull:
+            return subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                stderr=devnull).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_rates(num_diags, num_bytes, seconds):
+    return {
+        "seconds": seconds,
+        "diags_per_sec": num_diags / seconds,
+        "mb_per_sec": num_bytes / seconds / 1e6,
+    }
+
+
+def bench_load_iter(parser_cls, data, repeat):
+    """Time parsing data in-process, then measure its peak heap use"""
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        num_diags = sum(1 for _ in parser_cls().load_iter(io.BytesIO(data)))
+        times.append(time.time() - start)
+    result = get_rates(num_diags, len(data), min(times))
+    result["diagnostics"] = num_diags
+
+    result["peak_mb"] = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        for _ in parser_cls().load_iter(io.BytesIO(data)):
+            pass
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def run_cli(parser_name, path, env):
+    """Run the command line once; get its wall time and peak RSS in MB"""
+    use_proc = os.path.exists(PROC_STATUS)
+    code = CLI + REPORT_PEAK if use_proc else CLI
+    with open(os.devnull, "wb") as devnull:
+        start = time.time()
+        process = subprocess.Popen(
+            [sys.executable, "-c", code, parser_name, path],
+            stdout=devnull, stderr=subprocess.PIPE, env=env)
+        stderr = process.communicate()[1]
+        seconds = time.time() - start
+    if process.returncode != 0:
+        raise RuntimeError("sparser {} failed on {}: {}".format(
+            parser_name, path, stderr.decode("utf-8", "replace")))
+    if not use_proc:
+        return seconds, None
+    # "VmHWM:     12345 kB"
+    return seconds, int(stderr.decode().split()[-2]) / 1e3
+
+
+def bench_cli(parser_name, path, num_diags, repeat, env):
+    runs = [run_cli(parser_name, path, env) for _ in range(repeat)]
+    result = get_rates(num_diags, os.path.getsize(path),
+                       min(seconds for (seconds, _) in runs))
+    result["max_rss_mb"] = runs[0][1]
+    return result
+
+
+def load_previous(results_file, record):
+    """The latest earlier record comparable to record, or None"""
+    if not os.path.exists(results_file):
+        return None
+    previous = None
+    with open(results_file) as fid:
+        for line in fid:
+            other = json.loads(line)
+            if other.get("diagnostics") == record["diagnostics"] and \
+                    other.get("python") == record["python"]:
+                previous = other
+    return previous
+
+
+def print_results(record, previous):
+    print("{:>16} {:>6} {:>10} {:>8} {:>8} {:>8}".format(
+        "parser", "mode", "diags/s", "MB/s", "mem MB", "vs prev"))
+    for parser_name in sorted(record["parsers"]):
+        for mode in ["load_iter", "cli"]:
+            result = record["parsers"][parser_name][mode]
+            memory = result.get("peak_mb", result.get("max_rss_mb"))
+            change = ""
+            try:
+                before = previous["parsers"][parser_name][mode]
+                change = "{:.2f}x".format(
+                    result["diags_per_sec"] / before["diags_per_sec"])
+            except (TypeError, KeyError):
+                pass
+            print("{:>16} {:>6} {:>10.0f} {:>8.1f} {:>8} {:>8}".format(
+                parser_name, mode.split("_")[0], result["diags_per_sec"],
+                result["mb_per_sec"],
+                "-" if memory is None else "{:.1f}".format(memory), change))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "--diagnostics", type=int, default=10000,
+        help="Number of diagnostics in each synthetic input")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument(
+        "--parsers", nargs="+",
+        help="Parsers to benchmark; default all with a generator")
+    arg_parser.add_argument("--results_file", default=DEFAULT_RESULTS_FILE)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    parser_names = args.parsers or sorted(sparser.Registry)
+    for parser_name in parser_names:
+        if parser_name not in GENERATORS:
+            print("Skipping {}: no synthetic input generator".format(
+                parser_name))
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.join(HERE, "..")] +
+        [path for path in [env.get("PYTHONPATH")] if path])
+
+    record = {
+        "time": datetime.datetime.utcnow().isoformat() + "Z",
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "diagnostics": args.diagnostics,
+        "repeat": args.repeat,
+        "parsers": {},
+    }
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for parser_name in parser_names:
+            if parser_name not in GENERATORS:
+                continue
+            data = GENERATORS[parser_name](args.diagnostics,
+                                           random.Random(args.seed))
+            path = os.path.join(tmp_dir, parser_name)
+            with open(path, "wb") as fid:
+                fid.write(data)
+
+            parser_cls = sparser.get_parser_info(parser_name).cls
+            load_iter = bench_load_iter(parser_cls, data, args.repeat)
+            cli = bench_cli(parser_name, path, load_iter["diagnostics"],
+                            args.repeat, env)
+            record["parsers"][parser_name] = {
+                "input_mb": len(data) / 1e6,
+                "load_iter": load_iter,
+                "cli": cli,
+            }
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    previous = load_previous(args.results_file, record)
+    print_results(record, previous)
+    with open(args.results_file, "a") as fid:
+        fid.write(json.dumps(record, sort_keys=True) + "\n")
+    print("Results appended to {}".format(args.results_file))
+
+
+if __name__ == "__main__":
+    main()
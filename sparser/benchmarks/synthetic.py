@@ -0,0 +1,166 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Synthetic inputs for each built-in parser
+
+Each generator writes the output a tool would produce for a batch of
+sa-bAbI-like source files, with num_diags diagnostics, surrounded by the
+noise the tool typically emits: source excerpts and carets for the
+compilers, progress messages for frama-c, and paths of events for the
+clang static analyzer.
+"""
+import plistlib
+
+from xml.sax.saxutils import quoteattr
+
+
+def get_file_name(rng):
+    return "{:010x}.c".format(rng.getrandbits(40))
+
+
+def compiler_log(num_diags, rng, with_column=True):
+    lines = []
+    for _ in range(num_diags):
+        name = get_file_name(rng)
+        line = rng.randint(1, 99)
+        entity = rng.randint(0, 9)
+        lines.append("{}: In function 'main':".format(name))
+        lines.append(
+            "{}:{}:{}: warning: variable 'entity_{}' set but not used "
+            "[-Wunused-but-set-variable]".format(name, line,
+                                                 rng.randint(1, 40), entity))
+        lines.append("     char entity_{}[{}];              // Tag.BODY"
+                     .format(entity, rng.randint(2, 99)))
+        lines.append("          ^~~~~~~~")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def framac_log(num_diags, rng):
+    lines = []
+    for _ in range(num_diags):
+        name = get_file_name(rng)
+        lines.append("[kernel] Parsing {} (with preprocessing)".format(name))
+        lines.append("[value] Analyzing a complete application starting at "
+                     "main")
+        lines.append("[value] computing for function rand <- main.")
+        lines.append(
+            "{}:{}:[value] warning: accessing out of bounds index. "
+            "assert entity_{} < {};".format(name, rng.randint(1, 99),
+                                            rng.randint(0, 9),
+                                            rng.randint(2, 99)))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def cppcheck_xml(num_diags, rng):
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n<results version="2">\n'
+        '    <cppcheck version="1.76.1"/>\n    <errors>\n'
+    ]
+    for _ in range(num_diags):
+        name = get_file_name(rng)
+        message = "Array 'entity_{}[{}]' accessed at index {}, which is out " \
+            "of bounds.".format(rng.randint(0, 9), rng.randint(2, 99),
+                                rng.randint(100, 999))
+        parts.append(
+            '        <error id="arrayIndexOutOfBounds" severity="error" '
+            'msg={0} verbose={0} cwe="788">\n'.format(quoteattr(message)))
+        for _ in range(rng.randint(1, 3)):
+            parts.append(
+                '            <location file="{}" line="{}"/>\n'.format(
+                    name, rng.randint(1, 99)))
+        parts.append('        </error>\n')
+    parts.append('    </errors>\n</results>\n')
+    return "".join(parts).encode("utf-8")
+
+
+def clang_sa_plist(num_diags, rng, path_length=4):
+    def location():
+        return {"line": rng.randint(1, 99), "col": rng.randint(1, 40),
+                "file": 0}
+
+    diagnostics = []
+    for _ in range(num_diags):
+        path = []
+        for _ in range(path_length):
+            path.append({
+                "kind": "control",
+                "edges": [{
+                    "start": [location(), location()],
+                    "end": [location(), location()],
+                }],
+            })
+        path.append({
+            "kind": "event",
+            "location": location(),
+            "ranges": [[location(), location()]],
+            "depth": 0,
+            "extended_message": "Access out-of-bound array element",
+            "message": "Access out-of-bound array element",
+        })
+        diagnostics.append({
+            "path": path,
+            "description": "Access out-of-bound array element (buffer "
+                           "overflow)",
+            "category": "Logic error",
+            "type": "Out-of-bound array access",
+            "check_name": "alpha.security.ArrayBoundV2",
+            "issue_hash_content_of_line_in_context":
+                "{:032x}".format(rng.getrandbits(128)),
+            "issue_context_kind": "function",
+            "issue_context": "main",
+            "issue_hash_function_offset": str(rng.randint(1, 20)),
+            "location": location(),
+        })
+    value = {
+        "clang_version": "clang version 3.8.1-24 (tags/RELEASE_381/final)",
+        "files": [get_file_name(rng)],
+        "diagnostics": diagnostics,
+    }
+    if hasattr(plistlib, "dumps"):
+        return plistlib.dumps(value)
+    return plistlib.writePlistToString(value)
+
+
+# Parser name -> function(num_diags, rng) returning the input as bytes
+GENERATORS = {
+    "clang_warnings": compiler_log,
+    "gcc_warnings": compiler_log,
+    "framac_warnings": framac_log,
+    "cppcheck_xml": cppcheck_xml,
+    "clang_sa_plist": clang_sa_plist,
+}
@@ -0,0 +1,146 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Benchmark the line-based warning parsers on large synthetic logs
+
+Each log is mostly noise (source excerpts, carets, progress messages) with
+a warning every --noise lines. The baseline decodes every line with a
+codecs reader and matches it against the parser's regex, as the parsers
+did before prefiltering blocks of bytes. Usage::
+
+    python benchmarks/text_parsers.py [--lines N] [--noise N] [--repeat N]
+"""
+import argparse
+import codecs
+import io
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sparser import ClangWarningParser
+from sparser import FramacWarningParser
+from sparser import GccWarningParser
+
+WARNINGS = {
+    "gcc": ("src/{0}.c:{1}:10: warning: variable 'entity_{1}' set but not "
+            "used [-Wunused-but-set-variable]"),
+    "clang": ("src/{0}.c:{1}:5: warning: array index 12 is past the end of "
+              "the array [-Warray-bounds]"),
+    "frama-c": ("src/{0}.c:{1}:[value] warning: accessing out of bounds "
+                "index. assert entity_{1} < 36;"),
+}
+
+NOISE = [
+    "src/{0}.c: In function 'main':",
+    "    char entity_{1}[2];                              // Tag.BODY",
+    "          ^~~~~~~~",
+    "[kernel] Parsing src/{0}.c (with preprocessing)",
+    "[value] computing for function main <- main.",
+    "        entity_{1} = entity_{1} + 1;",
+]
+
+PARSERS = {
+    "gcc": GccWarningParser(),
+    "clang": ClangWarningParser(),
+    "frama-c": FramacWarningParser(),
+}
+
+
+def make_log(tool, num_lines, noise, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(num_lines):
+        name = "{:010x}".format(rng.getrandbits(40))
+        template = WARNINGS[tool] if i % noise == 0 else rng.choice(NOISE)
+        lines.append(template.format(name, rng.randint(1, 99)))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def load_baseline(parser, input_file):
+    """(path, line, message) of each warning, matching every line"""
+    reader = codecs.getreader("utf-8")
+    result = []
+    for line in reader(input_file):
+        match = parser.message_regex.match(line.strip())
+        if match:
+            result.append((match.group("path"), int(match.group("line")),
+                           match.group("message")))
+    return result
+
+
+def load_prefiltered(parser, input_file):
+    return [(d.message.location.path, d.message.location.line_start,
+             d.message.text) for d in parser.load_iter(input_file)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--lines", type=int, default=500000)
+    arg_parser.add_argument(
+        "--noise", type=int, default=20,
+        help="One line in this many is a warning")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    for tool in sorted(PARSERS):
+        parser = PARSERS[tool]
+        data = make_log(tool, args.lines, args.noise)
+        assert load_prefiltered(parser, io.BytesIO(data)) == \
+            load_baseline(parser, io.BytesIO(data))
+
+        print("{}: {} lines, {:.1f} MB, best of {} runs".format(
+            tool, args.lines, len(data) / 1e6, args.repeat))
+        baseline = None
+        for (name, load) in [("codecs", load_baseline),
+                             ("prefilter", load_prefiltered)]:
+            seconds = min(
+                timeit.repeat(
+                    lambda: load(parser, io.BytesIO(data)),
+                    number=1,
+                    repeat=args.repeat))
+            baseline = baseline or seconds
+            print("{:>10}: {:8.1f} ms {:6.1f} MB/s {:5.2f}x".format(
+                name, seconds * 1e3, len(data) / seconds / 1e6,
+                baseline / seconds))
+
+
+if __name__ == "__main__":
+    main()
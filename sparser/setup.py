@@ -72,4 +72,9 @@ setup(
     version="0.1.0",
     description="test",
     packages=find_packages(),
-    entry_points={'console_scripts': ["sparser = sparser:parser_entrypoint"]})
+    entry_points={
+        'console_scripts': [
+            "sparser = sparser:parser_entrypoint",
+            "sparser-run = sparser.driver:main",
+        ]
+    })
@@ -36,10 +36,35 @@
 # 
 # DM18-0995
 # 
-from .clang import ClangWarningParser
-from .clang import ClangAnalyzerPlistParser
-from .framac import FramacWarningParser
-from .gcc import GccWarningParser
-from .cppcheck import CppcheckXmlV2Parser
+import sys
+
 from .parser import Registry
+from .parser import register_parser
+from .parser import get_parser_info
 from .parser import parser_entrypoint
+
+# Module of each parser class; parser modules are imported on first use so
+# that the command line only imports the parser that it runs
+_PARSER_MODULES = {
+    "ClangWarningParser": "clang",
+    "ClangAnalyzerPlistParser": "clang",
+    "FramacWarningParser": "framac",
+    "GccWarningParser": "gcc",
+    "CppcheckXmlV2Parser": "cppcheck",
+}
+
+if sys.version_info >= (3, 7):
+
+    def __getattr__(name):
+        if name not in _PARSER_MODULES:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(__name__, name))
+        from importlib import import_module
+        module = import_module("." + _PARSER_MODULES[name], __name__)
+        return getattr(module, name)
+else:
+    from .clang import ClangWarningParser
+    from .clang import ClangAnalyzerPlistParser
+    from .framac import FramacWarningParser
+    from .gcc import GccWarningParser
+    from .cppcheck import CppcheckXmlV2Parser
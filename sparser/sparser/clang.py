@@ -38,10 +38,9 @@
 # 
 #!/usr/bin/env python
 import re
-import plistlib
-import codecs
 
-from .parser import Parser, register_parser
+from . import plist
+from .parser import Parser, iter_candidate_lines
 from .model import Diagnostic, Message, Location, ToolInfo
 
 
@@ -66,6 +65,9 @@ class ClangWarningParser(Parser):
                                 "\[(?P<switch>\-W.+)\]\s*$"))
     """str: regex for matching clang warnings"""
 
+    line_prefilter = re.compile(b"warning|note")
+    """bytes regex: found in every line that message_regex matches"""
+
     def load_iter(self, input_file):
         """Generates diagnostics from clang warning output
 
@@ -78,9 +80,8 @@ class ClangWarningParser(Parser):
         """
         tool_info = ToolInfo(name="clang")
 
-        reader = codecs.getreader("utf-8")
-        for line in reader(input_file):
-            m = self.message_regex.match(line.strip())
+        for line in iter_candidate_lines(input_file, self.line_prefilter):
+            m = self.message_regex.match(line)
             if m is not None:
                 yield Diagnostic(
                     tool_info=tool_info,
@@ -92,17 +93,27 @@ class ClangWarningParser(Parser):
                             line_start=int(m.group("line")))))
 
 
-register_parser(
-    name="clang_warnings",
-    tool_name="clang",
-    input_type="text/plain",
-    description="Parses textual warning output from the clang compiler.",
-    cls=ClangWarningParser)
+class ClangAnalyzerPlistParser(Parser):
+    """A parser for plist output from the clang static analyzer
 
+    Only the parts of the plist used for diagnostics are read; in
+    particular, the "path" of events leading to each diagnostic is
+    skipped. Both XML and binary plists are accepted.
+    """
+
+    plist_select = {
+        "clang_version": plist.ALL,
+        "files": plist.ALL,
+        "diagnostics": {
+            "category": plist.ALL,
+            "description": plist.ALL,
+            "location": plist.ALL,
+        },
+    }
+    """dict: the parts of the plist read, see plist.select_value()"""
 
-class ClangAnalyzerPlistParser(Parser):
     def load_iter(self, input_file):
-        plist_data = plistlib.readPlist(input_file)
+        plist_data = plist.load(input_file, self.plist_select)
 
         # File names are stored in the following dictionary
         file_dict = plist_data['files']
@@ -122,11 +133,3 @@ class ClangAnalyzerPlistParser(Parser):
                 location=Location(path=file_name, line_start=location["line"]))
 
             yield diag
-
-
-register_parser(
-    name="clang_sa_plist",
-    tool_name="clang_sa",
-    input_type="application/octet-stream",
-    description="Parses plist output from the clang static analysis tool.",
-    cls=ClangAnalyzerPlistParser)
@@ -0,0 +1,159 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Columnar (NPZ) storage of alerts
+
+An alert file holds the same five fields as an alert CSV row, one array
+per column:
+
+- tools, checkers, paths: the distinct values of each dictionary-encoded
+  column, as unicode arrays
+- tool, checker, path: int32 indices into those values, one per alert
+- line: int32 line numbers, 0 where unknown
+- message_offsets, message_data: the UTF-8 encoded messages concatenated
+  into one uint8 array; message i is
+  message_data[message_offsets[i]:message_offsets[i + 1]]
+
+This module is only imported when alerts are stored this way, so that
+parsing does not depend on numpy.
+"""
+from collections import namedtuple
+import io
+
+import numpy as np
+import six
+
+from . import compression
+
+AlertTable = namedtuple("AlertTable", [
+    "tools", "tool", "checkers", "checker", "paths", "path", "line",
+    "message_offsets", "message_data"
+])
+
+
+def encode(values):
+    """Dictionary-encode a sequence of strings
+
+    Returns:
+        uniques (np.ndarray): sorted distinct values
+        codes (np.ndarray) of np.int32: index of each value in uniques
+    """
+    uniques = sorted(set(values))
+    index = dict((value, i) for i, value in enumerate(uniques))
+    codes = np.fromiter(
+        (index[value] for value in values), dtype=np.int32, count=len(values))
+    return np.array(uniques, dtype="U"), codes
+
+
+def to_table(rows):
+    """Build an AlertTable
+
+    Args:
+        rows (iterable of tuple): (tool, checker, path, line, message)
+            rows, as written to alert CSV files; None fields are stored as
+            empty strings or line 0
+
+    Returns:
+        AlertTable
+    """
+    tools, checkers, paths, lines, messages = [], [], [], [], []
+    for tool, checker, path, line, message in rows:
+        tools.append(six.text_type(tool or ""))
+        checkers.append(six.text_type(checker or ""))
+        paths.append(six.text_type(path or ""))
+        lines.append(line or 0)
+        messages.append(six.text_type(message or "").encode("utf-8"))
+
+    lengths = np.array([len(message) for message in messages], dtype=np.int64)
+    message_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    message_data = np.frombuffer(b"".join(messages), dtype=np.uint8)
+
+    tool_values, tool_codes = encode(tools)
+    checker_values, checker_codes = encode(checkers)
+    path_values, path_codes = encode(paths)
+    return AlertTable(
+        tools=tool_values,
+        tool=tool_codes,
+        checkers=checker_values,
+        checker=checker_codes,
+        paths=path_values,
+        path=path_codes,
+        line=np.array(lines, dtype=np.int32),
+        message_offsets=message_offsets.astype(np.int64),
+        message_data=message_data)
+
+
+def save(table, path):
+    """Write an AlertTable to path as NPZ
+
+    The file is compressed if path ends in .gz or .zst.
+    """
+    # Through a file object, as np.savez() would append ".npz" to a path
+    with compression.open_output(path, "wb") as out_file:
+        if compression.get_codec(path) is None:
+            np.savez(out_file, **table._asdict())
+        else:
+            # Zip files seek back over what they wrote, compressors can't
+            buf = io.BytesIO()
+            np.savez(buf, **table._asdict())
+            out_file.write(buf.getvalue())
+
+
+def load(in_file):
+    """Read an AlertTable from a path or binary file written by save()"""
+    if (isinstance(in_file, six.string_types)
+            and compression.detect(in_file) is not None):
+        # Zip files are read out of order, so decompress them up front
+        with compression.open_input(in_file) as compressed_file:
+            in_file = io.BytesIO(compressed_file.read())
+    with np.load(in_file) as data:
+        return AlertTable(*(data[field] for field in AlertTable._fields))
+
+
+def get_message(table, i):
+    """Get the message text of alert i"""
+    start, end = table.message_offsets[i], table.message_offsets[i + 1]
+    return table.message_data[start:end].tobytes().decode("utf-8")
+
+
+def iter_rows(table):
+    """Generate the (tool, checker, path, line, message) row of each alert"""
+    for i in range(len(table.line)):
+        yield (table.tools[table.tool[i]], table.checkers[table.checker[i]],
+               table.paths[table.path[i]], int(table.line[i]),
+               get_message(table, i))
@@ -0,0 +1,152 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Transparent gzip and zstd compression of tool outputs and alert files
+
+Inputs are recognized by their leading magic bytes, so compressed tool
+outputs are parsed whatever they are named, and are decompressed as a
+stream rather than into memory. Outputs are compressed according to the
+extension of their path, ".gz" or ".zst".
+
+zstd needs the optional zstandard package, which is only imported when a
+zstd file is read or written.
+"""
+import gzip
+import io
+
+import six
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+MAGIC = {
+    b"\x1f\x8b": GZIP,
+    b"\x28\xb5\x2f\xfd": ZSTD,
+}
+
+EXTENSIONS = {
+    ".gz": GZIP,
+    ".zst": ZSTD,
+}
+
+# Compression levels of the gzip and zstd command line tools
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading or writing zstd files requires the zstandard package")
+    return zstandard
+
+
+def detect(path):
+    """Get the codec a file is compressed with, or None if uncompressed"""
+    with open(path, "rb") as in_file:
+        head = in_file.read(max(len(magic) for magic in MAGIC))
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def get_codec(path):
+    """Get the codec implied by the extension of a path, or None"""
+    for extension, codec in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    return None
+
+
+def open_input(path):
+    """Open a possibly compressed file for binary reading
+
+    Returns:
+        A binary file object that yields the decompressed contents
+    """
+    codec = detect(path)
+    if codec == GZIP:
+        return gzip.open(path, "rb")
+    if codec == ZSTD:
+        zstandard = _import_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def open_text_input(path):
+    """Open a possibly compressed file for text reading
+
+    On Python 2 the file is binary, as csv.reader expects.
+
+    Returns:
+        A file object that yields the decompressed contents as text
+    """
+    in_file = open_input(path)
+    if six.PY2:
+        return in_file
+    return io.TextIOWrapper(in_file)
+
+
+def open_output(path, mode="wb"):
+    """Open a file for writing, compressed according to its extension
+
+    Args:
+        path (str): the file to write; ".gz" and ".zst" paths are
+            compressed
+        mode (str): "wb" for binary or "w" for text; on Python 2 text
+            files are binary, as csv.writer expects
+
+    Returns:
+        A file object that compresses what is written to it
+    """
+    codec = get_codec(path)
+    if codec is None:
+        return open(path, mode)
+    if codec == GZIP:
+        out_file = gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    else:
+        zstandard = _import_zstandard()
+        out_file = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+            open(path, "wb"), closefd=True)
+    if "b" in mode or six.PY2:
+        return out_file
+    return io.TextIOWrapper(out_file)
@@ -40,7 +40,7 @@
 # -*- coding: utf-8 -*-
 import xml.etree.ElementTree as ET
 from .model import Diagnostic, Message, Location, ToolInfo
-from .parser import Parser, register_parser
+from .parser import Parser
 
 
 class CppcheckXmlV2Parser(Parser):
@@ -83,14 +83,23 @@ class CppcheckXmlV2Parser(Parser):
             An iterator of Diagnostic objects
         """
 
-        tree = ET.parse(input_file)
-        root = tree.getroot()
-
-        cppcheck_node = root.find("cppcheck")
-        version = cppcheck_node.get("version")
-        tool_info = ToolInfo(name="cppcheck", version=version)
-
-        for error_node in root.iter("error"):
+        # Stream the report so that large reports need not fit in memory.
+        # Each <error> is handled on its end event and then dropped from
+        # its parent, so only the current error subtree is ever held.
+        tool_info = None
+        parent = None
+        for event, node in ET.iterparse(input_file, events=("start", "end")):
+            if event == "start":
+                if node.tag == "cppcheck":
+                    tool_info = ToolInfo(
+                        name="cppcheck", version=node.get("version"))
+                elif node.tag == "errors":
+                    parent = node
+                continue
+            if node.tag != "error":
+                continue
+
+            error_node = node
             diag = Diagnostic(tool_info=tool_info, kind=error_node.get("id"))
 
             messages = [
@@ -107,12 +116,8 @@ class CppcheckXmlV2Parser(Parser):
                 # Steal the location from the first location nodem if it exists
                 diag.message.location = messages[0].location
 
-            yield diag
+            error_node.clear()
+            if parent is not None:
+                parent.remove(error_node)
 
-
-register_parser(
-    name="cppcheck_xml",
-    tool_name="cppcheck",
-    input_type="application/xml",
-    description="Parses xml output (v2) from cppcheck.",
-    cls=CppcheckXmlV2Parser)
+            yield diag
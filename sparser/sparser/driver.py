@@ -0,0 +1,390 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Run static analysis tools and parse their outputs in memory
+
+This fuses sa_tools/*/analyze_file.sh with sparser: each tool is run on
+one source file at a time, its output is read from a pipe (or, for clang,
+from a temporary plist) and parsed with the matching sparser parser, and
+the located alerts of every file go to one alert sink, a CSV, NPZ or
+SQLite file. Raw outputs are only written to disk when asked to, for
+debugging, under the names the shell wrappers give them.
+
+Each run is bounded and measured like the shell wrappers do: runs are
+killed by timeout(1), resource limits are set before the tool starts,
+and the wall, user and system seconds and exit status (124 if timed out)
+of each run are appended to a metrics CSV. Everything else the tools
+print is discarded.
+"""
+from collections import namedtuple
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from . import compression
+from .parser import expand_inputs, get_parser_info, get_row, write_rows
+
+# How to run a tool: its command, with {source} and {output} replaced by
+# the source file and the file to write (for output "file"), the stream
+# or file its output is read from, the parser of that output, and the
+# extension of raw outputs kept on disk
+Tool = namedtuple("Tool", ["args", "output", "parser_name", "extension"])
+
+TOOLS = {
+    "clang_sa": Tool(
+        args=["clang", "--analyze",
+              "-Xanalyzer", "-analyzer-output=plist",
+              "-Xanalyzer", "-analyzer-checker=alpha.security",
+              "{source}", "-o", "{output}"],
+        output="file",
+        parser_name="clang_sa_plist",
+        extension="clang_sa.xml"),
+    "cppcheck": Tool(
+        args=["cppcheck", "--xml", "--enable=all", "{source}"],
+        output="stderr",
+        parser_name="cppcheck_xml",
+        extension="cppcheck.xml"),
+    "frama-c": Tool(
+        args=["frama-c", "-val", "{source}"],
+        output="stdout",
+        parser_name="framac_warnings",
+        extension="frama-c.txt"),
+}
+
+# Exit status of timeout(1) when it killed the tool
+TIMEOUT_STATUS = 124
+
+
+def _set_limits(cpu_limit, mem_limit):
+    """Get a function that bounds the CPU seconds and MB of memory of a
+    child process, as `ulimit -t` and `ulimit -v` do"""
+    import resource
+
+    def set_limits():
+        if cpu_limit:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+        if mem_limit:
+            limit = mem_limit * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return set_limits
+
+
+def run_tool(tool, source, timeout=0, cpu_limit=None, mem_limit=None):
+    """Run a tool on a source file and capture its output
+
+    The tool is run in the directory of the source file, on its name.
+
+    Args:
+        tool (Tool): how to run the tool, e.g. TOOLS["cppcheck"]
+        source (str): the source file
+        timeout (int): wall clock seconds before the tool is killed, or 0
+        cpu_limit (int): CPU seconds the tool may use, or None
+        mem_limit (int): MB of memory the tool may use, or None
+
+    Returns:
+        output (bytes): the output of the tool
+        metrics (tuple): wall, user and system seconds, and exit status
+    """
+    import resource
+
+    tmp_dir = tempfile.mkdtemp() if tool.output == "file" else None
+    out_path = None if tmp_dir is None else os.path.join(tmp_dir, "output")
+    args = ["timeout", str(timeout)] + [
+        arg.format(source=os.path.basename(source), output=out_path)
+        for arg in tool.args
+    ]
+    devnull = open(os.devnull, "wb")
+    try:
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.time()
+        process = subprocess.Popen(
+            args,
+            cwd=os.path.dirname(os.path.abspath(source)),
+            stdin=devnull,
+            stdout=subprocess.PIPE if tool.output == "stdout" else devnull,
+            stderr=subprocess.PIPE if tool.output == "stderr" else devnull,
+            preexec_fn=_set_limits(cpu_limit, mem_limit))
+        stdout, stderr = process.communicate()
+        wall = time.time() - start
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        if tool.output == "stdout":
+            output = stdout
+        elif tool.output == "stderr":
+            output = stderr
+        elif os.path.exists(out_path):
+            with open(out_path, "rb") as out_file:
+                output = out_file.read()
+        else:
+            output = b""
+    finally:
+        devnull.close()
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+    metrics = (wall, after.ru_utime - before.ru_utime,
+               after.ru_stime - before.ru_stime, process.returncode)
+    return output, metrics
+
+
+def parse_output(parser_name, output, status=0):
+    """Parse the output of a tool run into its located diagnostics
+
+    The output of a failed run may be cut short; what could be parsed of
+    it is kept, and the parse error logged.
+    """
+    logger = logging.getLogger(__name__)
+    parser_instance = get_parser_info(parser_name).cls()
+    alerts = []
+    try:
+        for alert in parser_instance.load_iter(io.BytesIO(output)):
+            if alert.message.location is not None:
+                alerts.append(alert)
+    except Exception as error:
+        if status == 0:
+            raise
+        logger.warning("Could not parse all of the output of a run with "
+                       "exit status %d: %s", status, error)
+    return alerts
+
+
+# tool name and run options used by _run_file in pool workers
+_run_args = None
+
+
+def _init_worker(tool_name, options):
+    global _run_args
+    _run_args = (tool_name, options)
+
+
+def _run_file(source):
+    """Run the tool on one source file
+
+    Returns:
+        name (str): the name of the source file
+        metrics (tuple): as returned by run_tool()
+        alerts (list of Diagnostic): the located diagnostics of the run
+    """
+    tool_name, options = _run_args
+    tool = TOOLS[tool_name]
+    output, metrics = run_tool(
+        tool, source,
+        timeout=options["timeout"],
+        cpu_limit=options["cpu_limit"],
+        mem_limit=options["mem_limit"])
+
+    name = os.path.basename(source)
+    if options["keep_raw"] is not None:
+        raw_path = os.path.join(options["keep_raw"], "{}.{}".format(
+            name, tool.extension))
+        if options["compress"] is not None:
+            raw_path += "." + options["compress"]
+        with compression.open_output(raw_path) as raw_file:
+            raw_file.write(output)
+
+    return name, metrics, parse_output(tool.parser_name, output, metrics[3])
+
+
+def iter_runs(tool_name, sources, options, jobs=1):
+    """Run a tool on source files, in parallel if requested
+
+    Args:
+        tool_name (str): a key of TOOLS
+        sources (list of str): source files
+        options (dict): timeout, cpu_limit, mem_limit, and keep_raw, the
+            directory to keep raw outputs in or None, and compress, the
+            extension to compress them with ("gz", "zst") or None
+        jobs (int): number of worker processes; 1 runs in this process
+
+    Returns:
+        iterator of tuple: as returned by _run_file(), in the order of
+            sources
+    """
+    if jobs <= 1 or len(sources) <= 1:
+        _init_worker(tool_name, options)
+        for source in sources:
+            yield _run_file(source)
+        return
+
+    import multiprocessing
+    pool = multiprocessing.Pool(
+        jobs, initializer=_init_worker, initargs=(tool_name, options))
+    try:
+        for result in pool.imap(_run_file, sources):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main():
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(
+        description=("Run a static analysis tool on source files and parse "
+                     "its outputs into alerts"))
+    arg_parser.add_argument("tool", choices=sorted(TOOLS))
+    arg_parser.add_argument(
+        "sources",
+        nargs="+",
+        help="Source files, or directories of source files")
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of tool runs in parallel")
+    arg_parser.add_argument(
+        "--timeout",
+        type=int,
+        default=int(os.environ.get("SA_TOOL_TIMEOUT") or 0),
+        help=("Wall clock seconds before a run is killed, 0 for no limit "
+              "(default: $SA_TOOL_TIMEOUT or 0)"))
+    arg_parser.add_argument(
+        "--cpu_limit",
+        type=int,
+        default=int(os.environ.get("SA_TOOL_CPU_LIMIT") or 0) or None,
+        help="CPU seconds of each run (default: $SA_TOOL_CPU_LIMIT)")
+    arg_parser.add_argument(
+        "--mem_limit",
+        type=int,
+        default=int(os.environ.get("SA_TOOL_MEM_LIMIT") or 0) or None,
+        help="MB of memory of each run (default: $SA_TOOL_MEM_LIMIT)")
+    arg_parser.add_argument(
+        "--metrics",
+        default=os.environ.get("SA_TOOL_METRICS") or None,
+        help=("Append the wall, user and system seconds and exit status "
+              "of each run to this CSV (default: $SA_TOOL_METRICS)"))
+    arg_parser.add_argument(
+        "--keep_raw",
+        help="Also write the raw output of each run to this directory")
+    arg_parser.add_argument(
+        "--compress",
+        choices=["gz", "zst"],
+        help="Compress the raw outputs kept with --keep_raw")
+    arg_parser.add_argument(
+        "--sort_unique",
+        action="store_true",
+        help="Write each distinct alert once, in sorted CSV row order")
+    arg_parser.add_argument(
+        "--format",
+        choices=["csv", "npz"],
+        default="csv",
+        help="Write alert rows as CSV, or as columnar NPZ")
+    arg_parser.add_argument(
+        "-o",
+        "--output",
+        help=("Write alerts here instead of to stdout; required for npz. "
+              "Compressed if it ends in .gz or .zst"))
+    arg_parser.add_argument(
+        "--sqlite",
+        help=("Add alerts to this SQLite file (see sparser.store), which "
+              "may be shared by several tools"))
+    arg_parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1000,
+        help="Number of diagnostics per insert into SQLite")
+    arg_parser.add_argument(
+        '-v',
+        '--verbose',
+        help="Be verbose",
+        action="store_const",
+        dest="loglevel",
+        const=logging.INFO,
+    )
+    args = arg_parser.parse_args()
+    if args.format == "npz" and args.output is None:
+        arg_parser.error("--format npz requires --output")
+    if args.sqlite is not None and args.output is not None:
+        arg_parser.error("--sqlite and --output are mutually exclusive")
+
+    logging.basicConfig(
+        level=args.loglevel, format="%(levelname)s: %(message)s")
+    logger = logging.getLogger('sparser_run')
+
+    sources = expand_inputs(args.sources)
+    logger.info("Running %s on %d files", args.tool, len(sources))
+    if args.keep_raw is not None and not os.path.isdir(args.keep_raw):
+        os.makedirs(args.keep_raw)
+    options = dict(
+        timeout=args.timeout,
+        cpu_limit=args.cpu_limit,
+        mem_limit=args.mem_limit,
+        keep_raw=args.keep_raw,
+        compress=args.compress)
+
+    metrics_file = None
+    if args.metrics is not None:
+        metrics_file = open(args.metrics, "a")
+
+    def iter_sourced_alerts():
+        """Generate each located diagnostic with its source file"""
+        for (name, metrics, alerts) in iter_runs(args.tool, sources, options,
+                                                 args.jobs):
+            if metrics_file is not None:
+                metrics_file.write("{},{:.3f},{:.3f},{:.3f},{}\n".format(
+                    name, *metrics))
+            if metrics[3] == TIMEOUT_STATUS:
+                logger.warning("%s timed out on %s", args.tool, name)
+            for alert in alerts:
+                yield name, alert
+
+    try:
+        if args.sqlite is not None:
+            from . import store
+            with store.AlertStore(args.sqlite) as alert_store:
+                count = alert_store.insert_sourced(
+                    iter_sourced_alerts(), batch_size=args.batch_size)
+            logger.info("Inserted %d diagnostics", count)
+        else:
+            write_rows((get_row(alert)
+                        for (_, alert) in iter_sourced_alerts()),
+                       args.output, args.format, args.sort_unique)
+    finally:
+        if metrics_file is not None:
+            metrics_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -39,10 +39,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import re
-import codecs
 
 from .model import Diagnostic, Message, Location, ToolInfo
-from .parser import Parser, register_parser
+from .parser import Parser, iter_candidate_lines
 
 
 class FramacWarningParser(Parser):
@@ -63,6 +62,9 @@ class FramacWarningParser(Parser):
                                 "(?P<message>.*?)\s*$"))
     """str: regex for matching frama-c warnings"""
 
+    line_prefilter = re.compile(b"warning|note")
+    """bytes regex: found in every line that message_regex matches"""
+
     def load_iter(self, input_file):
         """Generates diagnostics from frama-c warning output
 
@@ -75,9 +77,8 @@ class FramacWarningParser(Parser):
         """
         tool_info = ToolInfo(name="frama-c")
 
-        reader = codecs.getreader("utf-8")
-        for line in reader(input_file):
-            match = self.message_regex.match(line.strip())
+        for line in iter_candidate_lines(input_file, self.line_prefilter):
+            match = self.message_regex.match(line)
             if match:
                 yield Diagnostic(
                     tool_info=tool_info,
@@ -86,12 +87,4 @@ class FramacWarningParser(Parser):
                         text=match.group("message"),
                         location=Location(
                             path=match.group("path"),
-                            line_start=match.group("line"))))
-
-
-register_parser(
-    name="framac_warnings",
-    tool_name="frama-c",
-    input_type="text/plain",
-    description="Parses textual warning output from frama-c modules.",
-    cls=FramacWarningParser)
+                            line_start=int(match.group("line")))))
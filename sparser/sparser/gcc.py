@@ -38,10 +38,9 @@
 # 
 #!/usr/bin/env python
 import re
-import codecs
 
 from .model import Diagnostic, Message, Location, ToolInfo
-from .parser import Parser, register_parser
+from .parser import Parser, iter_candidate_lines
 
 
 class GccWarningParser(Parser):
@@ -71,6 +70,9 @@ class GccWarningParser(Parser):
                                 "\[(?P<switch>\-W.+)\]\s*$"))
     """str: regex for matching gcc warnings"""
 
+    line_prefilter = re.compile(b"warning|note")
+    """bytes regex: found in every line that message_regex matches"""
+
     def load_iter(self, input_file):
         """Generate diagnostics from gcc/g++ warning output
 
@@ -86,9 +88,8 @@ class GccWarningParser(Parser):
         gaps in consistency.) A fully-featured parser would likely handle
         edge cases such as warnings that span multiple messages.
         """
-        reader = codecs.getreader("utf-8")
-        for line in reader(input_file):
-            m = self.message_regex.match(line.strip())
+        for line in iter_candidate_lines(input_file, self.line_prefilter):
+            m = self.message_regex.match(line)
             if m is not None:
                 yield Diagnostic(
                     tool_info=ToolInfo(name="gcc"),
@@ -98,11 +99,3 @@ class GccWarningParser(Parser):
                         location=Location(
                             path=m.group("path"),
                             line_start=int(m.group("line")))))
-
-
-register_parser(
-    name="gcc_warnings",
-    tool_name="gcc",
-    input_type="text/plain",
-    description="Parses textual warning output from gcc/g++.",
-    cls=GccWarningParser)
@@ -0,0 +1,224 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Incremental parsing of tool outputs
+
+A state file records the size, modification time and sha256 digest of
+every input that was parsed, with the alert rows parsed from it. On the
+next run only new inputs, and inputs whose contents changed, are parsed
+again, and the rows of inputs that no longer exist are dropped; the rows
+of all other inputs are read back from the state. An input whose size and
+modification time are unchanged is assumed to be unchanged, and one that
+was only touched is not parsed again either, as its digest is unchanged.
+
+Keeping the rows lets CSV and NPZ output be rewritten without reparsing,
+but it means the state file grows with the full volume of alerts, about
+as large as the alert CSV itself. When alerts go to an SQLite alert
+store, which records the source of each alert (see
+AlertStore.delete_sources()), the state keeps only the inputs and their
+stats.
+
+The state file is SQLite, like sparser.store, and is reset when it was
+written with a different parser, tool version or choice of keeping rows.
+"""
+import hashlib
+import os
+import sqlite3
+
+# Bump when the schema changes
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS inputs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    id INTEGER PRIMARY KEY,
+    input TEXT NOT NULL,
+    tool TEXT,
+    checker TEXT,
+    path TEXT,
+    line INTEGER,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS rows_input ON rows (input);
+"""
+
+
+def hash_file(path, block_size=1 << 20):
+    """Get the hex sha256 digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as in_file:
+        for block in iter(lambda: in_file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class InputState(object):
+    """An SQLite file of parsed inputs and their alert rows
+
+    Args:
+        path (str): state file, created if it does not exist
+        parser_name (str): name of the parser the inputs are parsed with
+        tool_version (str): the tool version override, or None
+        keep_rows (bool): whether to record the alert rows of each input,
+            or only the input and its stats
+    """
+
+    def __init__(self, path, parser_name, tool_version=None,
+                 keep_rows=True):
+        self.conn = sqlite3.connect(path)
+        self.keep_rows = keep_rows
+        # (size, mtime, digest) of the inputs found by changes()
+        self._stats = dict()
+        settings = [("schema", str(SCHEMA_VERSION)),
+                    ("parser", parser_name),
+                    ("tool_version", tool_version or ""),
+                    ("keep_rows", str(int(keep_rows)))]
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            recorded = dict(self.conn.execute("SELECT key, value FROM meta"))
+            if "schema" in recorded and recorded["schema"] != settings[0][1]:
+                raise ValueError(
+                    "State file '{}' has schema version {}, expected {}"
+                    .format(path, recorded["schema"], SCHEMA_VERSION))
+            if any(recorded.get(key) != value for (key, value) in settings):
+                self.conn.execute("DELETE FROM inputs")
+                self.conn.execute("DELETE FROM rows")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO meta VALUES (?, ?)", settings)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def paths(self):
+        """Get the sorted paths of all recorded inputs"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT path FROM inputs ORDER BY path")]
+
+    def changes(self, paths):
+        """Find the inputs to parse and the recorded inputs to drop
+
+        Touched inputs whose contents did not change are recorded with
+        their new modification time.
+
+        Args:
+            paths (list of str): the current inputs
+
+        Returns:
+            changed (list of str): the new and changed inputs, in the
+                order of paths
+            removed (list of str): the recorded inputs not in paths
+        """
+        recorded = dict(
+            (row[0], row[1:]) for row in self.conn.execute(
+                "SELECT path, size, mtime, digest FROM inputs"))
+        changed = []
+        touched = []
+        for path in paths:
+            stat = os.stat(path)
+            old = recorded.get(path)
+            if old is not None and old[:2] == (stat.st_size, stat.st_mtime):
+                continue
+            digest = hash_file(path)
+            self._stats[path] = (stat.st_size, stat.st_mtime, digest)
+            if old is not None and old[2] == digest:
+                touched.append(path)
+            else:
+                changed.append(path)
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE inputs SET size = ?, mtime = ? WHERE path = ?",
+                [self._stats[path][:2] + (path, ) for path in touched])
+        current = set(paths)
+        removed = sorted(path for path in recorded if path not in current)
+        return changed, removed
+
+    def update(self, parsed):
+        """Record parsed inputs, replacing their rows, in one transaction
+
+        Args:
+            parsed (iterable of (str, list)): each input path with its
+                (tool, checker, path, line, message) alert rows, which
+                are ignored unless keep_rows was set
+        """
+        with self.conn:
+            for (path, rows) in parsed:
+                stat = self._stats.pop(path, None)
+                if stat is None:
+                    stat = os.stat(path)
+                    stat = (stat.st_size, stat.st_mtime, hash_file(path))
+                self.conn.execute("DELETE FROM rows WHERE input = ?",
+                                  (path, ))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?)",
+                    (path, ) + stat)
+                if not self.keep_rows:
+                    continue
+                self.conn.executemany(
+                    "INSERT INTO rows (input, tool, checker, path, line, "
+                    "message) VALUES (?, ?, ?, ?, ?, ?)",
+                    [[path] + list(row) for row in rows])
+
+    def remove(self, paths):
+        """Drop inputs and their rows, in one transaction"""
+        with self.conn:
+            for path in paths:
+                self.conn.execute("DELETE FROM rows WHERE input = ?",
+                                  (path, ))
+                self.conn.execute("DELETE FROM inputs WHERE path = ?",
+                                  (path, ))
+
+    def rows(self, paths):
+        """Generate the recorded alert rows of inputs, in the order of paths
+        """
+        for path in paths:
+            for row in self.conn.execute(
+                    "SELECT tool, checker, path, line, message FROM rows "
+                    "WHERE input = ? ORDER BY id", (path, )):
+                yield row
@@ -36,22 +36,48 @@
 # 
 # DM18-0995
 # 
-from mongoengine import Document, EmbeddedDocument, EmbeddedDocumentField
-from mongoengine import StringField, IntField, ListField
+class _Model(object):
+    """Base class of plain, slotted model objects
 
+    Subclasses list their attributes in __slots__; attributes not passed to
+    the constructor default to None.
+    """
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for name in self.__slots__:
+            setattr(self, name, kwargs.pop(name, None))
+        if kwargs:
+            raise TypeError("{0} has no attributes {1}".format(
+                type(self).__name__, ", ".join(sorted(kwargs))))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
 
-class ToolInfo(EmbeddedDocument):
+    __hash__ = None
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__, ", ".join(
+            "{0}={1!r}".format(name, getattr(self, name))
+            for name in self.__slots__))
+
+
+class ToolInfo(_Model):
     """Information about a static analysis tool.
 
     Attributes:
         name (str): name of the tool
         version(str): version string of the tool
     """
-    name = StringField()
-    version = StringField()
+    __slots__ = ("name", "version")
 
 
-class Location(EmbeddedDocument):
+class Location(_Model):
     """A source code location.
 
     Attributes:
@@ -62,26 +88,21 @@ class Location(EmbeddedDocument):
         col_end(int): the end column in the line
         offset(int): the file byte offset
     """
-    path = StringField()
-    line_start = IntField()
-    line_end = IntField()
-    col_start = IntField()
-    col_end = IntField()
-    offset = IntField()
+    __slots__ = ("path", "line_start", "line_end", "col_start", "col_end",
+                 "offset")
 
 
-class Message(EmbeddedDocument):
+class Message(_Model):
     """A static analysis tool message.
 
     Attributes:
         text(str): the message text 
         location: the message location
     """
-    text = StringField()
-    location = EmbeddedDocumentField(Location)
+    __slots__ = ("text", "location")
 
 
-class Diagnostic(Document):
+class Diagnostic(_Model):
     """A static analysis tool diagnostic.
 
     Attributes:
@@ -90,7 +111,9 @@ class Diagnostic(Document):
         message: The primary message
         additional_messages: List of additional messages 
     """
-    tool_info = EmbeddedDocumentField(ToolInfo)
-    kind = StringField()
-    message = EmbeddedDocumentField(Message)
-    additional_messages = ListField(EmbeddedDocumentField(Message))
+    __slots__ = ("tool_info", "kind", "message", "additional_messages")
+
+    def __init__(self, **kwargs):
+        super(Diagnostic, self).__init__(**kwargs)
+        if self.additional_messages is None:
+            self.additional_messages = []
@@ -0,0 +1,165 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""MongoDB storage of diagnostics
+
+This module is only imported when diagnostics are stored in MongoDB, so
+that parsing does not depend on mongoengine.
+"""
+import logging
+
+from mongoengine import Document, EmbeddedDocument, EmbeddedDocumentField
+from mongoengine import StringField, IntField, ListField
+import mongoengine
+from pymongo.errors import BulkWriteError
+
+
+class ToolInfo(EmbeddedDocument):
+    """Stored form of model.ToolInfo"""
+    name = StringField()
+    version = StringField()
+
+
+class Location(EmbeddedDocument):
+    """Stored form of model.Location"""
+    path = StringField()
+    line_start = IntField()
+    line_end = IntField()
+    col_start = IntField()
+    col_end = IntField()
+    offset = IntField()
+
+
+class Message(EmbeddedDocument):
+    """Stored form of model.Message"""
+    text = StringField()
+    location = EmbeddedDocumentField(Location)
+
+
+class Diagnostic(Document):
+    """Stored form of model.Diagnostic"""
+    tool_info = EmbeddedDocumentField(ToolInfo)
+    kind = StringField()
+    message = EmbeddedDocumentField(Message)
+    additional_messages = ListField(EmbeddedDocumentField(Message))
+
+
+def connect(uri):
+    """Connect to the MongoDB server at uri"""
+    return mongoengine.connect(host=uri)
+
+
+def _to_document(obj, doc_cls):
+    if obj is None:
+        return None
+    return doc_cls(**{name: getattr(obj, name) for name in obj.__slots__})
+
+
+def to_location(location):
+    return _to_document(location, Location)
+
+
+def to_message(message):
+    if message is None:
+        return None
+    return Message(text=message.text, location=to_location(message.location))
+
+
+def to_document(diag):
+    """Convert a model.Diagnostic to a Diagnostic document
+
+    Args:
+        diag (model.Diagnostic): a parsed diagnostic
+
+    Returns:
+        Diagnostic: the document to save
+    """
+    return Diagnostic(
+        tool_info=_to_document(diag.tool_info, ToolInfo),
+        kind=diag.kind,
+        message=to_message(diag.message),
+        additional_messages=[
+            to_message(msg) for msg in diag.additional_messages])
+
+
+def _insert_batch(collection, batch, ordered):
+    """Insert a batch of documents, returning how many were inserted"""
+    try:
+        return len(collection.insert_many(batch, ordered=ordered)
+                   .inserted_ids)
+    except BulkWriteError as error:
+        write_errors = error.details["writeErrors"]
+        logging.getLogger(__name__).warning(
+            "%d of %d diagnostics in a batch were not inserted: %s",
+            len(write_errors), len(batch),
+            "; ".join("#{}: {}".format(write_error["index"],
+                                       write_error["errmsg"])
+                      for write_error in write_errors))
+        if ordered:
+            raise
+        return error.details["nInserted"]
+
+
+def insert_diagnostics(diags, batch_size=1000, ordered=True, collection=None):
+    """Store diagnostics with one insert_many() per batch
+
+    Args:
+        diags (iterable of model.Diagnostic): diagnostics to store
+        batch_size (int): number of diagnostics per insert
+        ordered (bool): if True, stop at the first failed insert, raising
+            pymongo.errors.BulkWriteError; if False, the server may insert
+            in any order, and failed inserts are logged and skipped
+        collection (pymongo.collection.Collection): collection to insert
+            into; defaults to that of Diagnostic documents
+
+    Returns:
+        int: the number of diagnostics inserted
+    """
+    if collection is None:
+        collection = Diagnostic._get_collection()
+
+    count = 0
+    batch = []
+    for diag in diags:
+        batch.append(to_document(diag).to_mongo())
+        if len(batch) >= batch_size:
+            count += _insert_batch(collection, batch, ordered)
+            batch = []
+    if batch:
+        count += _insert_batch(collection, batch, ordered)
+    return count
@@ -37,13 +37,70 @@
 # DM18-0995
 # 
 import abc
+import importlib
+import os
 import six
-import logging
-from collections import namedtuple
+
+from . import compression
+
+# Size of the blocks read by iter_candidate_lines()
+BLOCK_SIZE = 1 << 20
+
+# Entry point group under which other packages register parsers
+PLUGIN_GROUP = "sparser.parsers"
 
 Registry = dict()
-ParserInfo = namedtuple(
-    'ParserInfo', ["name", "tool_name", "input_type", "description", "cls"])
+
+
+def load_object(path):
+    """Import the object at an import path, "module:name"."""
+    module_name, _, name = path.partition(":")
+    return getattr(importlib.import_module(module_name), name)
+
+
+class ParserInfo(object):
+    """A registered parser
+
+    The parser class may be given as an import path, "module:Class", or as
+    a function that returns the class, so that its module is only
+    imported when the class is first used. Metadata not given at
+    registration is read from the class attributes of the same name.
+    """
+    __slots__ = ("name", "_tool_name", "_input_type", "_description",
+                 "_cls")
+
+    def __init__(self, name, tool_name, input_type, description, cls):
+        self.name = name
+        self._tool_name = tool_name
+        self._input_type = input_type
+        self._description = description
+        self._cls = cls
+
+    @property
+    def cls(self):
+        if isinstance(self._cls, six.string_types):
+            self._cls = load_object(self._cls)
+        elif not isinstance(self._cls, type):
+            self._cls = self._cls()
+        return self._cls
+
+    @property
+    def tool_name(self):
+        if self._tool_name is None:
+            return getattr(self.cls, "tool_name", None)
+        return self._tool_name
+
+    @property
+    def input_type(self):
+        if self._input_type is None:
+            return getattr(self.cls, "input_type", None)
+        return self._input_type
+
+    @property
+    def description(self):
+        if self._description is None:
+            return getattr(self.cls, "description", None)
+        return self._description
 
 
 def register_parser(name, tool_name, input_type, description, cls):
@@ -60,6 +117,159 @@ def register_parser(name, tool_name, input_type, description, cls):
         cls=cls)
     Registry[name] = info
 
+
+def iter_entry_points(group):
+    """Generate the installed entry points in a group"""
+    try:
+        from importlib import metadata
+    except ImportError:
+        import pkg_resources
+        for entry_point in pkg_resources.iter_entry_points(group):
+            yield entry_point
+        return
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        entry_points = entry_points.select(group=group)
+    else:
+        entry_points = entry_points.get(group, [])
+    for entry_point in entry_points:
+        yield entry_point
+
+
+_plugins_loaded = False
+
+
+def load_plugins():
+    """Register the parsers that other packages provide as entry points
+
+    A package provides parsers through entry points in the
+    "sparser.parsers" group, named after the parser and referring to its
+    class, e.g. in its setup.py::
+
+        entry_points={"sparser.parsers": [
+            "mytool_json = mytool_sparser:MyToolParser"]}
+
+    The class gives its tool_name, input_type and description as class
+    attributes. Plugin modules are only imported once their parser is
+    used, and built-in parsers take precedence over plugins of the same
+    name.
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
+    import logging
+    logger = logging.getLogger(__name__)
+    for entry_point in iter_entry_points(PLUGIN_GROUP):
+        if entry_point.name in Registry:
+            logger.warning("Ignoring plugin parser '%s': name already in use",
+                           entry_point.name)
+            continue
+        register_parser(
+            name=entry_point.name,
+            tool_name=None,
+            input_type=None,
+            description=None,
+            cls=entry_point.load)
+
+
+def get_parser_info(name):
+    """Get a registered parser by name, or None
+
+    Plugins are only looked up if no built-in parser has the name.
+    """
+    if name not in Registry:
+        load_plugins()
+    return Registry.get(name)
+
+# Built-in parsers, imported on first use
+
+register_parser(
+    name="clang_warnings",
+    tool_name="clang",
+    input_type="text/plain",
+    description="Parses textual warning output from the clang compiler.",
+    cls="sparser.clang:ClangWarningParser")
+
+register_parser(
+    name="clang_sa_plist",
+    tool_name="clang_sa",
+    input_type="application/octet-stream",
+    description="Parses plist output from the clang static analysis tool.",
+    cls="sparser.clang:ClangAnalyzerPlistParser")
+
+register_parser(
+    name="framac_warnings",
+    tool_name="frama-c",
+    input_type="text/plain",
+    description="Parses textual warning output from frama-c modules.",
+    cls="sparser.framac:FramacWarningParser")
+
+register_parser(
+    name="gcc_warnings",
+    tool_name="gcc",
+    input_type="text/plain",
+    description="Parses textual warning output from gcc/g++.",
+    cls="sparser.gcc:GccWarningParser")
+
+register_parser(
+    name="cppcheck_xml",
+    tool_name="cppcheck",
+    input_type="application/xml",
+    description="Parses xml output (v2) from cppcheck.",
+    cls="sparser.cppcheck:CppcheckXmlV2Parser")
+
+
+def iter_candidate_lines(input_file, prefilter):
+    """Generate the lines of UTF-8 text that contain a byte pattern
+
+    The input is read in blocks of BLOCK_SIZE bytes, and the prefilter is
+    searched for in each whole block, so lines without a match are
+    skipped without being split or decoded. Lines are split as
+    codecs.getreader("utf-8") splits them.
+
+    Args:
+        input_file (binary file-like object): UTF-8 text
+        prefilter (compiled bytes regex): matches somewhere in every line
+            of interest
+
+    Returns:
+        An iterator of the stripped str lines with a prefilter match
+    """
+    carry = b""
+    while True:
+        block = input_file.read(BLOCK_SIZE)
+        if block:
+            data = carry + block
+            # Hold back the last partial line until the next block
+            cut = data.rfind(b"\n") + 1
+            data, carry = data[:cut], data[cut:]
+        else:
+            data, carry = carry, b""
+
+        end = 0
+        for match in prefilter.finditer(data):
+            if match.start() < end:
+                # A further match within the line just yielded
+                continue
+            start = data.rfind(b"\n", 0, match.start()) + 1
+            end = data.find(b"\n", match.end())
+            if end < 0:
+                end = len(data)
+            lines = data[start:end].decode("utf-8").splitlines()
+            if len(lines) > 1:
+                # Split by a line break other than "\n", e.g. "\r" or "\f"
+                lines = [line for line in lines
+                         if prefilter.search(line.encode("utf-8"))]
+            for line in lines:
+                yield line.strip()
+
+        if not block:
+            return
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Parser():
     def load(self, file_obj):
@@ -70,17 +280,202 @@ class Parser():
         pass
 
 
+def expand_inputs(paths):
+    """Expand directories into the files directly inside them
+
+    Args:
+        paths (list of str): file and directory paths
+
+    Returns:
+        list of str: the given files, and the files in each given
+            directory in sorted order, skipping hidden entries
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if not name.startswith(".")
+                and os.path.isfile(os.path.join(path, name)))
+        else:
+            files.append(path)
+    return files
+
+
+# parser and tool version used by _parse_file in pool workers
+_parse_args = None
+
+
+def _init_worker(parser_name, tool_version):
+    global _parse_args
+    _parse_args = (parser_name, tool_version)
+
+
+def _parse_file(path):
+    """Parse one file into a list of its located diagnostics"""
+    parser_name, tool_version = _parse_args
+    parser_instance = get_parser_info(parser_name).cls()
+    alerts = []
+    with compression.open_input(path) as input_file:
+        for alert in parser_instance.load_iter(input_file):
+            if alert.message.location is None:
+                continue
+
+            if tool_version is not None:
+                alert.tool_info.version = tool_version
+            alerts.append(alert)
+    return alerts
+
+
+def iter_parsed(parser_name, paths, tool_version=None, jobs=1):
+    """Parse files, in parallel if requested
+
+    Args:
+        parser_name (str): name of a registered parser
+        paths (list of str): files to parse
+        tool_version (str): if not None, overrides the tool version of
+            every diagnostic
+        jobs (int): number of worker processes; 1 parses in this process
+
+    Returns:
+        iterator of list of Diagnostic: the located diagnostics of each
+            file, in the order of paths
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        _init_worker(parser_name, tool_version)
+        for path in paths:
+            yield _parse_file(path)
+        return
+
+    import multiprocessing
+    pool = multiprocessing.Pool(
+        jobs, initializer=_init_worker,
+        initargs=(parser_name, tool_version))
+    try:
+        chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+        for alerts in pool.imap(_parse_file, paths, chunksize):
+            yield alerts
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def get_row(alert):
+    """Get the (tool, checker, path, line, message) alert row of a diagnostic"""
+    return [
+        alert.tool_info.name, 
+        alert.kind, 
+        alert.message.location.path,
+        alert.message.location.line_start,
+        alert.message.text]
+
+
+def sort_unique_rows(rows):
+    """Get each distinct alert row once, sorted
+
+    Rows are ordered by their CSV formatting, so written as CSV they match
+    piping the CSV through `LC_ALL=C sort | uniq`.
+    """
+    import csv
+    buf = six.StringIO()
+    buf_writer = csv.writer(buf)
+    unique = dict()
+    for row in rows:
+        buf.seek(0)
+        buf.truncate()
+        buf_writer.writerow(row)
+        unique[buf.getvalue()] = row
+    return [unique[line] for line in sorted(unique)]
+
+
+def write_rows(rows, output=None, output_format="csv", sort_unique=False):
+    """Write alert rows as CSV or as columnar NPZ
+
+    Args:
+        rows (iterable of list): rows as returned by get_row()
+        output (str): file to write, compressed if it ends in .gz or .zst;
+            CSV is written to stdout if None
+        output_format (str): "csv", or "npz" (see sparser.columnar)
+        sort_unique (bool): write each distinct row once, sorted as by
+            sort_unique_rows()
+    """
+    import sys
+    import csv
+
+    if sort_unique:
+        rows = sort_unique_rows(rows)
+
+    if output_format == "npz":
+        # numpy is only needed, and imported, for columnar output
+        from . import columnar
+        columnar.save(columnar.to_table(rows), output)
+        return
+
+    if output is None:
+        out_file = sys.stdout
+    else:
+        out_file = compression.open_output(output, "w")
+    try:
+        csv_writer = csv.writer(out_file)
+        csv_writer.writerows(rows)
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+
+
 def parser_entrypoint():
     import sys
     import argparse
-    import mongoengine
-    import csv
+    import logging
 
     arg_parser = argparse.ArgumentParser()
-    arg_parser.add_argument("parser_name", choices=Registry.keys(), metavar="parser_name")
-    arg_parser.add_argument("input_files", nargs="+")
+    # Not choices=Registry.keys(), which would need every plugin up front
+    arg_parser.add_argument("parser_name")
+    arg_parser.add_argument(
+        "input_files",
+        nargs="+",
+        help="Files to parse, or directories of files to parse")
     arg_parser.add_argument("--tool_version")
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of files to parse in parallel")
+    arg_parser.add_argument(
+        "--sort_unique",
+        action="store_true",
+        help="Write each distinct alert once, in sorted CSV row order")
+    arg_parser.add_argument(
+        "--format",
+        choices=["csv", "npz"],
+        default="csv",
+        help=("Write alert rows as CSV, or as columnar NPZ (see "
+              "sparser.columnar)"))
+    arg_parser.add_argument(
+        "-o",
+        "--output",
+        help=("Write alerts here instead of to stdout; required for npz. "
+              "Compressed if it ends in .gz or .zst"))
+    arg_parser.add_argument(
+        "--state",
+        help=("Only parse the files that are new or changed since the last "
+              "run with this state file, and drop the alerts of removed "
+              "files (see sparser.incremental)"))
     arg_parser.add_argument("--mongo_uri")
+    arg_parser.add_argument(
+        "--sqlite",
+        help="Store alerts in this SQLite file (see sparser.store)")
+    arg_parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1000,
+        help="Number of diagnostics per insert into MongoDB or SQLite")
+    arg_parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Let MongoDB insert each batch in any order, past failures")
     arg_parser.add_argument(
         '-v',
         '--verbose',
@@ -90,6 +485,12 @@ def parser_entrypoint():
         const=logging.INFO,
     )
     args = arg_parser.parse_args()
+    if args.format == "npz" and args.output is None:
+        arg_parser.error("--format npz requires --output")
+    if args.mongo_uri is not None and args.sqlite is not None:
+        arg_parser.error("--mongo_uri and --sqlite are mutually exclusive")
+    if args.mongo_uri is not None and args.state is not None:
+        arg_parser.error("--state does not support --mongo_uri")
 
     # NOTE: If args.loglevel is None, basicConfig will use the
     # default log level of "WARNING"
@@ -99,32 +500,81 @@ def parser_entrypoint():
 
     write_to_mongo = False
     if args.mongo_uri is not None:
-        mongoengine.connect(host=args.mongo_uri)
+        # mongoengine is only needed, and imported, when storing to MongoDB
+        from . import mongo
+        mongo.connect(args.mongo_uri)
         write_to_mongo = True
 
-    parser_info = Registry.get(args.parser_name)
+    parser_info = get_parser_info(args.parser_name)
     if parser_info is None:
         logger.error("Could not find a parser named: '%s'", args.parser_name)
         logger.error("Valid parser names are as follows:")
-        for key in Registry:
+        for key in sorted(Registry):
             logger.error("\t- " + key)
         sys.exit(1)
-    csv_writer = csv.writer(sys.stdout)
-    parser_instance = parser_info.cls()
-    for item in args.input_files:
-        with open(item, 'rb') as input_file:
-            for alert in parser_instance.load_iter(input_file):
-                if alert.message.location is None:
-                    continue
-
-                if args.tool_version is not None:
-                    alert.tool_version_string = args.tool_version
-                if write_to_mongo:
-                    alert.save()
-                else:
-                    csv_writer.writerow([
-                        alert.tool_info.name, 
-                        alert.kind, 
-                        alert.message.location.path,
-                        alert.message.location.line_start,
-                        alert.message.text])
+
+    input_files = [
+        os.path.abspath(path) for path in expand_inputs(args.input_files)
+    ]
+    parse_files = input_files
+    state = None
+    if args.state is not None:
+        # Only imported for incremental runs
+        from . import incremental
+        state = incremental.InputState(
+            args.state, args.parser_name, args.tool_version,
+            keep_rows=args.sqlite is None)
+        parse_files, removed = state.changes(input_files)
+        logger.info("%d of %d files are new or changed, %d were removed",
+                    len(parse_files), len(input_files), len(removed))
+    logger.info("Parsing %d files", len(parse_files))
+
+    def iter_parsed_files():
+        """Generate each file to parse with its located diagnostics"""
+        return six.moves.zip(
+            parse_files,
+            iter_parsed(args.parser_name, parse_files, args.tool_version,
+                        args.jobs))
+
+    def iter_alerts():
+        for (_, alerts) in iter_parsed_files():
+            for alert in alerts:
+                yield alert
+
+    if write_to_mongo:
+        count = mongo.insert_diagnostics(
+            iter_alerts(),
+            batch_size=args.batch_size,
+            ordered=not args.unordered)
+        logger.info("Inserted %d diagnostics", count)
+        return
+
+    if args.sqlite is not None:
+        from . import store
+        with store.AlertStore(args.sqlite) as alert_store:
+            if state is not None:
+                # Replace the alerts of changed and removed files
+                alert_store.delete_sources(parse_files + removed)
+            count = alert_store.insert_sourced(
+                ((path, alert)
+                 for (path, alerts) in iter_parsed_files()
+                 for alert in alerts),
+                batch_size=args.batch_size)
+        logger.info("Inserted %d diagnostics", count)
+        if state is not None:
+            # The store keeps the alerts, the state only the inputs
+            state.update((path, []) for path in parse_files)
+            state.remove(removed)
+            state.close()
+        return
+
+    if state is None:
+        rows = (get_row(alert) for alert in iter_alerts())
+    else:
+        # Record the parsed files, then write the rows of every file
+        state.update((path, [get_row(alert) for alert in alerts])
+                     for (path, alerts) in iter_parsed_files())
+        state.remove(removed)
+        rows = list(state.rows(input_files))
+        state.close()
+    write_rows(rows, args.output, args.format, args.sort_unique)
@@ -0,0 +1,205 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""Selective reading of property lists
+
+plistlib builds every value in a plist, but the clang static analyzer
+writes a bulky "path" of events for each diagnostic that sparser never
+reads. load() takes a selection of the keys to keep, and skips everything
+else in XML plists without building it.
+"""
+import base64
+import datetime
+import plistlib
+from xml.parsers import expat
+
+# Size of the blocks fed to the XML parser
+BLOCK_SIZE = 1 << 16
+
+# Marks a selection that keeps a whole value
+ALL = None
+
+_SCALARS = ("key", "string", "integer", "real", "date", "data")
+
+
+def _to_value(tag, text):
+    if tag == "integer":
+        return int(text)
+    if tag == "real":
+        return float(text)
+    if tag == "data":
+        return base64.b64decode(text.encode("ascii"))
+    if tag == "date":
+        return datetime.datetime.strptime(text, "%Y-%m-%dT%H:%M:%SZ")
+    return text
+
+
+def select_value(value, select):
+    """Keep only the selected parts of a plist value
+
+    Args:
+        value: a plist value, as returned by plistlib
+        select (dict or None): maps each dictionary key to keep to the
+            selection of its value; ALL (None) keeps the whole value.
+            Selections apply to each element of arrays.
+
+    Returns:
+        the selected parts of value
+    """
+    if select is ALL:
+        return value
+    if isinstance(value, dict):
+        return dict((key, select_value(item, select[key]))
+                    for (key, item) in value.items() if key in select)
+    if isinstance(value, list):
+        return [select_value(item, select) for item in value]
+    return value
+
+
+class _XmlReader(object):
+    """Builds the selected parts of an XML plist from expat events"""
+
+    def __init__(self, parser, select):
+        self.parser = parser
+        # One entry per open dict or array: [container, selection, key]
+        self.stack = []
+        self.root_select = select
+        self.result = None
+        self.tag = None
+        self.text = []
+        # Depth of elements within a value being skipped
+        self.skip_depth = 0
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+
+    def select(self):
+        """Selection for the next value in the innermost container"""
+        if not self.stack:
+            return self.root_select
+        container, select, key = self.stack[-1]
+        if select is ALL or isinstance(container, list):
+            return select
+        return select[key]
+
+    def add(self, value):
+        if not self.stack:
+            self.result = value
+            return
+        entry = self.stack[-1]
+        if isinstance(entry[0], list):
+            entry[0].append(value)
+        else:
+            entry[0][entry[2]] = value
+            entry[2] = None
+
+    def start(self, tag, attrs):
+        if self.skip_depth:
+            self.skip_depth += 1
+            return
+        if tag == "plist":
+            return
+
+        in_dict = self.stack and isinstance(self.stack[-1][0], dict)
+        if in_dict and tag != "key":
+            select = self.stack[-1][1]
+            if select is not ALL and self.stack[-1][2] not in select:
+                # Skip the value of an unselected key
+                self.stack[-1][2] = None
+                self.skip_depth = 1
+                return
+
+        if tag == "dict":
+            self.stack.append([{}, self.select(), None])
+        elif tag == "array":
+            self.stack.append([[], self.select(), None])
+        elif tag in _SCALARS:
+            self.tag = tag
+            self.text = []
+            # Only gather character data inside scalars, to avoid a call
+            # per run of whitespace between elements
+            self.parser.CharacterDataHandler = self.text.append
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+            return
+        if tag == "plist":
+            return
+
+        if tag in ("dict", "array"):
+            container = self.stack.pop()[0]
+            self.add(container)
+        elif tag == "key":
+            self.parser.CharacterDataHandler = None
+            self.stack[-1][2] = u"".join(self.text)
+        elif tag in _SCALARS:
+            self.parser.CharacterDataHandler = None
+            self.add(_to_value(tag, u"".join(self.text)))
+        elif tag == "true":
+            self.add(True)
+        elif tag == "false":
+            self.add(False)
+
+
+def load(input_file, select=ALL):
+    """Read the selected parts of an XML or binary plist
+
+    Args:
+        input_file (binary file-like object): the plist
+        select (dict or None): the parts to keep; see select_value()
+
+    Returns:
+        the selected parts of the plist's root value
+    """
+    header = input_file.read(8)
+    if header == b"bplist00":
+        # Binary plists are compact already, so read them whole
+        if not hasattr(plistlib, "loads"):
+            raise ValueError("Binary plists require Python 3.4 or later")
+        return select_value(
+            plistlib.loads(header + input_file.read()), select)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    reader = _XmlReader(parser, select)
+    block = header
+    while block:
+        parser.Parse(block, False)
+        block = input_file.read(BLOCK_SIZE)
+    parser.Parse(b"", True)
+    return reader.result
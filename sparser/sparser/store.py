@@ -0,0 +1,236 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+"""SQLite storage of alerts
+
+An alternative to MongoDB that needs no server: alerts are stored in a
+single SQLite file, one row per diagnostic with its tool, tool version,
+kind (checker), and the path, line and text of its primary message.
+Rows are inserted in batched transactions, and indexed on (tool, path,
+line) and (tool, kind) for the queries below. Each row may also record
+the source, the tool output it was parsed from, so that the alerts of a
+changed output can be replaced (see sparser.incremental).
+"""
+import re
+import sqlite3
+
+# Bump when the schema changes
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    tool_version TEXT,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    line INTEGER,
+    message TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_tool_path_line ON alerts (tool, path, line);
+CREATE INDEX IF NOT EXISTS alerts_tool_kind ON alerts (tool, kind);
+CREATE INDEX IF NOT EXISTS alerts_source ON alerts (source);
+"""
+
+COLUMNS = ["tool", "tool_version", "kind", "path", "line", "message"]
+
+
+def to_row(diag):
+    """Get the alerts table row of a located model.Diagnostic"""
+    location = diag.message.location
+    return (diag.tool_info.name, diag.tool_info.version, diag.kind or "",
+            location.path, location.line_start, diag.message.text or "")
+
+
+def _regexp_match(pattern, value):
+    """REGEXP in queries, with the semantics of re.match()"""
+    return value is not None and re.match(pattern, value) is not None
+
+
+class AlertStore(object):
+    """An SQLite file of alerts
+
+    Args:
+        path (str): database file, created if it does not exist
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.create_function("REGEXP", 2, _regexp_match)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None:
+                self.conn.execute("INSERT INTO meta VALUES ('schema', ?)",
+                                  (str(SCHEMA_VERSION), ))
+            elif row[0] != str(SCHEMA_VERSION):
+                raise ValueError(
+                    "Alert store '{}' has schema version {}, expected {}"
+                    .format(path, row[0], SCHEMA_VERSION))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def insert(self, diags, batch_size=1000):
+        """Store located diagnostics, one transaction per batch
+
+        Args:
+            diags (iterable of model.Diagnostic): diagnostics whose
+                message has a location
+            batch_size (int): number of diagnostics per transaction
+
+        Returns:
+            int: the number of diagnostics inserted
+        """
+        return self.insert_sourced(
+            ((None, diag) for diag in diags), batch_size=batch_size)
+
+    def insert_sourced(self, sourced_diags, batch_size=1000):
+        """Store located diagnostics with the file each was parsed from
+
+        Args:
+            sourced_diags (iterable of (str, model.Diagnostic)): each
+                diagnostic with its source, see delete_sources()
+            batch_size (int): number of diagnostics per transaction
+
+        Returns:
+            int: the number of diagnostics inserted
+        """
+        columns = COLUMNS + ["source"]
+        sql = "INSERT INTO alerts ({}) VALUES ({})".format(
+            ", ".join(columns), ", ".join("?" for _ in columns))
+        count = 0
+        batch = []
+        for (source, diag) in sourced_diags:
+            batch.append(to_row(diag) + (source, ))
+            if len(batch) >= batch_size:
+                with self.conn:
+                    self.conn.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with self.conn:
+                self.conn.executemany(sql, batch)
+            count += len(batch)
+        return count
+
+    def delete_sources(self, sources):
+        """Delete the alerts parsed from tool outputs, in one transaction
+
+        Returns:
+            int: the number of alerts deleted
+        """
+        count = 0
+        with self.conn:
+            for source in sources:
+                count += self.conn.execute(
+                    "DELETE FROM alerts WHERE source = ?",
+                    (source, )).rowcount
+        return count
+
+    def tools(self):
+        """Get the sorted names of all tools with alerts"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT tool FROM alerts ORDER BY tool")]
+
+    def kinds(self, tool):
+        """Get the sorted distinct kinds of a tool's alerts"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT kind FROM alerts WHERE tool = ? ORDER BY kind",
+            (tool, ))]
+
+    def query(self, tool=None, kind=None, path=None, line=None):
+        """Generate the alerts matching every given field
+
+        Returns:
+            iterator of tuple: (tool, tool_version, kind, path, line,
+                message) rows, in insertion order
+        """
+        conditions = []
+        params = []
+        for (column, value) in [("tool", tool), ("kind", kind),
+                                ("path", path), ("line", line)]:
+            if value is not None:
+                conditions.append("{} = ?".format(column))
+                params.append(value)
+        sql = "SELECT {} FROM alerts".format(", ".join(COLUMNS))
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return self.conn.execute(sql + " ORDER BY id", params)
+
+    def locations(self, tool, kinds=(), kind_patterns=(), messages=(),
+                  message_patterns=()):
+        """Get the distinct locations of a tool's selected alerts
+
+        An alert is selected if its kind is one of kinds, its message is
+        one of messages, or its kind or message matches one of the
+        corresponding patterns from its start, as with re.match().
+
+        Returns:
+            list of tuple: sorted (path, line) pairs
+        """
+        conditions = []
+        params = [tool]
+        if kinds:
+            conditions.append("kind IN ({})".format(", ".join(
+                "?" for _ in kinds)))
+            params.extend(kinds)
+        for pattern in kind_patterns:
+            conditions.append("kind REGEXP ?")
+            params.append(pattern)
+        if messages:
+            conditions.append("message IN ({})".format(", ".join(
+                "?" for _ in messages)))
+            params.extend(messages)
+        for pattern in message_patterns:
+            conditions.append("message REGEXP ?")
+            params.append(pattern)
+        if not conditions:
+            return []
+        sql = ("SELECT DISTINCT path, line FROM alerts WHERE tool = ? AND "
+               "({}) ORDER BY path, line".format(" OR ".join(conditions)))
+        return self.conn.execute(sql, params).fetchall()
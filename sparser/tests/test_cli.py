@@ -0,0 +1,97 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import os
+
+import pytest
+
+from sparser.parser import expand_inputs
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "real_outputs")
+CPPCHECK_DIR = os.path.join(DATA_DIR, "cppcheck")
+
+
+class TestCli():
+    def test_expand_inputs(self, tmpdir):
+        tmpdir.join("b.xml").write("")
+        tmpdir.join("a.xml").write("")
+        tmpdir.join(".hidden").write("")
+        tmpdir.mkdir("subdir")
+        other = os.path.join(CPPCHECK_DIR, "074db154.c.cppcheck.xml")
+        assert expand_inputs([str(tmpdir), other]) == [
+            str(tmpdir.join("a.xml")),
+            str(tmpdir.join("b.xml")), other
+        ]
+
+    def test_directory_matches_files(self, run_cli):
+        files = sorted(
+            os.path.join(CPPCHECK_DIR, name)
+            for name in os.listdir(CPPCHECK_DIR))
+        from_files = run_cli("cppcheck_xml", *files)
+        from_dir = run_cli("cppcheck_xml", CPPCHECK_DIR)
+        assert from_files
+        assert from_dir == from_files
+
+    @pytest.mark.parametrize("jobs", ["1", "3"])
+    def test_sort_unique(self, run_cli, jobs):
+        # Each file twice, so every row has a duplicate
+        plain = run_cli("cppcheck_xml", CPPCHECK_DIR, CPPCHECK_DIR)
+        result = run_cli("cppcheck_xml", CPPCHECK_DIR,
+                         CPPCHECK_DIR, "--jobs", jobs, "--sort_unique")
+        lines = plain.splitlines(True)
+        assert result == "".join(sorted(set(lines)))
+        assert len(result.splitlines()) < len(lines)
+
+    def test_parallel_keeps_order(self, run_cli):
+        serial = run_cli("framac_warnings", os.path.join(DATA_DIR, "frama-c"))
+        parallel = run_cli("framac_warnings",
+                           os.path.join(DATA_DIR, "frama-c"), "-j", "4")
+        assert parallel == serial
+
+    def test_output_file(self, run_cli, tmpdir):
+        expected = run_cli("cppcheck_xml", CPPCHECK_DIR, "--sort_unique")
+        out_path = str(tmpdir.join("alerts.csv"))
+        assert run_cli("cppcheck_xml", CPPCHECK_DIR,
+                       "--sort_unique", "--output", out_path) == ""
+        with open(out_path, "rb") as out_file:
+            assert out_file.read() == expected.encode("utf-8")
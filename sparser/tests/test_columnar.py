@@ -0,0 +1,109 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import os
+import sys
+
+import pytest
+
+import sparser
+
+np = pytest.importorskip("numpy")
+columnar = pytest.importorskip("sparser.columnar")
+
+CPPCHECK_DIR = os.path.join(
+    os.path.dirname(__file__), "real_outputs", "cppcheck")
+
+ROWS = [
+    ("cppcheck", "arrayIndexOutOfBounds", "/src/b.c", 7, "Array index"),
+    ("cppcheck", "unusedVariable", "/src/a.c", 12, u"unused \u00e9"),
+    ("frama-c", "", "/src/a.c", 3, ""),
+    ("cppcheck", "arrayIndexOutOfBounds", "/src/a.c", 7, "Array index"),
+]
+
+
+class TestColumnar():
+    def test_round_trip(self, tmpdir):
+        path = str(tmpdir.join("alerts"))
+        columnar.save(columnar.to_table(ROWS), path)
+        assert os.path.exists(path)
+
+        table = columnar.load(path)
+        assert list(columnar.iter_rows(table)) == ROWS
+
+    def test_encoding(self):
+        table = columnar.to_table(ROWS)
+        assert list(table.tools) == ["cppcheck", "frama-c"]
+        assert list(table.tool) == [0, 0, 1, 0]
+        assert list(table.paths) == ["/src/a.c", "/src/b.c"]
+        assert list(table.path) == [1, 0, 0, 0]
+        assert table.line.dtype == np.int32
+        assert list(table.line) == [7, 12, 3, 7]
+        assert columnar.get_message(table, 1) == u"unused \u00e9"
+        assert columnar.get_message(table, 2) == ""
+
+    def test_empty(self, tmpdir):
+        path = str(tmpdir.join("alerts.npz"))
+        columnar.save(columnar.to_table([]), path)
+        table = columnar.load(path)
+        assert len(table.line) == 0
+        assert list(columnar.iter_rows(table)) == []
+
+    def test_cli_matches_csv(self, monkeypatch, capsys, tmpdir):
+        monkeypatch.setattr(
+            sys, "argv",
+            ["sparser", "cppcheck_xml", CPPCHECK_DIR, "--sort_unique"])
+        sparser.parser_entrypoint()
+        csv_lines = capsys.readouterr().out.splitlines()
+
+        path = str(tmpdir.join("alerts.npz"))
+        monkeypatch.setattr(sys, "argv", [
+            "sparser", "cppcheck_xml", CPPCHECK_DIR, "--sort_unique",
+            "--format", "npz", "--output", path
+        ])
+        sparser.parser_entrypoint()
+        rows = list(columnar.iter_rows(columnar.load(path)))
+        assert len(rows) == len(csv_lines)
+        for row, line in zip(rows, csv_lines):
+            assert row[:3] == tuple(line.split(",")[:3])
+            assert str(row[3]) == line.split(",")[3]
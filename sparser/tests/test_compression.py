@@ -0,0 +1,127 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import gzip
+import os
+
+import pytest
+
+from sparser import compression
+
+CPPCHECK_DIR = os.path.join(
+    os.path.dirname(__file__), "real_outputs", "cppcheck")
+
+
+@pytest.fixture(params=[".gz", ".zst"])
+def extension(request):
+    if request.param == ".zst":
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+class TestCompression():
+    def test_round_trip(self, tmpdir, extension):
+        path = str(tmpdir.join("out.xml" + extension))
+        data = b"<results>\n" * 1000
+        with compression.open_output(path) as out_file:
+            out_file.write(data)
+        assert os.path.getsize(path) < len(data)
+        assert compression.detect(path) == compression.get_codec(path)
+
+        with compression.open_input(path) as in_file:
+            assert in_file.read() == data
+
+    def test_detect_ignores_name(self, tmpdir):
+        # Inputs are recognized by content, not by extension
+        path = str(tmpdir.join("out.xml"))
+        with gzip.open(path, "wb") as out_file:
+            out_file.write(b"<results/>")
+        assert compression.detect(path) == compression.GZIP
+        with compression.open_input(path) as in_file:
+            assert in_file.read() == b"<results/>"
+
+    def test_uncompressed(self, tmpdir):
+        path = tmpdir.join("out.txt")
+        path.write_binary(b"warning")
+        assert compression.detect(str(path)) is None
+        with compression.open_input(str(path)) as in_file:
+            assert in_file.read() == b"warning"
+
+    def test_text_input(self, tmpdir, extension):
+        # Alert CSVs are read as text whether or not they are compressed
+        rows = "cppcheck,unusedVariable,/src/a.c,12,unused\n" * 3
+        for path in (str(tmpdir.join("alerts.csv")),
+                     str(tmpdir.join("alerts.csv" + extension))):
+            with compression.open_output(path, "w") as out_file:
+                out_file.write(rows)
+            with compression.open_text_input(path) as in_file:
+                assert in_file.read() == rows
+
+    def test_parse_compressed_inputs(self, run_cli, tmpdir, extension):
+        expected = run_cli("cppcheck_xml", CPPCHECK_DIR, "--sort_unique")
+        for name in os.listdir(CPPCHECK_DIR):
+            with open(os.path.join(CPPCHECK_DIR, name), "rb") as in_file:
+                with compression.open_output(
+                        str(tmpdir.join(name + extension))) as out_file:
+                    out_file.write(in_file.read())
+
+        out = run_cli("cppcheck_xml", str(tmpdir), "--sort_unique")
+        assert out == expected
+
+    def test_compressed_csv_output(self, run_cli, tmpdir, extension):
+        expected = run_cli("cppcheck_xml", CPPCHECK_DIR, "--sort_unique")
+
+        path = str(tmpdir.join("alerts.csv" + extension))
+        run_cli("cppcheck_xml", CPPCHECK_DIR,
+                "--sort_unique", "--output", path)
+        assert compression.detect(path) == compression.get_codec(path)
+        with compression.open_input(path) as in_file:
+            assert in_file.read().decode("utf-8") == expected
+
+    def test_compressed_columnar(self, tmpdir, extension):
+        columnar = pytest.importorskip("sparser.columnar")
+        rows = [("cppcheck", "unusedVariable", "/src/a.c", 12, "unused")]
+        path = str(tmpdir.join("alerts.npz" + extension))
+        columnar.save(columnar.to_table(rows), path)
+        assert compression.detect(path) == compression.get_codec(path)
+        assert list(columnar.iter_rows(columnar.load(path))) == rows
@@ -203,3 +203,27 @@ class TestCppchecktXmlV2Parser():
                 assert message.location.path == "/test/file" + str(j)
                 assert message.location.line_start == j
                 assert message.text == "info" + str(j)
+
+    def test_yields_before_end_of_input(self):
+        doc, tag, text = Doc().tagtext()
+        doc.asis('<?xml version="1.0" encoding="UTF-8"?>')
+        with tag("results", version="2"):
+            with tag("cppcheck", version="testVersion"):
+                pass
+            with tag("errors"):
+                with tag("error", id="testId", verbose="testMessage"):
+                    with tag(
+                            "location", file="/test/file", line=1,
+                            info="info"):
+                        pass
+        # Cut the report off mid-way through a second error; the first
+        # must still be produced before the parser sees the bad input.
+        truncated = doc.getvalue().replace(
+            "</errors>", '<error id="cut" verbose="cut"><loc')
+
+        parser = CppcheckXmlV2Parser()
+        diags = parser.load_iter(BytesIO(b(truncated)))
+        diag = next(diags)
+        assert diag.kind == "testId"
+        assert diag.message.location.path == "/test/file"
+        assert len(diag.additional_messages) == 1
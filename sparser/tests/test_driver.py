@@ -0,0 +1,136 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import os
+
+import pytest
+
+from sparser import compression
+from sparser import driver
+from sparser.store import AlertStore
+
+REAL_OUTPUTS = os.path.join(os.path.dirname(__file__), "real_outputs")
+
+# Stand-ins for the tools, which "analyze" a saved output by printing it
+FAKE_TOOLS = {
+    "cppcheck": driver.Tool(
+        args=["sh", "-c", "cat {source} >&2"],
+        output="stderr",
+        parser_name="cppcheck_xml",
+        extension="cppcheck.xml"),
+    "clang_sa": driver.Tool(
+        args=["cp", "{source}", "{output}"],
+        output="file",
+        parser_name="clang_sa_plist",
+        extension="clang_sa.xml"),
+    "frama-c": driver.Tool(
+        args=["cat", "{source}"],
+        output="stdout",
+        parser_name="framac_warnings",
+        extension="frama-c.txt"),
+}
+
+
+@pytest.fixture
+def fake_tools(monkeypatch):
+    monkeypatch.setattr(driver, "TOOLS", FAKE_TOOLS)
+
+
+@pytest.mark.usefixtures("fake_tools")
+class TestDriver():
+    @pytest.mark.parametrize("tool,parser_name,directory", [
+        ("cppcheck", "cppcheck_xml", "cppcheck"),
+        ("clang_sa", "clang_sa_plist", "clang_sa"),
+        ("frama-c", "framac_warnings", "frama-c"),
+    ])
+    def test_matches_sparser(self, run_cli, run_driver, tool, parser_name,
+                             directory):
+        inputs = os.path.join(REAL_OUTPUTS, directory)
+        expected = run_cli(parser_name, inputs, "--sort_unique")
+        assert expected
+        assert run_driver(tool, inputs, "--sort_unique",
+                          "--jobs", "2") == expected
+
+    def test_keep_raw(self, run_driver, tmpdir):
+        inputs = os.path.join(REAL_OUTPUTS, "cppcheck")
+        raw_dir = str(tmpdir.join("raw"))
+        run_driver("cppcheck", inputs, "--keep_raw", raw_dir,
+                   "--compress", "gz")
+        for name in os.listdir(inputs):
+            raw_path = os.path.join(raw_dir, name + ".cppcheck.xml.gz")
+            with compression.open_input(raw_path) as raw_file:
+                with open(os.path.join(inputs, name), "rb") as in_file:
+                    assert raw_file.read() == in_file.read()
+
+    def test_metrics(self, run_driver, tmpdir):
+        inputs = os.path.join(REAL_OUTPUTS, "frama-c")
+        metrics_path = tmpdir.join("metrics.csv")
+        run_driver("frama-c", inputs, "--metrics", str(metrics_path))
+        rows = [line.split(",") for line in metrics_path.readlines()]
+        assert sorted(row[0] for row in rows) == sorted(os.listdir(inputs))
+        assert all(len(row) == 5 and row[4] == "0\n" for row in rows)
+
+    def test_timeout(self):
+        tool = driver.Tool(args=["sleep", "5"], output="stdout",
+                           parser_name="cppcheck_xml", extension="xml")
+        output, metrics = driver.run_tool(tool, __file__, timeout=1)
+        assert output == b""
+        assert metrics[0] < 5
+        assert metrics[3] == driver.TIMEOUT_STATUS
+        # The cut short output of a failed run is parsed as far as it goes
+        assert driver.parse_output("cppcheck_xml", output, metrics[3]) == []
+        with pytest.raises(Exception):
+            driver.parse_output("cppcheck_xml", output)
+
+    def test_sqlite(self, run_driver, tmpdir):
+        path = str(tmpdir.join("alerts.sqlite"))
+        for tool in ["cppcheck", "frama-c"]:
+            run_driver(tool, os.path.join(REAL_OUTPUTS, tool),
+                       "--sqlite", path)
+        with AlertStore(path) as alert_store:
+            assert alert_store.tools() == ["cppcheck", "frama-c"]
+            sources = set(row[0] for row in alert_store.conn.execute(
+                "SELECT source FROM alerts"))
+        assert sources <= set(
+            os.listdir(os.path.join(REAL_OUTPUTS, "cppcheck")) +
+            os.listdir(os.path.join(REAL_OUTPUTS, "frama-c")))
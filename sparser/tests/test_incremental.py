@@ -0,0 +1,152 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import os
+import shutil
+
+import pytest
+
+from sparser import incremental
+from sparser.store import AlertStore
+
+CPPCHECK_DIR = os.path.join(
+    os.path.dirname(__file__), "real_outputs", "cppcheck")
+
+
+@pytest.fixture
+def inputs(tmpdir):
+    """A copy of the cppcheck outputs that tests can change"""
+    path = str(tmpdir.join("cppcheck"))
+    shutil.copytree(CPPCHECK_DIR, path)
+    return path
+
+
+def change_inputs(inputs):
+    """Remove, touch, rewrite and add an input"""
+    names = sorted(os.listdir(inputs))
+    removed = os.path.join(inputs, names[0])
+    shutil.copy(removed, os.path.join(inputs, "new.xml"))
+    os.remove(removed)
+
+    touched = os.path.join(inputs, names[1])
+    stat = os.stat(touched)
+    os.utime(touched, (stat.st_atime, stat.st_mtime + 10))
+
+    with open(os.path.join(inputs, names[2]), "r") as in_file:
+        text = in_file.read()
+    with open(os.path.join(inputs, names[2]), "w") as out_file:
+        out_file.write(text.replace('line="', 'line="1'))
+
+
+class TestInputState():
+    def test_changes(self, inputs, tmpdir):
+        paths = sorted(
+            os.path.join(inputs, name) for name in os.listdir(inputs))
+        state_path = str(tmpdir.join("state"))
+        with incremental.InputState(state_path, "cppcheck_xml") as state:
+            changed, removed = state.changes(paths)
+            assert changed == paths
+            assert removed == []
+            state.update((path, [("cppcheck", "id", path, 1, "")])
+                         for path in changed)
+
+        change_inputs(inputs)
+        new_paths = sorted(
+            os.path.join(inputs, name) for name in os.listdir(inputs))
+        with incremental.InputState(state_path, "cppcheck_xml") as state:
+            assert state.paths() == paths
+            changed, removed = state.changes(new_paths)
+            # The touched input is not parsed again
+            assert changed == [paths[2], os.path.join(inputs, "new.xml")]
+            assert removed == [paths[0]]
+            state.remove(removed)
+            assert list(state.rows(paths[1:2])) == [
+                ("cppcheck", "id", paths[1], 1, "")]
+            assert state.changes(new_paths) == (changed, [])
+
+    def test_reset(self, inputs, tmpdir):
+        paths = [os.path.join(inputs, name) for name in os.listdir(inputs)]
+        state_path = str(tmpdir.join("state"))
+        with incremental.InputState(state_path, "cppcheck_xml") as state:
+            state.changes(paths)
+            state.update((path, []) for path in paths)
+        with incremental.InputState(state_path, "cppcheck_xml") as state:
+            assert state.changes(paths) == ([], [])
+        # A different tool version invalidates what was parsed
+        with incremental.InputState(state_path, "cppcheck_xml",
+                                    "1.84") as state:
+            assert state.paths() == []
+            assert state.changes(paths)[0] == paths
+
+    @pytest.mark.parametrize("sort_unique", [False, True])
+    def test_cli_matches_full_run(self, run_cli, inputs, tmpdir, sort_unique):
+        args = ["cppcheck_xml", inputs, "--state", str(tmpdir.join("state"))]
+        if sort_unique:
+            args.append("--sort_unique")
+        assert run_cli(*args) == run_cli(*args[:2] + args[4:])
+
+        change_inputs(inputs)
+        assert run_cli(*args) == run_cli(*args[:2] + args[4:])
+
+    def test_cli_sqlite(self, run_cli, inputs, tmpdir):
+        def get_alerts(path):
+            with AlertStore(path) as alert_store:
+                return sorted(alert_store.query())
+
+        state_args = ["--state", str(tmpdir.join("state"))]
+        incremental_path = str(tmpdir.join("incremental.sqlite"))
+        run_cli("cppcheck_xml", inputs, "--sqlite", incremental_path,
+                *state_args)
+        change_inputs(inputs)
+        run_cli("cppcheck_xml", inputs, "--sqlite", incremental_path,
+                *state_args)
+
+        full_path = str(tmpdir.join("full.sqlite"))
+        run_cli("cppcheck_xml", inputs, "--sqlite", full_path)
+        assert get_alerts(incremental_path) == get_alerts(full_path)
+
+        # Only the inputs are recorded, as the store has the alerts
+        with incremental.InputState(str(tmpdir.join("state")), "cppcheck_xml",
+                                    keep_rows=False) as state:
+            assert state.paths()
+            assert list(state.rows(state.paths())) == []
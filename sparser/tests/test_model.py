@@ -0,0 +1,87 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import pytest
+from sparser.model import Diagnostic, Message, Location, ToolInfo
+
+
+def get_diagnostic(line=1):
+    return Diagnostic(
+        tool_info=ToolInfo(name="tool", version="1.0"),
+        kind="kind",
+        message=Message(
+            text="text", location=Location(path="/test/path", line_start=line)),
+        additional_messages=[
+            Message(text="note", location=Location(path="/test/path"))])
+
+
+class TestModel():
+    def test_defaults(self):
+        diag = Diagnostic(kind="kind")
+        assert diag.tool_info is None
+        assert diag.message is None
+        assert diag.additional_messages == []
+        assert Location(path="/test/path").line_start is None
+
+    def test_unknown_attribute(self):
+        with pytest.raises(TypeError):
+            Location(path="/test/path", line=1)
+        with pytest.raises(AttributeError):
+            Diagnostic().tool_version_string = "1.0"
+
+    def test_equality(self):
+        assert get_diagnostic() == get_diagnostic()
+        assert get_diagnostic(line=1) != get_diagnostic(line=2)
+        assert ToolInfo(name="tool") != Location(path="tool")
+
+    def test_to_document(self):
+        mongo = pytest.importorskip("sparser.mongo")
+        doc = mongo.to_document(get_diagnostic())
+        assert doc.tool_info.name == "tool"
+        assert doc.tool_info.version == "1.0"
+        assert doc.kind == "kind"
+        assert doc.message.text == "text"
+        assert doc.message.location.path == "/test/path"
+        assert doc.message.location.line_start == 1
+        assert doc.additional_messages[0].text == "note"
+        assert doc.additional_messages[0].location.line_start is None
@@ -0,0 +1,136 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import pytest
+from sparser.model import Diagnostic, Message, Location, ToolInfo
+
+mongomock = pytest.importorskip("mongomock")
+mongo = pytest.importorskip("sparser.mongo")
+
+
+class CountingCollection():
+    """Wraps a collection to count insert_many() round trips"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.num_inserts = 0
+
+    def insert_many(self, documents, ordered=True):
+        self.num_inserts += 1
+        return self.collection.insert_many(documents, ordered=ordered)
+
+
+class KeyedCollection(CountingCollection):
+    """Gives each document its kind as _id, so that kinds must be unique"""
+
+    def insert_many(self, documents, ordered=True):
+        for document in documents:
+            document["_id"] = document["kind"]
+        return CountingCollection.insert_many(self, documents, ordered)
+
+
+def get_diagnostics(count):
+    tool_info = ToolInfo(name="tool", version="1.0")
+    return [
+        Diagnostic(
+            tool_info=tool_info,
+            kind="kind" + str(i),
+            message=Message(
+                text="text" + str(i),
+                location=Location(path="/test/path", line_start=i)))
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def collection():
+    return CountingCollection(mongomock.MongoClient().db.diagnostic)
+
+
+class TestInsertDiagnostics():
+    def test_empty(self, collection):
+        assert mongo.insert_diagnostics([], collection=collection) == 0
+        assert collection.num_inserts == 0
+
+    @pytest.mark.parametrize("count,batch_size,num_inserts",
+                             [(1, 10, 1), (10, 10, 1), (25, 10, 3),
+                              (25, 1, 25)])
+    def test_batches(self, collection, count, batch_size, num_inserts):
+        inserted = mongo.insert_diagnostics(
+            get_diagnostics(count),
+            batch_size=batch_size,
+            collection=collection)
+        assert inserted == count
+        assert collection.num_inserts == num_inserts
+        assert collection.collection.count_documents({}) == count
+
+    def test_documents(self, collection):
+        mongo.insert_diagnostics(
+            get_diagnostics(3), ordered=False, collection=collection)
+        docs = list(collection.collection.find().sort("kind"))
+        assert [doc["kind"] for doc in docs] == ["kind0", "kind1", "kind2"]
+        assert docs[2]["tool_info"] == {"name": "tool", "version": "1.0"}
+        assert docs[2]["message"] == {
+            "text": "text2",
+            "location": {"path": "/test/path", "line_start": 2}
+        }
+        assert docs[2]["additional_messages"] == []
+
+    @pytest.mark.parametrize("batch_size", [2, 10])
+    def test_unordered_skips_failures(self, batch_size):
+        collection = KeyedCollection(mongomock.MongoClient().db.diagnostic)
+        collection.collection.insert_one({"_id": "kind1"})
+        inserted = mongo.insert_diagnostics(
+            get_diagnostics(5), batch_size=batch_size, ordered=False,
+            collection=collection)
+        assert inserted == 4
+        assert sorted(doc["_id"] for doc in collection.collection.find()) == [
+            "kind0", "kind1", "kind2", "kind3", "kind4"]
+
+    def test_ordered_stops_at_failure(self):
+        collection = KeyedCollection(mongomock.MongoClient().db.diagnostic)
+        collection.collection.insert_one({"_id": "kind1"})
+        with pytest.raises(mongo.BulkWriteError):
+            mongo.insert_diagnostics(
+                get_diagnostics(5), batch_size=2, collection=collection)
+        assert collection.num_inserts == 1
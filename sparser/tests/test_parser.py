@@ -0,0 +1,90 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import codecs
+import re
+
+import pytest
+from six import BytesIO
+
+from sparser import parser
+
+PREFILTER = re.compile(b"warning|note")
+
+TEXT = (u"noise\n"
+        u"a.c:1:2: warning: one\r\n"
+        u"a.c:2:2: note: two warning\n"
+        u"\n"
+        u"caf\u00e9 warning\x0cnoise\n"
+        u"\xff noise\n"
+        u"last warning")
+
+
+def get_baseline(data):
+    reader = codecs.getreader("utf-8")
+    return [
+        line.strip() for line in reader(BytesIO(data))
+        if PREFILTER.search(line.encode("utf-8"))
+    ]
+
+
+class TestIterCandidateLines():
+    @pytest.mark.parametrize("block_size", [1, 2, 7, 1 << 20])
+    def test_matches_codecs(self, monkeypatch, block_size):
+        monkeypatch.setattr(parser, "BLOCK_SIZE", block_size)
+        data = TEXT.encode("utf-8")
+        lines = list(parser.iter_candidate_lines(BytesIO(data), PREFILTER))
+        assert lines == get_baseline(data)
+        assert lines == [
+            u"a.c:1:2: warning: one", u"a.c:2:2: note: two warning",
+            u"caf\u00e9 warning", u"last warning"
+        ]
+
+    def test_empty(self):
+        assert list(parser.iter_candidate_lines(BytesIO(b""), PREFILTER)) \
+            == []
+
+    def test_skips_undecodable_noise(self):
+        data = b"\xff\xfe noise\nwarning\n"
+        lines = list(parser.iter_candidate_lines(BytesIO(data), PREFILTER))
+        assert lines == [u"warning"]
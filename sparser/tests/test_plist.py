@@ -0,0 +1,165 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import datetime
+import plistlib
+
+import pytest
+from six import BytesIO
+from six import b
+
+from sparser import plist
+from sparser import ClangAnalyzerPlistParser
+
+HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+          '<!DOCTYPE plist PUBLIC "-//Apple Computer//DTD PLIST 1.0//EN" '
+          '"http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n')
+
+ANALYZER_PLIST = HEADER + """<plist version="1.0">
+<dict>
+ <key>clang_version</key>
+ <string>clang version 3.8.1</string>
+ <key>files</key>
+ <array>
+  <string>a.c</string>
+  <string>b.h</string>
+ </array>
+ <key>diagnostics</key>
+ <array>
+  <dict>
+   <key>path</key>
+   <array>
+    <dict>
+     <key>kind</key><string>event</string>
+     <key>location</key>
+     <dict>
+      <key>line</key><integer>3</integer>
+      <key>file</key><integer>0</integer>
+     </dict>
+     <key>message</key><string>Assuming 'i' is &lt; 10</string>
+    </dict>
+   </array>
+   <key>description</key><string>Access out-of-bound array element</string>
+   <key>category</key><string>Logic error</string>
+   <key>location</key>
+   <dict>
+    <key>line</key><integer>7</integer>
+    <key>col</key><integer>5</integer>
+    <key>file</key><integer>1</integer>
+   </dict>
+  </dict>
+ </array>
+</dict>
+</plist>
+"""
+
+
+class TestPlist():
+    def test_types(self):
+        value = {
+            "string": u"caf\u00e9 &",
+            "integer": -3,
+            "real": 1.5,
+            "true": True,
+            "false": False,
+            "data": b"\x00\x01",
+            "date": datetime.datetime(2018, 11, 13, 12, 30),
+            "array": [1, [], {}],
+            "dict": {"nested": {"empty": ""}},
+        }
+        if hasattr(plistlib, "dumps"):
+            data = plistlib.dumps(value)
+        else:
+            data = b(plistlib.writePlistToString(value))
+        loaded = plist.load(BytesIO(data))
+        assert loaded == value
+
+    def test_select(self):
+        select = {
+            "files": plist.ALL,
+            "diagnostics": {"location": {"line": plist.ALL}},
+        }
+        loaded = plist.load(BytesIO(b(ANALYZER_PLIST)), select)
+        assert loaded == {
+            "files": ["a.c", "b.h"],
+            "diagnostics": [{"location": {"line": 7}}],
+        }
+
+    def test_small_blocks(self, monkeypatch):
+        monkeypatch.setattr(plist, "BLOCK_SIZE", 7)
+        select = ClangAnalyzerPlistParser.plist_select
+        loaded = plist.load(BytesIO(b(ANALYZER_PLIST)), select)
+        assert loaded["clang_version"] == "clang version 3.8.1"
+        assert loaded["diagnostics"][0]["category"] == "Logic error"
+
+    def test_binary(self):
+        if not hasattr(plistlib, "dumps"):
+            pytest.skip("plistlib cannot write binary plists")
+        value = plistlib.loads(b(ANALYZER_PLIST))
+        data = plistlib.dumps(value, fmt=plistlib.FMT_BINARY)
+        select = {"files": plist.ALL}
+        assert plist.load(BytesIO(data), select) == {"files": ["a.c", "b.h"]}
+
+
+class TestClangAnalyzerPlistParser():
+    def test_one_diag(self):
+        parser = ClangAnalyzerPlistParser()
+        results = parser.load(BytesIO(b(ANALYZER_PLIST)))
+        assert len(results) == 1
+
+        diag = results[0]
+        assert diag.tool_info.name == "clang_sa"
+        assert diag.tool_info.version == "clang version 3.8.1"
+        assert diag.kind == "Logic error"
+        assert diag.message.text == "Access out-of-bound array element"
+        assert diag.message.location.path == "b.h"
+        assert diag.message.location.line_start == 7
+
+    def test_binary_matches_xml(self):
+        if not hasattr(plistlib, "dumps"):
+            pytest.skip("plistlib cannot write binary plists")
+        value = plistlib.loads(b(ANALYZER_PLIST))
+        data = plistlib.dumps(value, fmt=plistlib.FMT_BINARY)
+        parser = ClangAnalyzerPlistParser()
+        assert parser.load(BytesIO(data)) == parser.load(
+            BytesIO(b(ANALYZER_PLIST)))
@@ -0,0 +1,150 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import sparser
+from sparser import parser
+from sparser.parser import ParserInfo, Parser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class PluginParser(Parser):
+    tool_name = "plugin_tool"
+    input_type = "text/plain"
+    description = "A parser provided by a plugin."
+
+    def load_iter(self, input_file):
+        return iter([])
+
+
+class FakeEntryPoint():
+    def __init__(self, name, obj):
+        self.name = name
+        self.obj = obj
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        return self.obj
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A scratch copy of the registry, with plugins not yet loaded"""
+    monkeypatch.setattr(parser, "Registry", dict(parser.Registry))
+    monkeypatch.setattr(parser, "_plugins_loaded", False)
+    return parser.Registry
+
+
+class TestRegistry():
+    @pytest.mark.skipif(
+        sys.version_info < (3, 7),
+        reason="parser classes are imported eagerly before Python 3.7")
+    def test_import_is_lazy(self):
+        script = ("import sys, sparser; "
+                  "print(' '.join(sorted(sys.modules)))")
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.path.join(HERE, "..")
+        modules = subprocess.check_output(
+            [sys.executable, "-c", script], env=env).decode().split()
+        for name in ["sparser.clang", "sparser.cppcheck", "sparser.gcc",
+                     "sparser.framac", "sparser.mongo", "mongoengine",
+                     "numpy", "logging"]:
+            assert name not in modules
+
+    def test_builtin_classes(self):
+        from sparser.cppcheck import CppcheckXmlV2Parser
+        assert sparser.CppcheckXmlV2Parser is CppcheckXmlV2Parser
+        info = sparser.Registry["cppcheck_xml"]
+        assert info.cls is CppcheckXmlV2Parser
+        assert info.tool_name == "cppcheck"
+
+    def test_unknown_attribute(self):
+        with pytest.raises(AttributeError):
+            sparser.NoSuchParser
+
+    def test_info_from_import_path(self):
+        info = ParserInfo(
+            name="test",
+            tool_name="tool",
+            input_type=None,
+            description=None,
+            cls="test_registry:PluginParser")
+        assert info.cls is PluginParser
+        assert info.tool_name == "tool"
+        assert info.input_type == "text/plain"
+
+    def test_plugins(self, registry, monkeypatch):
+        plugin = FakeEntryPoint("plugin_parser", PluginParser)
+        shadowing = FakeEntryPoint("cppcheck_xml", PluginParser)
+        monkeypatch.setattr(parser, "iter_entry_points",
+                            lambda group: iter([plugin, shadowing]))
+
+        assert "plugin_parser" not in registry
+        assert parser.get_parser_info("cppcheck_xml").tool_name == "cppcheck"
+        assert "plugin_parser" not in registry
+
+        info = parser.get_parser_info("plugin_parser")
+        assert not plugin.loaded
+        assert info.description == "A parser provided by a plugin."
+        assert info.cls is PluginParser
+        assert plugin.loaded
+        assert registry["cppcheck_xml"].tool_name == "cppcheck"
+        assert not shadowing.loaded
+
+    def test_unknown_parser(self, registry, monkeypatch):
+        monkeypatch.setattr(parser, "iter_entry_points",
+                            lambda group: iter([]))
+        assert parser.get_parser_info("no_such_parser") is None
+
+        monkeypatch.setattr(sys, "argv",
+                            ["sparser", "no_such_parser", "file.txt"])
+        with pytest.raises(SystemExit) as excinfo:
+            sparser.parser_entrypoint()
+        assert excinfo.value.code == 1
@@ -0,0 +1,156 @@
+# sa-bAbI: An automated software assurance code dataset generator
+# 
+# Copyright 2018 Carnegie Mellon University. All Rights Reserved.
+#
+# NO WARRANTY. THIS CARNEGIE MELLON UNIVERSITY AND SOFTWARE
+# ENGINEERING INSTITUTE MATERIAL IS FURNISHED ON AN "AS-IS" BASIS.
+# CARNEGIE MELLON UNIVERSITY MAKES NO WARRANTIES OF ANY KIND, EITHER
+# EXPRESSED OR IMPLIED, AS TO ANY MATTER INCLUDING, BUT NOT LIMITED
+# TO, WARRANTY OF FITNESS FOR PURPOSE OR MERCHANTABILITY, EXCLUSIVITY,
+# OR RESULTS OBTAINED FROM USE OF THE MATERIAL. CARNEGIE MELLON
+# UNIVERSITY DOES NOT MAKE ANY WARRANTY OF ANY KIND WITH RESPECT TO
+# FREEDOM FROM PATENT, TRADEMARK, OR COPYRIGHT INFRINGEMENT.
+#
+# Released under a MIT (SEI)-style license, please see license.txt or
+# contact permission@sei.cmu.edu for full terms.
+#
+# [DISTRIBUTION STATEMENT A] This material has been approved for
+# public release and unlimited distribution. Please see Copyright
+# notice for non-US Government use and distribution.
+# 
+# Carnegie Mellon (R) and CERT (R) are registered in the U.S. Patent
+# and Trademark Office by Carnegie Mellon University.
+#
+# This Software includes and/or makes use of the following Third-Party
+# Software subject to its own license:
+# 1. clang (http://llvm.org/docs/DeveloperPolicy.html#license)
+#     Copyright 2018 University of Illinois at Urbana-Champaign.
+# 2. frama-c (https://frama-c.com/download.html) Copyright 2018
+#     frama-c team.
+# 3. Docker (https://www.apache.org/licenses/LICENSE-2.0.html)
+#     Copyright 2004 Apache Software Foundation.
+# 4. cppcheck (http://cppcheck.sourceforge.net/) Copyright 2018
+#     cppcheck team.
+# 5. Python 3.6 (https://docs.python.org/3/license.html) Copyright
+#     2018 Python Software Foundation.
+# 
+# DM18-0995
+# 
+#!/usr/bin/env python
+
+# Copyright (c) 2007-2018 Carnegie Mellon University. All Rights Reserved.
+# See COPYRIGHT file for details.
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+import sparser
+from sparser.model import Diagnostic, Message, Location, ToolInfo
+from sparser.store import AlertStore
+
+CPPCHECK_DIR = os.path.join(
+    os.path.dirname(__file__), "real_outputs", "cppcheck")
+
+
+def make_diag(tool, kind, path, line, text):
+    return Diagnostic(
+        tool_info=ToolInfo(name=tool, version="1.0"),
+        kind=kind,
+        message=Message(
+            text=text, location=Location(path=path, line_start=line)))
+
+
+DIAGS = [
+    make_diag("cppcheck", "arrayIndexOutOfBounds", "/src/a.c", 7, "Array"),
+    make_diag("cppcheck", "unusedVariable", "/src/a.c", 9, "Unused"),
+    make_diag("cppcheck", "arrayIndexOutOfBounds", "/src/b.c", 3, "Array"),
+    make_diag("cppcheck", "arrayIndexOutOfBounds", "/src/a.c", 7, "Array"),
+    make_diag("frama-c", "value", "/src/b.c", 3, "accessing out of bounds"),
+    make_diag("frama-c", None, "/src/c.c", 1, None),
+]
+
+
+@pytest.fixture
+def store(tmpdir):
+    alert_store = AlertStore(str(tmpdir.join("alerts.sqlite")))
+    yield alert_store
+    alert_store.close()
+
+
+class TestAlertStore():
+    @pytest.mark.parametrize("batch_size", [1, 4, 1000])
+    def test_insert(self, store, batch_size):
+        assert store.insert(iter(DIAGS), batch_size=batch_size) == len(DIAGS)
+        rows = list(store.query())
+        assert len(rows) == len(DIAGS)
+        assert rows[0] == ("cppcheck", "1.0", "arrayIndexOutOfBounds",
+                           "/src/a.c", 7, "Array")
+        assert rows[-1] == ("frama-c", "1.0", "", "/src/c.c", 1, "")
+
+    def test_reopen(self, tmpdir):
+        path = str(tmpdir.join("alerts.sqlite"))
+        with AlertStore(path) as alert_store:
+            alert_store.insert(DIAGS[:2])
+        with AlertStore(path) as alert_store:
+            alert_store.insert(DIAGS[2:])
+            assert len(list(alert_store.query())) == len(DIAGS)
+
+    def test_schema_version(self, tmpdir):
+        path = str(tmpdir.join("alerts.sqlite"))
+        AlertStore(path).close()
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute("UPDATE meta SET value = '0' WHERE key = 'schema'")
+        conn.close()
+        with pytest.raises(ValueError):
+            AlertStore(path)
+
+    def test_sources(self, store):
+        sources = ["a.xml", "a.xml", "b.xml", "c.xml", "c.xml", "c.xml"]
+        store.insert_sourced(zip(sources, DIAGS), batch_size=4)
+        assert store.delete_sources(["a.xml", "c.xml", "d.xml"]) == 5
+        assert list(store.query()) == [
+            ("cppcheck", "1.0", "arrayIndexOutOfBounds", "/src/b.c", 3,
+             "Array")]
+
+    def test_query(self, store):
+        store.insert(DIAGS)
+        assert store.tools() == ["cppcheck", "frama-c"]
+        assert store.kinds("cppcheck") == [
+            "arrayIndexOutOfBounds", "unusedVariable"]
+        assert len(list(store.query(tool="cppcheck", path="/src/a.c",
+                                    line=7))) == 2
+        assert len(list(store.query(kind="value"))) == 1
+        assert list(store.query(tool="gcc")) == []
+
+    def test_locations(self, store):
+        store.insert(DIAGS)
+        assert store.locations("cppcheck") == []
+        assert store.locations(
+            "cppcheck", kinds=["arrayIndexOutOfBounds"]) == [
+                ("/src/a.c", 7), ("/src/b.c", 3)]
+        # Patterns match from the start of the kind, as with re.match()
+        assert store.locations("cppcheck", kind_patterns=["Variable"]) == []
+        assert store.locations(
+            "cppcheck", kind_patterns=["unused", "Array"]) == [
+                ("/src/a.c", 9)]
+        assert store.locations("cppcheck", messages=["Unused"]) == [
+            ("/src/a.c", 9)]
+        assert store.locations(
+            "frama-c", message_patterns=[".*out of bounds"]) == [
+                ("/src/b.c", 3)]
+
+    def test_cli(self, monkeypatch, tmpdir):
+        path = str(tmpdir.join("alerts.sqlite"))
+        monkeypatch.setattr(sys, "argv", [
+            "sparser", "cppcheck_xml", CPPCHECK_DIR, "--sqlite", path,
+            "--batch_size", "5"
+        ])
+        sparser.parser_entrypoint()
+        with AlertStore(path) as alert_store:
+            rows = list(alert_store.query())
+        assert rows
+        assert all(row[0] == "cppcheck" for row in rows)